@@ -0,0 +1,73 @@
+"""
+Extraction benchmark against a stand-in SQLite catalog, without SQL Server.
+
+    python benchmarks/bench_extract.py --tables 10000 --latency 0.005
+
+Every query waits --latency seconds first, so modes that save round trips
+are timed the way they would be against a remote server.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.model import schema_from_dict
+from src.db.parallel import ParallelExtractor
+from src.db.schema import SchemaExtractor
+from src.db.sqlite_catalog import SqliteConnector, build_catalog
+from synthetic import build_schema_pair
+
+def run_modes(connector, workers):
+    """Yields (label, seconds, queries, schema) for each extraction mode."""
+    extractor = SchemaExtractor(connector)
+    for label, kwargs in [('per-table', {'bulk_columns': False}),
+                          ('bulk', {}),
+                          ('bulk digests', {'digests_only': True})]:
+        started = time.perf_counter()
+        schema = extractor.get_full_schema(**kwargs)
+        yield label, time.perf_counter() - started, extractor.query_count, schema
+
+    parallel = ParallelExtractor(workers=workers)
+    started = time.perf_counter()
+    schema = parallel.extract(connector)
+    yield f"parallel x{workers}", time.perf_counter() - started, parallel.reports['schema']['queries'], schema
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tables', type=int, default=10000)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--procedures', type=int)
+    parser.add_argument('--body-lines', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.002, help="Seconds added to every query")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--catalog', help="Directory to build the catalog in (default: a temporary one)")
+    args = parser.parse_args()
+
+    source, _ = build_schema_pair(tables=args.tables, columns=args.columns, procedures=args.procedures,
+                                  body_lines=args.body_lines, drift=0)
+    directory = args.catalog or tempfile.mkdtemp(prefix="catalog_")
+    try:
+        started = time.perf_counter()
+        build_catalog(directory, source)
+        print(f"Catalog of {args.tables} tables built in {time.perf_counter() - started:.2f}s, "
+              f"latency {args.latency * 1000:.1f}ms per query")
+        expected = schema_from_dict(source)
+        del source
+
+        connector = SqliteConnector(latency=args.latency)
+        connector.connect(directory)
+        for label, seconds, queries, schema in run_modes(connector, args.workers):
+            # Digest-only schemas have no bodies, so only their tables are checked
+            same = schema['tables'] == expected['tables'] if 'digests' in label else schema == expected
+            print(f"{label:>14}: {seconds:8.3f}s, {queries:6} queries{'' if same else '  MISMATCH'}")
+        connector.close()
+    finally:
+        if not args.catalog:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
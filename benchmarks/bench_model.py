@@ -0,0 +1,94 @@
+"""
+Memory and compare-time benchmark: plain nested dicts vs. the compact
+records of src.core.model, for a synthetic pair of identical schemas.
+
+    python benchmarks/bench_model.py --tables 10000 --columns 20
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.compare import SchemaComparer
+from src.core.model import Column, Table, StoredObject, intern_name
+
+TYPES = [
+    ('int', None, 10, 0),
+    ('varchar', 100, None, None),
+    ('nvarchar', 255, None, None),
+    ('decimal', None, 18, 2),
+    ('datetime', None, None, None),
+    ('bit', None, None, None)
+]
+
+def column_values(t, c):
+    type_name, length, precision, scale = TYPES[(t + c) % len(TYPES)]
+    return type_name, c % 3 != 0, length, precision, scale
+
+def build_plain(tables, columns, procedures):
+    schema = {'tables': {}, 'procedures': {}, 'functions': {}, 'triggers': {}}
+    for t in range(tables):
+        col_dict = {}
+        for c in range(columns):
+            type_name, nullable, length, precision, scale = column_values(t, c)
+            col_dict[f"Column{c}"] = {
+                'type': ''.join(type_name),  # a fresh string per row, as pyodbc returns them
+                'nullable': nullable,
+                'length': length,
+                'precision': precision,
+                'scale': scale
+            }
+        schema['tables'][f"dbo.Table{t}"] = {'columns': col_dict, 'modify_date': datetime(2024, 1, 1)}
+    for p in range(procedures):
+        schema['procedures'][f"dbo.Proc{p}"] = {
+            'definition': f"CREATE PROCEDURE dbo.Proc{p} AS SELECT {p}",
+            'type': ''.join('SQL_STORED_PROCEDURE'),
+            'modify_date': datetime(2024, 1, 1)
+        }
+    return schema
+
+def build_records(tables, columns, procedures):
+    schema = {'tables': {}, 'procedures': {}, 'functions': {}, 'triggers': {}}
+    for t in range(tables):
+        col_dict = {}
+        for c in range(columns):
+            col_dict[intern_name(f"Column{c}")] = Column.make(*column_values(t, c))
+        schema['tables'][intern_name(f"dbo.Table{t}")] = Table(col_dict, datetime(2024, 1, 1))
+    for p in range(procedures):
+        schema['procedures'][intern_name(f"dbo.Proc{p}")] = StoredObject(
+            f"CREATE PROCEDURE dbo.Proc{p} AS SELECT {p}", 'SQL_STORED_PROCEDURE', datetime(2024, 1, 1))
+    return schema
+
+def measure(builder, args):
+    gc.collect()
+    tracemalloc.start()
+    source = builder(args.tables, args.columns, args.procedures)
+    target = builder(args.tables, args.columns, args.procedures)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    SchemaComparer().compare(source, target)
+    return memory, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tables', type=int, default=10000)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--procedures', type=int, default=5000)
+    args = parser.parse_args()
+
+    total_columns = 2 * args.tables * args.columns
+    print(f"{args.tables} tables x {args.columns} columns, {args.procedures} procedures per side "
+          f"({total_columns} columns in total)")
+    for label, builder in [('plain dicts', build_plain), ('records', build_records)]:
+        memory, seconds = measure(builder, args)
+        print(f"{label:>12}: {memory / 1024 / 1024:8.1f} MB, compare {seconds:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Time and memory of the main stages on synthetic schemas, checked against a stored baseline.
+
+    python benchmarks/bench_suite.py --scale 10k --drift 0.05
+    python benchmarks/bench_suite.py --scale 1k --save-baseline
+
+Stages: compare, generate, date filter, selected diff, search index, tree
+population and side-by-side diffing of modified bodies. The tree stages need
+PyQt6; without it they are reported as skipped. A stage regresses when its time
+or peak memory exceeds the baseline by more than --tolerance, and its time by
+more than --min-delta seconds (timer and GC noise); the exit status is then 1.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.compare import SchemaComparer
+from src.core.filters import OBJECT_TYPES, apply_date_filter
+from src.core.generator import ScriptGenerator
+from src.core.linediff import SideBySide, compute_line_diff
+from src.core.model import schema_from_dict
+from src.core.search import DiffSearchIndex
+from synthetic import SCALES, build_schema_pair
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Slowdowns smaller than this are noise for stages that take a few milliseconds
+DEFAULT_MIN_DELTA = 0.01
+# Modified bodies diffed by the line_diff stage, largest first
+LINE_DIFF_OBJECTS = 200
+TREE_STAGES = ['tree_population', 'selected_diff']
+
+class NullStream:
+    """Counts what ScriptGenerator.write writes without keeping it."""
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+def measure(func, repeat):
+    """Returns (best seconds over repeat runs, peak traced bytes of one more run)."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    # Tracing slows the code down, so memory is measured in a separate run
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def tree_stages(diff):
+    """Stages that need PyQt6; None without it."""
+    try:
+        from PyQt6.QtCore import Qt
+        from src.ui.diff_model import DiffTreeModel
+    except ImportError:
+        return None
+    model = DiffTreeModel()
+
+    def populate():
+        # What the view asks for on load: categories, segments and the objects of each segment
+        model.set_diff(diff)
+        for c in range(model.rowCount()):
+            category = model.index(c, 0)
+            for s in range(model.rowCount(category)):
+                segment = model.index(s, 0, category)
+                for o in range(model.rowCount(segment)):
+                    model.data(model.index(o, 0, segment))
+
+    def selected():
+        model.set_diff(diff)
+        model.rowCount()
+        # Uncheck the first segment so the walk sees both states
+        model.setData(model.index(0, 0, model.index(0, 0)), Qt.CheckState.Unchecked.value,
+                      Qt.ItemDataRole.CheckStateRole)
+        model.selected_diff()
+
+    return {'tree_population': populate, 'selected_diff': selected}
+
+def line_diff_pairs(diff, source, target):
+    pairs = []
+    for category in OBJECT_TYPES[1:]:
+        for name in diff[category]['modified']:
+            pairs.append((source[category][name]['definition'], target[category][name]['definition']))
+    pairs.sort(key=lambda pair: -len(pair[0]))
+    return pairs[:LINE_DIFF_OBJECTS]
+
+def run_stages(params, repeat):
+    """Returns (results, skipped): { stage: measurements } and { stage: reason it didn't run }."""
+    plain_source, plain_target = build_schema_pair(**params)
+    source = schema_from_dict(plain_source)
+    target = schema_from_dict(plain_target)
+    del plain_source, plain_target
+    diff = SchemaComparer().compare(source, target)
+    cutoff = datetime(2024, 7, 1)
+    pairs = line_diff_pairs(diff, source, target)
+
+    def side_by_side():
+        for old_text, new_text in pairs:
+            SideBySide(old_text, new_text, compute_line_diff(old_text, new_text).opcodes)
+
+    stages = {
+        'compare': lambda: SchemaComparer().compare(source, target),
+        'generate': lambda: ScriptGenerator().generate(diff),
+        'generate_stream': lambda: ScriptGenerator().write(diff, NullStream()),
+        'date_filter': lambda: apply_date_filter(diff, source, cutoff),
+        'search_index': lambda: DiffSearchIndex(diff),
+        'line_diff': side_by_side
+    }
+    skipped = {}
+    tree = tree_stages(diff)
+    if tree is None:
+        skipped = {name: "PyQt6 is not installed" for name in TREE_STAGES}
+    else:
+        stages.update(tree)
+
+    changes = sum(len(diff[c]['new']) + len(diff[c]['modified']) + len(diff[c]['dropped']) for c in OBJECT_TYPES)
+    print(f"{len(source['tables'])} tables, {sum(len(source[c]) for c in OBJECT_TYPES[1:])} stored objects, "
+          f"{changes} changes")
+    results = {}
+    for name, func in stages.items():
+        seconds, peak = measure(func, repeat)
+        results[name] = {'seconds': round(seconds, 4), 'peak_mb': round(peak / 1024 / 1024, 2)}
+    return results, skipped
+
+def baseline_key(params):
+    return " ".join(f"{key}={value}" for key, value in sorted(params.items()))
+
+def report(results, skipped, baseline, tolerance, min_delta=DEFAULT_MIN_DELTA):
+    """Prints results next to the baseline; returns the names of regressed stages."""
+    regressions = []
+    print(f"{'stage':>16} {'seconds':>9} {'base':>9} {'peak MB':>9} {'base':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        flag = ""
+        if base:
+            slower = (result['seconds'] > base['seconds'] * tolerance
+                      and result['seconds'] - base['seconds'] > min_delta)
+            larger = result['peak_mb'] > max(base['peak_mb'], 0.1) * tolerance
+            if slower or larger:
+                regressions.append(name)
+                flag = "  REGRESSION"
+        base = base or {'seconds': float('nan'), 'peak_mb': float('nan')}
+        print(f"{name:>16} {result['seconds']:9.4f} {base['seconds']:9.4f} "
+              f"{result['peak_mb']:9.2f} {base['peak_mb']:9.2f}{flag}")
+    for name, reason in skipped.items():
+        print(f"{name:>16} {'skipped':>9} ({reason})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--tables', type=int)
+    parser.add_argument('--columns', type=int)
+    parser.add_argument('--procedures', type=int)
+    parser.add_argument('--body-lines', type=int)
+    parser.add_argument('--drift', type=float, default=0.05, help="Fraction of objects that differ")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Record these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Allowed ratio to the baseline")
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help=f"Seconds a stage may be slower than its baseline regardless of the ratio "
+                             f"(default: {DEFAULT_MIN_DELTA})")
+    args = parser.parse_args()
+
+    params = dict(SCALES[args.scale], drift=args.drift)
+    for key in ['tables', 'columns', 'procedures', 'body_lines']:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+
+    results, skipped = run_stages(params, args.repeat)
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baselines = json.load(f)
+    key = baseline_key(params)
+    baseline = baselines.get(key, {})
+    regressions = report(results, skipped, baseline, args.tolerance, args.min_delta)
+    if skipped:
+        print(f"Not checked against the baseline: {', '.join(skipped)}")
+
+    if args.save_baseline:
+        # Stages skipped this time keep their recorded baseline
+        baselines[key] = dict({name: baseline[name] for name in skipped if name in baseline}, **results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline saved for '{key}'")
+    elif key not in baselines:
+        print(f"No baseline for '{key}'; record one with --save-baseline")
+    else:
+        missing = [name for name in results if name not in baseline]
+        if missing:
+            print(f"No baseline for stages: {', '.join(missing)}; record them with --save-baseline")
+    if not args.save_baseline and regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Synthetic schema pairs for the benchmarks, in the get_full_schema structure.
+
+    source, target = build_schema_pair(tables=10000, drift=0.05)
+"""
+import random
+from datetime import datetime, timedelta
+
+TYPES = [
+    ('int', None, 10, 0),
+    ('varchar', 100, None, None),
+    ('nvarchar', 255, None, None),
+    ('decimal', None, 18, 2),
+    ('datetime', None, None, None),
+    ('bit', None, None, None)
+]
+
+# Named scales for bench_suite.py --scale
+SCALES = {
+    '1k': {'tables': 1000},
+    '10k': {'tables': 10000},
+    '100k': {'tables': 100000},
+    'wide': {'tables': 1000, 'columns': 300},
+    'bodies': {'tables': 100, 'procedures': 2000, 'body_lines': 2000}
+}
+
+def build_column(t, c):
+    type_name, length, precision, scale = TYPES[(t + c) % len(TYPES)]
+    return {'type': type_name, 'nullable': c % 3 != 0, 'length': length, 'precision': precision, 'scale': scale}
+
+def build_table(t, columns, modify_date):
+    return {
+        'columns': {f"Column{c}": build_column(t, c) for c in range(columns)},
+        'modify_date': modify_date
+    }
+
+# sys.objects type_desc of each stored object category
+TYPE_DESCS = {'procedures': 'SQL_STORED_PROCEDURE', 'functions': 'SQL_SCALAR_FUNCTION', 'triggers': 'SQL_TRIGGER'}
+
+def build_body(kind, name, lines, variant=0):
+    header = {'procedures': 'PROCEDURE', 'functions': 'FUNCTION', 'triggers': 'TRIGGER'}[kind]
+    body = [f"CREATE {header} {name}", "AS", "BEGIN"]
+    body.extend(f"    SELECT Column{i % 20}, Column{(i + variant) % 20} FROM dbo.Table{i % 97} WHERE ID = {i};"
+                for i in range(lines))
+    body.append("END")
+    return "\n".join(body)
+
+def build_schema_pair(tables=1000, columns=20, procedures=None, functions=None, triggers=None,
+                      body_lines=50, drift=0.05, seed=0):
+    """
+    Returns (source, target) plain schema dicts.
+    procedures/functions/triggers default to tables // 2, // 4 and // 10.
+    drift: fraction of objects that differ, split evenly between new (source
+           only), modified and dropped (target only) objects.
+    """
+    rng = random.Random(seed)
+    counts = {
+        'procedures': tables // 2 if procedures is None else procedures,
+        'functions': tables // 4 if functions is None else functions,
+        'triggers': tables // 10 if triggers is None else triggers
+    }
+    source = {'tables': {}, 'procedures': {}, 'functions': {}, 'triggers': {}}
+    target = {'tables': {}, 'procedures': {}, 'functions': {}, 'triggers': {}}
+    start = datetime(2024, 1, 1)
+
+    def roll():
+        # 0 = unchanged, 1 = new, 2 = modified, 3 = dropped
+        r = rng.random()
+        return 0 if r >= drift else 1 + int(r * 3 / drift)
+
+    for t in range(tables):
+        name = f"dbo.Table{t}"
+        modify_date = start + timedelta(days=t % 365)
+        change = roll()
+        source['tables'][name] = build_table(t, columns, modify_date)
+        if change == 1:
+            continue
+        target['tables'][name] = build_table(t, columns, modify_date)
+        if change == 2:
+            target_columns = target['tables'][name]['columns']
+            target_columns.pop(f"Column{columns - 1}", None)
+            target_columns[f"Legacy{t}"] = build_column(t, 1)
+            if columns:
+                target_columns["Column0"] = dict(target_columns["Column0"], nullable=True, length=50)
+        elif change == 3:
+            target['tables'][f"dbo.OldTable{t}"] = build_table(t, columns, modify_date)
+
+    for kind, count in counts.items():
+        for i in range(count):
+            name = f"dbo.{kind[:-1].capitalize()}{i}"
+            modify_date = start + timedelta(days=i % 365)
+            change = roll()
+            source[kind][name] = {'definition': build_body(kind, name, body_lines), 'type': TYPE_DESCS[kind],
+                                  'modify_date': modify_date}
+            if change == 1:
+                continue
+            variant = 1 if change == 2 else 0
+            target[kind][name] = {'definition': build_body(kind, name, body_lines, variant), 'type': TYPE_DESCS[kind],
+                                  'modify_date': modify_date}
+            if change == 3:
+                dropped = f"dbo.Old{kind[:-1].capitalize()}{i}"
+                target[kind][dropped] = {'definition': build_body(kind, dropped, body_lines), 'type': TYPE_DESCS[kind],
+                                         'modify_date': modify_date}
+    return source, target
@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 from src.ui.main_window import MainWindow
@@ -56,7 +57,7 @@ def main():
             border: 1px solid #bfdbfe;
         }
 
-        QLineEdit, QTextEdit, QTreeWidget {
+        QLineEdit, QTextEdit, QTreeWidget, QTreeView {
             background-color: #ffffff;
             border: 1px solid #cbd5e1;
             border-radius: 6px;
@@ -66,11 +67,11 @@ def main():
             selection-color: #1e3a8a;
         }
         
-        QLineEdit:focus, QTextEdit:focus, QTreeWidget:focus {
+        QLineEdit:focus, QTextEdit:focus, QTreeWidget:focus, QTreeView:focus {
             border: 1px solid #3b82f6;
         }
 
-        QTreeWidget::item:selected {
+        QTreeWidget::item:selected, QTreeView::item:selected {
             background-color: #dbeafe;
             color: #1e3a8a;
             border-radius: 4px;
@@ -153,4 +154,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Line diffs run in spawned processes; in a frozen build they start here
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,313 @@
+"""
+Headless schema comparison.
+
+    python -m src.cli compare --source PROD --target TEST --script sync.sql --diff diff.json
+    python -m src.cli batch --reference GOLDEN --template TENANTS --databases-file tenants.txt --report drift.json
+    python -m src.cli compare --source PROD --target TEST --profile timings.json --trace run.trace.json
+    python -m src.cli fingerprint --template TENANTS --databases-file tenants.txt --hash
+
+Connection profiles are read from the ConfigManager profiles file; a
+profile with a "catalog" directory (and optional "latency" seconds) uses
+a stand-in SQLite catalog instead of SQL Server. Exit
+status is 0 when the schemas match, 1 when differences were found and 2 on
+errors. fingerprint only groups databases with identical schemas (exit
+status 0 when there is a single group). This module must never import Qt.
+"""
+import argparse
+import json
+import sys
+from contextlib import ExitStack
+from datetime import datetime
+
+from src.core.config import ConfigManager
+from src.core.model import json_default
+
+def connect_profile(config, name):
+    details = config.get_profile(name)
+    if not details:
+        raise ValueError(f"Unknown connection profile '{name}' in {config.filename}")
+    return connect_details(details)
+
+def connect_details(details):
+    if details.get('catalog'):
+        # A stand-in catalog written by src.db.sqlite_catalog.build_catalog
+        from src.db.sqlite_catalog import SqliteConnector
+
+        connector = SqliteConnector(latency=details.get('latency', 0.0))
+        connector.connect(details['catalog'])
+        return connector
+
+    from src.db.connector import DbConnector
+
+    connector = DbConnector()
+    connector.connect(
+        details['server'],
+        details['database'],
+        details.get('username'),
+        details.get('password'),
+        details.get('trusted', False),
+        details.get('trust_cert', False)
+    )
+    return connector
+
+def load_object_filter(path):
+    from src.core.filters import ObjectFilter
+
+    return ObjectFilter.from_file(path)
+
+def report_filter_hits(pipeline, report, verbose):
+    """Adds the object filter's per-rule hit counts to report and, when verbose, prints them."""
+    if not pipeline.object_filter:
+        return
+    report['object_filter'] = [{'rule': rule, 'kind': kind, 'hits': hits}
+                               for rule, kind, hits in pipeline.object_filter.hit_counts()]
+    if verbose:
+        print("Object filter hits (all databases):\n" + pipeline.object_filter.format_hits(), file=sys.stderr)
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, default=json_default)
+
+def build_pipeline(args, progress):
+    from src.core.pipeline import ComparisonPipeline
+    from src.core.snapshot import SnapshotCache
+    from src.core.store import DefinitionStore
+
+    store = None if args.no_store else DefinitionStore(args.store)
+    return ComparisonPipeline(
+        args.workers,
+        object_filter=load_object_filter(args.objects) if args.objects else None,
+        cutoff_date=args.since,
+        progress=progress,
+        snapshot_cache=None if args.no_snapshots else SnapshotCache(args.snapshots, store),
+        digests_only=args.hash,
+        definition_store=store
+    )
+
+def run_compare(args):
+    from src.core.generator import ScriptGenerator
+    from src.core.report import diff_report
+
+    progress = (lambda message: print(message, file=sys.stderr)) if args.verbose else None
+    config = ConfigManager(args.profiles)
+    with ExitStack() as connections:
+        source_connector = connect_profile(config, args.source)
+        connections.callback(source_connector.close)
+        target_connector = connect_profile(config, args.target)
+        connections.callback(target_connector.close)
+        pipeline = build_pipeline(args, progress)
+        # With --hash, bodies are only downloaded when a script is written
+        pipeline.lazy_definitions = not args.script
+        source_schema, target_schema, diff = pipeline.run(source_connector, target_connector)
+
+    report = diff_report(diff)
+    report['source'] = args.source
+    report['target'] = args.target
+    report['compared_at'] = datetime.now().isoformat()
+    report_filter_hits(pipeline, report, args.verbose)
+
+    if args.script:
+        with open(args.script, 'w') as f:
+            ScriptGenerator().write(diff, f)
+    if args.diff:
+        write_json(args.diff, report)
+
+    summary = report['summary']
+    print(f"{args.source} -> {args.target}: {summary['total']} differences "
+          + ", ".join(f"{category} {counts['new']}/{counts['modified']}/{counts['dropped']}"
+                      for category, counts in summary.items() if category != 'total')
+          + " (new/modified/dropped)")
+    if args.verbose:
+        print(pipeline.extraction_report, file=sys.stderr)
+    return 1 if summary['total'] else 0
+
+def read_names(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+def target_names(args):
+    targets = list(args.targets or [])
+    if args.targets_file:
+        targets.extend(read_names(args.targets_file))
+    if args.databases_file:
+        targets.extend(read_names(args.databases_file))
+    if not targets:
+        raise ValueError("No targets given (use --targets, --targets-file or --databases-file).")
+    return targets
+
+def target_connect(args, config):
+    """Returns connect(name) for the names given by target_names."""
+    def connect(name):
+        if args.databases_file and name not in config.get_all_profiles():
+            # Tenant database on the server of the template profile
+            if not args.template:
+                raise ValueError("--databases-file requires --template")
+            template = config.get_profile(args.template)
+            if not template:
+                raise ValueError(f"Unknown connection profile '{args.template}' in {config.filename}")
+            return connect_details(dict(template, database=name))
+        return connect_profile(config, name)
+    return connect
+
+def run_batch(args):
+    import os
+    from src.core.batch import BatchComparer
+    from src.core.generator import ScriptGenerator
+
+    progress = (lambda message: print(message, file=sys.stderr)) if args.verbose else None
+    config = ConfigManager(args.profiles)
+    targets = target_names(args)
+    connect = target_connect(args, config)
+
+    reference_connector = connect_profile(config, args.reference)
+    try:
+        pipeline = build_pipeline(args, progress)
+        comparer = BatchComparer(pipeline, args.concurrency, args.workers, keep_diffs=bool(args.out_dir))
+        report = comparer.run(args.reference, reference_connector, targets, connect)
+        report_filter_hits(pipeline, report, args.verbose)
+
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+            generator = ScriptGenerator()
+            for tenant in report['tenants']:
+                if tenant['error'] or not tenant['summary']['total']:
+                    continue
+                safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in tenant['target'])
+                write_json(os.path.join(args.out_dir, f"{safe_name}.json"), tenant)
+                with open(os.path.join(args.out_dir, f"{safe_name}.sql"), 'w') as f:
+                    generator.write(comparer.diffs[tenant['target']], f)
+    finally:
+        reference_connector.close()
+
+    if args.report:
+        write_json(args.report, report)
+
+    for tenant in report['tenants']:
+        if tenant['error']:
+            print(f"{tenant['target']}: ERROR {tenant['error']}")
+        else:
+            print(f"{tenant['target']}: {tenant['summary']['total']} differences ({tenant['seconds']:.1f}s)")
+    print(f"{len(report['matching'])} matching, {len(report['drifted'])} drifted, {len(report['failed'])} failed "
+          f"in {report['elapsed_seconds']:.1f}s ({report['tenants_per_minute']} tenants/min)")
+    if report['failed']:
+        return 2
+    return 1 if report['drifted'] else 0
+
+def run_fingerprint(args):
+    from src.core.batch import BatchComparer
+
+    progress = (lambda message: print(message, file=sys.stderr)) if args.verbose else None
+    config = ConfigManager(args.profiles)
+    databases = target_names(args)
+    pipeline = build_pipeline(args, progress)
+    report = BatchComparer(pipeline, args.concurrency, args.workers).fingerprint(databases, target_connect(args, config))
+    report_filter_hits(pipeline, report, args.verbose)
+    if args.report:
+        write_json(args.report, report)
+
+    for result in report['results']:
+        if result['error']:
+            print(f"{result['database']}: ERROR {result['error']}")
+    for number, group in enumerate(report['groups'], 1):
+        print(f"Group {number} ({len(group['databases'])} databases, {group['fingerprint'][:16]}): "
+              + ", ".join(group['databases']))
+        for category, sql_schemas in group['differences'].items():
+            print(f"    {category} differ from group 1 in schemas: {', '.join(sql_schemas)}")
+    groups = len(report['groups'])
+    print(("All databases are identical" if report['identical'] else f"{groups} distinct schema{'s' if groups != 1 else ''}")
+          + f" ({report['elapsed_seconds']:.1f}s)")
+    if report['failed']:
+        return 2
+    return 0 if report['identical'] else 1
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def add_common_arguments(parser, workers=4):
+    parser.add_argument('--profiles', default="profiles.json", help="Connection profiles file (default: profiles.json)")
+    parser.add_argument('--objects', help="Object filter file restricting the comparison: schema.object names, "
+                                          "patterns (sales.*, dbo.usp_Report%%), re: regexes and ! exclusions")
+    parser.add_argument('--since', type=parse_date, help="Only report objects changed on or after YYYY-MM-DD")
+    parser.add_argument('--workers', type=int, default=workers, help=f"Worker connections per database (default: {workers})")
+    parser.add_argument('--hash', action='store_true', help="Compare definitions by server-side hash and download only the bodies a script needs (SQL Server 2016+)")
+    parser.add_argument('--snapshots', help="Snapshot cache directory (default: snapshots in the user data directory)")
+    parser.add_argument('--no-snapshots', action='store_true', help="Always extract everything")
+    parser.add_argument('--store', help="Definition store directory, shared by all databases "
+                                        "(default: definitions in the user data directory)")
+    parser.add_argument('--no-store', action='store_true', help="Don't keep definition bodies between runs")
+    parser.add_argument('--profile', help="Write per-phase and per-query timings (JSON) to this file")
+    parser.add_argument('--trace', help="Write the timings in Chrome trace format (chrome://tracing, Perfetto) to this file")
+    parser.add_argument('--cprofile', help="Also run cProfile on the main thread and write its stats (pstats) to this file")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Print progress to stderr")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="broono", description="MSSQL schema comparison without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compare = commands.add_parser('compare', help="Compare a source profile against a target profile")
+    compare.add_argument('--source', required=True, help="Source connection profile (desired state)")
+    compare.add_argument('--target', required=True, help="Target connection profile (database to update)")
+    compare.add_argument('--script', help="Write the synchronization script to this file")
+    compare.add_argument('--diff', help="Write the machine-readable diff (JSON) to this file")
+    add_common_arguments(compare)
+    compare.set_defaults(handler=run_compare)
+
+    batch = commands.add_parser('batch', help="Compare one reference profile against many target databases")
+    batch.add_argument('--reference', required=True, help="Reference (golden) connection profile")
+    batch.add_argument('--targets', nargs='+', help="Target connection profiles")
+    batch.add_argument('--targets-file', help="File with one target profile per line")
+    batch.add_argument('--template', help="Profile whose server and credentials are used for --databases-file")
+    batch.add_argument('--databases-file', help="File with one tenant database name per line")
+    batch.add_argument('--concurrency', type=int, default=8, help="Targets compared at the same time (default: 8)")
+    batch.add_argument('--report', help="Write the combined report (JSON) to this file")
+    batch.add_argument('--out-dir', help="Write a diff (JSON) and script per drifted target to this directory")
+    add_common_arguments(batch, workers=2)
+    batch.set_defaults(handler=run_batch)
+
+    fingerprint = commands.add_parser('fingerprint', help="Group databases by schema fingerprint without comparing them")
+    fingerprint.add_argument('--targets', nargs='+', help="Connection profiles of the databases")
+    fingerprint.add_argument('--targets-file', help="File with one connection profile per line")
+    fingerprint.add_argument('--template', help="Profile whose server and credentials are used for --databases-file")
+    fingerprint.add_argument('--databases-file', help="File with one database name per line")
+    fingerprint.add_argument('--concurrency', type=int, default=8, help="Databases extracted at the same time (default: 8)")
+    fingerprint.add_argument('--report', help="Write the fingerprints and groups (JSON) to this file")
+    add_common_arguments(fingerprint, workers=2)
+    fingerprint.set_defaults(handler=run_fingerprint)
+    return parser
+
+def run_profiled(args):
+    from src.core import profiling
+
+    with profiling.session(cprofile=bool(args.cprofile)) as profiler:
+        try:
+            return args.handler(args)
+        finally:
+            if args.profile:
+                profiler.save_json(args.profile)
+            if args.trace:
+                profiler.save_chrome_trace(args.trace)
+            if args.cprofile:
+                profiler.save_cprofile(args.cprofile)
+            if args.verbose:
+                print(profiler.format_summary(limit=20), file=sys.stderr)
+
+def close_pools():
+    # Pools only exist once a SQL Server profile was connected
+    pool = sys.modules.get('src.db.pool')
+    if pool:
+        pool.close_all_pools()
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.profile or args.trace or args.cprofile:
+            return run_profiled(args)
+        return args.handler(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        close_pools()
+
+if __name__ == "__main__":
+    sys.exit(main())
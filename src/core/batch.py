@@ -0,0 +1,219 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from src.core.filters import OBJECT_TYPES
+from src.core.fingerprint import group_by_fingerprint
+from src.core.report import diff_report
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TARGET_WORKERS = 2
+
+class BatchComparer:
+    """
+    Compares one reference (golden) schema against many target databases.
+    The reference is extracted once; targets are extracted and compared
+    concurrently, at most `concurrency` at a time. fingerprint() instead
+    only groups databases by schema fingerprint.
+    """
+    def __init__(self, pipeline, concurrency=DEFAULT_CONCURRENCY, target_workers=DEFAULT_TARGET_WORKERS,
+                 keep_diffs=False):
+        """
+        pipeline: ComparisonPipeline providing filters, extraction options,
+                  progress and cancellation.
+        target_workers: worker connections per target database.
+        keep_diffs: keep every tenant's diff in self.diffs (e.g. to write scripts).
+        """
+        self.pipeline = pipeline
+        self.concurrency = max(1, int(concurrency))
+        self.target_workers = max(1, int(target_workers))
+        self.keep_diffs = keep_diffs
+        self.reference_schema = None
+        self.reference_fingerprint = None
+        self.cutoff = None
+        self.diffs = {}
+        self._lock = threading.Lock()
+
+    def run(self, reference_name, reference_connector, target_names, connect):
+        """
+        target_names: tenant names; connect(name) returns a connected DbConnector.
+        Returns the combined report.
+        """
+        pipeline = self.pipeline
+        started = time.perf_counter()
+        self.diffs = {}
+        if pipeline.object_filter:
+            pipeline.object_filter.reset_hits()
+
+        pipeline.report_progress(f"Extracting reference {reference_name}...")
+        pipeline.cancel_token.add_callback(reference_connector.cancel)
+        extractor = pipeline.make_extractor(fingerprint=True)
+        # With a date filter, the reference's name list decides what every target extracts
+        self.cutoff = extractor.cutoff_selection(reference_connector) if pipeline.cutoff_date else None
+        reference_schema = extractor.extract_many({reference_name: reference_connector}, self.cutoff,
+                                                  reference_name)[reference_name]
+        self.reference_schema = pipeline.filter_schema(reference_schema)
+        self.reference_fingerprint = extractor.fingerprints[reference_name]
+        pipeline.cancel_token.check()
+
+        results = []
+        completed = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._compare_target, name, connect): name for name in target_names}
+            try:
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    completed += 1
+                    pipeline.report_progress(f"Compared {completed}/{len(futures)} targets")
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        if self.keep_diffs:
+            pipeline.load_changed_definitions(self.reference_schema, reference_connector, list(self.diffs.values()))
+
+        elapsed = time.perf_counter() - started
+        order = {name: index for index, name in enumerate(target_names)}
+        results.sort(key=lambda result: order[result['target']])
+        return self._combined_report(reference_name, results, elapsed)
+
+    def fingerprint(self, names, connect):
+        """
+        Answers whether the databases in names have the same schema without
+        comparing them: each one is extracted and fingerprinted, and databases
+        are grouped by fingerprint. connect(name) returns a connected DbConnector.
+        Returns the report; 'groups' lists the largest group first.
+        """
+        pipeline = self.pipeline
+        if pipeline.cutoff_date:
+            raise ValueError("Fingerprints cover whole schemas and can't be combined with a date filter.")
+        started = time.perf_counter()
+        if pipeline.object_filter:
+            pipeline.object_filter.reset_hits()
+
+        results = []
+        fingerprints = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._fingerprint_database, name, connect): name for name in names}
+            try:
+                for future in as_completed(futures):
+                    result, fingerprint = future.result()
+                    results.append(result)
+                    if fingerprint is not None:
+                        fingerprints[result['database']] = fingerprint
+                    pipeline.report_progress(f"Fingerprinted {len(results)}/{len(futures)} databases")
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        order = {name: index for index, name in enumerate(names)}
+        results.sort(key=lambda result: order[result['database']])
+        groups = []
+        for databases in group_by_fingerprint(fingerprints):
+            databases.sort(key=order.get)
+            fingerprint = fingerprints[databases[0]]
+            groups.append({
+                'fingerprint': fingerprint.hexdigest,
+                'databases': databases,
+                # Against the largest group
+                'differences': fingerprint.differences(fingerprints[groups[0]['databases'][0]]) if groups else {}
+            })
+
+        elapsed = time.perf_counter() - started
+        return {
+            'fingerprinted_at': datetime.now().isoformat(),
+            'databases': len(results),
+            'identical': len(groups) == 1 and not any(r['error'] for r in results),
+            'groups': groups,
+            'failed': [r['database'] for r in results if r['error']],
+            'elapsed_seconds': round(elapsed, 3),
+            'results': results
+        }
+
+    def _fingerprint_database(self, name, connect):
+        pipeline = self.pipeline
+        pipeline.cancel_token.check()
+        started = time.perf_counter()
+        result = {'database': name, 'fingerprint': None, 'error': None}
+        fingerprint = None
+        connector = None
+        try:
+            connector = connect(name)
+            pipeline.cancel_token.add_callback(connector.cancel)
+            extractor = pipeline.make_extractor(self.target_workers, fingerprint=True)
+            schema = extractor.extract_many({name: connector})[name]
+            fingerprint = extractor.fingerprints[name]
+            if pipeline.object_filter:
+                fingerprint = fingerprint.restrict(pipeline.filter_schema(schema))
+            result['fingerprint'] = fingerprint.hexdigest
+        except Exception as e:
+            pipeline.cancel_token.check()
+            result['error'] = str(e)
+        finally:
+            if connector:
+                # Each tenant has its own pool, which nothing reuses after this
+                connector.dispose()
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result, fingerprint
+
+    def _compare_target(self, name, connect):
+        pipeline = self.pipeline
+        pipeline.cancel_token.check()
+        started = time.perf_counter()
+        result = {'target': name, 'summary': None, 'report': None, 'error': None}
+        connector = None
+        try:
+            connector = connect(name)
+            pipeline.cancel_token.add_callback(connector.cancel)
+            extractor = pipeline.make_extractor(self.target_workers, fingerprint=True)
+            target_schema = extractor.extract_many({name: connector}, self.cutoff)[name]
+            # Tenants matching the reference are settled by their fingerprints alone
+            _, _, diff = pipeline.compare_schemas(self.reference_schema, target_schema,
+                                                  (self.reference_fingerprint, extractor.fingerprints[name]))
+            report = diff_report(diff)
+            result['summary'] = report.pop('summary')
+            result['report'] = report
+            if self.keep_diffs:
+                with self._lock:
+                    self.diffs[name] = diff
+        except Exception as e:
+            pipeline.cancel_token.check()
+            result['error'] = str(e)
+        finally:
+            if connector:
+                connector.dispose()
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def _combined_report(self, reference_name, results, elapsed):
+        matching = [r['target'] for r in results if r['summary'] and r['summary']['total'] == 0]
+        drifted = [r['target'] for r in results if r['summary'] and r['summary']['total'] > 0]
+        failed = [r['target'] for r in results if r['error']]
+
+        # How many targets each object differs in, to spot systematic drift
+        object_drift = {category: {} for category in OBJECT_TYPES}
+        for r in results:
+            if not r['report']:
+                continue
+            for category in OBJECT_TYPES:
+                counts = object_drift[category]
+                for change in ['new', 'modified', 'dropped']:
+                    for name in r['report'][category][change]:
+                        key = f"{change}:{name}"
+                        counts[key] = counts.get(key, 0) + 1
+
+        return {
+            'reference': reference_name,
+            'compared_at': datetime.now().isoformat(),
+            'targets': len(results),
+            'matching': matching,
+            'drifted': drifted,
+            'failed': failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'tenants_per_minute': round(len(results) / elapsed * 60, 2) if elapsed > 0 else None,
+            'object_drift': {category: dict(sorted(counts.items(), key=lambda item: -item[1]))
+                             for category, counts in object_drift.items()},
+            'tenants': results
+        }
@@ -1,23 +1,76 @@
+import hashlib
+from src.core import profiling
+
+def definition_digest(definition):
+    """
+    Client-side equivalent of HASHBYTES('SHA2_256', definition) for an nvarchar
+    definition, as a hex string. None for missing (e.g. encrypted) definitions.
+    """
+    if definition is None:
+        return None
+    return hashlib.sha256(definition.encode('utf-16-le')).hexdigest()
+
+def digest_from_server(value):
+    """Converts a HASHBYTES result (bytes) to the hex form used by definition_digest."""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    return str(value).lower()
+
 class SchemaComparer:
-    def compare(self, source_schema, target_schema):
+    def compare(self, source_schema, target_schema, source_fingerprint=None, target_fingerprint=None):
         """
         Compares source_schema against target_schema.
+        source_fingerprint, target_fingerprint: optional SchemaFingerprints of the
+        two schemas; categories, SQL schemas and objects whose fingerprints match
+        are skipped instead of walked.
         """
-        diff = {
-            'tables': self._compare_object_type(source_schema['tables'], target_schema['tables'], is_table=True),
-            'procedures': self._compare_object_type(source_schema['procedures'], target_schema['procedures']),
-            'functions': self._compare_object_type(source_schema['functions'], target_schema['functions']),
-            'triggers': self._compare_object_type(source_schema['triggers'], target_schema['triggers'])
-        }
+        categories = ['tables', 'procedures', 'functions', 'triggers']
+        fingerprints = source_fingerprint is not None and target_fingerprint is not None
+        if fingerprints and source_fingerprint.digest == target_fingerprint.digest:
+            return {category: self._empty_type_diff() for category in categories}
+
+        diff = {}
+        for category in categories:
+            with profiling.span(f"compare {category}", "compare", objects=len(source_schema[category])):
+                if not fingerprints:
+                    diff[category] = self._compare_object_type(source_schema[category], target_schema[category],
+                                                               is_table=category == 'tables')
+                elif source_fingerprint.categories[category] == target_fingerprint.categories[category]:
+                    diff[category] = self._empty_type_diff()
+                else:
+                    diff[category] = self._compare_object_type(
+                        source_schema[category], target_schema[category], category == 'tables',
+                        (source_fingerprint.objects[category], source_fingerprint.schemas[category]),
+                        (target_fingerprint.objects[category], target_fingerprint.schemas[category]))
         return diff
 
-    def _compare_object_type(self, source_objs, target_objs, is_table=False):
-        type_diff = {
+    @staticmethod
+    def _empty_type_diff():
+        return {
             'new': {},
             'dropped': [],
             'modified': {}
         }
 
+    def _compare_object_type(self, source_objs, target_objs, is_table=False, source_fps=None, target_fps=None):
+        """
+        source_fps, target_fps: optional ({ name: fingerprint }, { sql schema: fingerprint })
+        of each side; objects of SQL schemas with equal fingerprints are skipped.
+        """
+        type_diff = self._empty_type_diff()
+        source_objects = target_objects = {}
+        if source_fps is not None:
+            (source_objects, source_schemas), (target_objects, target_schemas) = source_fps, target_fps
+            identical = {sql_schema for sql_schema, fingerprint in source_schemas.items()
+                         if target_schemas.get(sql_schema) == fingerprint}
+            if identical:
+                source_objs = {name: obj for name, obj in source_objs.items()
+                               if name.partition('.')[0] not in identical}
+                target_objs = {name: obj for name, obj in target_objs.items()
+                               if name.partition('.')[0] not in identical}
+
         # 1. New Objects
         for name, obj_def in source_objs.items():
             if name not in target_objs:
@@ -31,6 +84,9 @@ class SchemaComparer:
         # 3. Modified Objects
         for name, source_def in source_objs.items():
             if name in target_objs:
+                fingerprint = source_objects.get(name)
+                if fingerprint is not None and fingerprint == target_objects.get(name):
+                    continue
                 target_def = target_objs[name]
                 if is_table:
                     table_diff = self._compare_tables(source_def, target_def)
@@ -38,11 +94,24 @@ class SchemaComparer:
                         type_diff['modified'][name] = table_diff
                 else:
                     # Generic comparison for stored objects (by definition)
-                    if source_def['definition'] != target_def['definition']:
+                    if self._is_definition_different(source_def, target_def):
                          type_diff['modified'][name] = source_def
 
         return type_diff
 
+    def _is_definition_different(self, source_def, target_def):
+        # Hash-first mode only carries digests; fall back to hashing a full body
+        # when just one side was extracted that way.
+        source_hash = source_def.get('definition_hash')
+        target_hash = target_def.get('definition_hash')
+        if source_hash is None and target_hash is None:
+            return source_def['definition'] != target_def['definition']
+        if source_hash is None:
+            source_hash = definition_digest(source_def['definition'])
+        if target_hash is None:
+            target_hash = definition_digest(target_def['definition'])
+        return source_hash != target_hash
+
     def _compare_tables(self, source_table, target_table):
         changes = {
             'add_columns': {},
@@ -74,6 +143,9 @@ class SchemaComparer:
         return None
 
     def _is_column_different(self, source_col, target_col):
+        # Extracted column definitions are shared, so equal columns are usually the same object
+        if source_col is target_col:
+            return False
         # Compare extraction properties
         # type, nullable, length, precision, scale
         if source_col['type'] != target_col['type']:
@@ -1,6 +1,17 @@
 import json
 import os
 
+def data_directory(*parts):
+    """
+    Per-user directory for data kept between runs (snapshots, the definition
+    store), so it never depends on the directory Broono was started from.
+    """
+    if os.name == 'nt':
+        root = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local'), 'Broono')
+    else:
+        root = os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'broono')
+    return os.path.join(root, *parts)
+
 class ConfigManager:
     def __init__(self, filename="profiles.json"):
         self.filename = filename
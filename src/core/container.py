@@ -0,0 +1,231 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime
+from src.core.compare import definition_digest
+from src.core.model import Column, intern_name, json_default, record_from_dict, schema_from_dict, to_plain
+
+# Saved comparison container:
+#   header: MAGIC, index offset, index length
+#   blobs:  zlib-compressed UTF-8 definition bodies, each stored once
+#   index:  zlib-compressed JSON with the diff, both schemas (bodies replaced
+#           by blob numbers) and the (offset, length) of every blob
+MAGIC = b"BROONO\x00\x01"
+HEADER = struct.Struct("<8sQQ")
+FILE_EXTENSION = ".broono"
+# Unloaded bodies requested per fetch_definitions call while saving
+COPY_BATCH_SIZE = 500
+
+class DefinitionReader:
+    """
+    Reads the bodies of one side of a saved comparison on demand.
+    fetch_definitions matches SchemaExtractor.fetch_definitions, so
+    load_missing_definitions can hydrate from a file instead of a database.
+    """
+    def __init__(self, comparison, blobs_by_name):
+        self.comparison = comparison
+        self.blobs_by_name = blobs_by_name
+
+    def fetch_definitions(self, names):
+        definitions = {}
+        for name in names:
+            blob = self.blobs_by_name.get(name)
+            if blob is not None:
+                definitions[name] = self.comparison.read_blob(blob)
+        return definitions
+
+class SavedComparison:
+    """
+    A comparison opened from disk: diff, source_schema and target_schema.
+    Container files are memory-mapped; only the index is parsed on open and
+    stored objects come without bodies (definition None, definition_hash set).
+    definitions: { 'source'/'target': DefinitionReader } for those bodies.
+    Older JSON files are loaded whole and have no readers.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.definitions = {}
+        self._file = None
+        self._map = None
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+        if magic == MAGIC:
+            self._open_container()
+        else:
+            self._open_json()
+
+    def _open_json(self):
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        self.saved_at = data.get("saved_at")
+        self.diff = data.get("diff")
+        self.source_schema = data.get("source_schema")
+        self.target_schema = data.get("target_schema")
+        if not self.diff or not self.source_schema or not self.target_schema:
+            raise ValueError("Invalid comparison file format.")
+        self.source_schema = schema_from_dict(self.source_schema)
+        self.target_schema = schema_from_dict(self.target_schema)
+
+    def _open_container(self):
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, offset, length = HEADER.unpack_from(self._map, 0)
+        index = json.loads(zlib.decompress(self._map[offset:offset + length]))
+
+        self.saved_at = index['saved_at']
+        self.blobs = index['blobs']
+        self.source_schema, source_blobs = self._load_schema(index['source_schema'])
+        self.target_schema, target_blobs = self._load_schema(index['target_schema'])
+        self.definitions = {
+            'source': DefinitionReader(self, source_blobs),
+            'target': DefinitionReader(self, target_blobs)
+        }
+        self.diff = self._load_diff(index['diff'])
+
+    def _load_schema(self, index_schema):
+        blobs_by_name = {}
+        for category, objects in index_schema.items():
+            for name, entry in objects.items():
+                blob = entry.pop('definition_blob', None)
+                if blob is not None:
+                    blobs_by_name[name] = blob
+        return schema_from_dict(index_schema), blobs_by_name
+
+    def _load_diff(self, index_diff):
+        diff = {}
+        for category, changes in index_diff.items():
+            source_objects = self.source_schema[category]
+            diff[category] = {'new': {}, 'modified': {}, 'dropped': changes['dropped']}
+            for segment in ['new', 'modified']:
+                for name, entry in changes[segment].items():
+                    name = intern_name(name)
+                    if entry is None: # The source schema's object
+                        diff[category][segment][name] = source_objects[name]
+                    elif category == 'tables' and segment == 'modified':
+                        diff[category][segment][name] = {
+                            'add_columns': _columns(entry['add_columns']),
+                            'alter_columns': _columns(entry['alter_columns']),
+                            'drop_columns': entry['drop_columns']
+                        }
+                    else:
+                        blob = entry.pop('definition_blob', None)
+                        if blob is not None:
+                            entry['definition'] = self.read_blob(blob)
+                        diff[category][segment][name] = record_from_dict(category, entry)
+        return diff
+
+    def read_blob(self, blob):
+        offset, length = self.blobs[blob]
+        return zlib.decompress(self._map[offset:offset + length]).decode('utf-8')
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+def _columns(plain_columns):
+    return {intern_name(name): Column.make(col['type'], col['nullable'], col['length'],
+                                           col['precision'], col['scale'])
+            for name, col in plain_columns.items()}
+
+class _BlobWriter:
+    """Appends each distinct body once and remembers its (offset, length)."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.blobs = []
+        self._ids = {} # SHA-1 of the body -> blob number
+
+    def store(self, definition):
+        data = definition.encode('utf-8')
+        key = hashlib.sha1(data).digest()
+        blob = self._ids.get(key)
+        if blob is None:
+            compressed = zlib.compress(data)
+            blob = self._ids[key] = len(self.blobs)
+            self.blobs.append((self.stream.tell(), len(compressed)))
+            self.stream.write(compressed)
+        return blob
+
+def _index_object(category, obj, writer):
+    entry = to_plain(obj)
+    if category != 'tables':
+        definition = entry.pop('definition', None)
+        if definition is not None:
+            entry['definition_blob'] = writer.store(definition)
+            if entry.get('definition_hash') is None:
+                # Lets the loaded object be recognised as having a body to fetch
+                entry['definition_hash'] = definition_digest(definition)
+    return entry
+
+def _index_schema(schema, writer, fetcher=None, store=None):
+    index = {}
+    for category, objects in schema.items():
+        entries = index[category] = {}
+        unloaded = []
+        for name, obj in objects.items():
+            entry = entries[name] = _index_object(category, obj, writer)
+            if category == 'tables' or 'definition_blob' in entry:
+                continue
+            definition = store.get(entry.get('definition_hash')) if store is not None else None
+            if definition is not None:
+                entry['definition_blob'] = writer.store(definition)
+            elif fetcher is not None:
+                unloaded.append(name)
+        # Bodies never loaded are fetched in batches
+        for start in range(0, len(unloaded), COPY_BATCH_SIZE):
+            for name, definition in fetcher.fetch_definitions(unloaded[start:start + COPY_BATCH_SIZE]).items():
+                entries[name]['definition_blob'] = writer.store(definition)
+    return index
+
+def _index_diff(diff, source_schema, writer):
+    index = {}
+    for category, changes in diff.items():
+        source_objects = source_schema.get(category, {})
+        entry = index[category] = {'new': {}, 'modified': {}, 'dropped': list(changes['dropped'])}
+        for segment in ['new', 'modified']:
+            for name, details in changes[segment].items():
+                if source_objects.get(name) is details:
+                    entry[segment][name] = None # Stored once, in the source schema
+                elif category == 'tables' and segment == 'modified':
+                    entry[segment][name] = to_plain(details)
+                else:
+                    entry[segment][name] = _index_object(category, details, writer)
+    return index
+
+def save_comparison(path, diff, source_schema, target_schema, definitions=None, store=None, before_replace=None):
+    """
+    Writes a comparison in the container format.
+    definitions: optional { 'source'/'target': object with fetch_definitions(names) }
+    supplying the bodies of objects loaded without them: the DefinitionReader
+    of an earlier file, or a SchemaExtractor of the database.
+    store: optional DefinitionStore consulted for those bodies first.
+    before_replace: optional callable run once everything is written, before
+    the new file replaces path; e.g. to close a SavedComparison open on path,
+    which can't be replaced while it is mapped on Windows.
+    """
+    definitions = definitions or {}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        writer = _BlobWriter(f)
+        index = {
+            'saved_at': datetime.now().isoformat(),
+            'source_schema': _index_schema(source_schema, writer, definitions.get('source'), store),
+            'target_schema': _index_schema(target_schema, writer, definitions.get('target'), store),
+            'diff': _index_diff(diff, source_schema, writer)
+        }
+        index['blobs'] = writer.blobs
+        data = zlib.compress(json.dumps(index, default=json_default).encode('utf-8'))
+        offset = f.tell()
+        f.write(data)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, offset, len(data)))
+    if before_replace:
+        before_replace()
+    # Write then rename so an interrupted save never leaves a truncated file
+    os.replace(tmp_path, path)
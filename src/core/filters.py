@@ -0,0 +1,214 @@
+import re
+import threading
+
+OBJECT_TYPES = ['tables', 'procedures', 'functions', 'triggers']
+
+class ObjectFilter:
+    """
+    Include and exclude rules for 'schema.name' objects, one per line:
+
+        dbo.Users             exact name
+        sales.*               pattern: * and % match any text, ? one character
+        re:dbo[.]usp_[0-9]+   regular expression matching the whole name
+        !dbo.tmp*             exclude rule: any of the above prefixed with !
+        # comment
+
+    An object is selected when it matches an include rule (or there are only
+    exclude rules) and no exclude rule. Matching ignores case, like the default
+    SQL Server collation; '_' is a literal character, unlike in LIKE.
+    Exact names are looked up in a dict and the wildcard patterns of each kind
+    run as one compiled alternation, so matching costs one lookup and at most
+    two regex matches per name however long the list is. re: rules are matched
+    one by one, as their groups and inline flags only mean what the user wrote
+    in a pattern of their own.
+    """
+    def __init__(self, rules=(), names=()):
+        """
+        rules: rule strings in the syntax above.
+        names: exact names to include, taken literally.
+        """
+        self.rules = []
+        self._exact = ({}, {}) # [include, exclude]: { lowercase name: rule index }
+        self._like = [] # LIKE patterns of the include patterns, None once one has no LIKE form
+        self._regexes = ([], []) # [include, exclude]: [(rule index, compiled re: rule)] in rule order
+        alternatives = ([], [])
+        for text in rules:
+            self._add_rule(text, alternatives)
+        for name in names:
+            self._add_exact(name, name, False)
+        self._patterns = tuple(re.compile("|".join(group), re.IGNORECASE) if group else None
+                               for group in alternatives)
+        self._has_includes = any(not excluded for _, excluded in self.rules)
+        self.hits = [0] * len(self.rules)
+        self._hits_lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, lines):
+        """Builds a filter from lines of rules, skipping blank lines and # comments."""
+        rules = [line.strip() for line in lines]
+        return cls([rule for rule in rules if rule and not rule.startswith('#')])
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r') as f:
+            return cls.parse(f)
+
+    @classmethod
+    def of(cls, value):
+        """
+        Returns value as an ObjectFilter, or None when it selects everything.
+        A set or list of names is taken as exact names.
+        """
+        if not value:
+            return None
+        if isinstance(value, ObjectFilter):
+            return value
+        return cls(names=value)
+
+    def _add_rule(self, text, alternatives):
+        excluded = text.startswith('!')
+        body = text[1:].strip() if excluded else text
+        if body.startswith('re:'):
+            try:
+                pattern = re.compile(body[3:], re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid object filter rule '{text}': {e}")
+            self._regexes[excluded].append((len(self.rules), pattern))
+            like = None
+        elif any(wildcard in body for wildcard in '*%?'):
+            regex = "".join('.*' if c in '*%' else '.' if c == '?' else re.escape(c) for c in body)
+            like = "".join('%' if c in '*%' else '_' if c == '?' else '\\' + c if c in '_[\\' else c for c in body)
+            # Named groups tell which rule matched: the outermost group closes last
+            alternatives[excluded].append(f"(?P<_rule{len(self.rules)}>{regex})")
+        else:
+            self._add_exact(text, body, excluded)
+            return
+        self.rules.append((text, excluded))
+        if not excluded and self._like is not None:
+            self._like = self._like + [like] if like is not None else None
+
+    def _add_exact(self, text, name, excluded):
+        self._exact[excluded].setdefault(name.lower(), len(self.rules))
+        self.rules.append((text, excluded))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __contains__(self, name):
+        return self.matches(name)
+
+    def matches(self, name, record=False):
+        """
+        Whether the filter selects name. record: count the hit against the
+        include rule that selected it, or the exclude rule that removed it.
+        """
+        rule = None
+        if self._has_includes:
+            rule = self._rule_for(name, False)
+            if rule is None:
+                return False
+        excluding_rule = self._rule_for(name, True)
+        if record and (rule is not None or excluding_rule is not None):
+            with self._hits_lock:
+                self.hits[excluding_rule if excluding_rule is not None else rule] += 1
+        return excluding_rule is None
+
+    def _rule_for(self, name, excluded):
+        rule = self._exact[excluded].get(name.lower())
+        if rule is not None:
+            return rule
+        if self._patterns[excluded] is not None:
+            match = self._patterns[excluded].fullmatch(name)
+            if match:
+                rule = int(match.lastgroup[len('_rule'):])
+        # The first matching rule wins, as within the alternation
+        for index, pattern in self._regexes[excluded]:
+            if rule is not None and index > rule:
+                break
+            if pattern.fullmatch(name):
+                return index
+        return rule
+
+    @property
+    def names(self):
+        """Exact names of the include rules."""
+        return [self.rules[index][0] for index in self._exact[False].values()]
+
+    def like_patterns(self):
+        """
+        LIKE patterns (escaped with '\\') of the include rules other than exact
+        names, for narrowing a query on the full 'schema.name'. None when every
+        object has to be read instead: a rule has no LIKE form (regexes) or there
+        are no include rules.
+        """
+        if not self._has_includes or self._like is None:
+            return None
+        return list(self._like)
+
+    def reset_hits(self):
+        with self._hits_lock:
+            self.hits = [0] * len(self.rules)
+
+    def hit_counts(self):
+        """[(rule, 'include' or 'exclude', hits)] in rule order."""
+        with self._hits_lock:
+            hits = list(self.hits)
+        return [(text, 'exclude' if excluded else 'include', count)
+                for (text, excluded), count in zip(self.rules, hits)]
+
+    def format_hits(self):
+        """Returns the hit counts as text, one rule per line; rules without hits are marked."""
+        lines = []
+        for text, kind, count in self.hit_counts():
+            lines.append(f"{count:>8}  {kind:<7}  {text}" + ("  (no hits)" if not count else ""))
+        return "\n".join(lines)
+
+def empty_diff():
+    return {obj_type: {'new': {}, 'modified': {}, 'dropped': []} for obj_type in OBJECT_TYPES}
+
+def apply_object_filter(schema, object_filter):
+    """
+    Restricts the schema to only include objects present in object_filter
+    (a set of names or an ObjectFilter).
+    """
+    filtered_schema = {}
+    for obj_type in OBJECT_TYPES:
+        filtered_schema[obj_type] = {
+            name: details for name, details in schema[obj_type].items() 
+            if name in object_filter
+        }
+    return filtered_schema
+
+def apply_date_filter(diff, source_schema, cutoff_date):
+    """Filters the diff to include only objects modified on or after cutoff_date.
+       Note: Dropped objects are kept because they don't exist in source to have a date."""
+    filtered_diff = empty_diff()
+
+    for category in OBJECT_TYPES:
+        # 1. New Objects
+        for name, details in diff[category]['new'].items():
+            # For new objects, the details ARE the schema definition from source
+            # schema.py puts modify_date in the definition
+            obj_date = details.get('modify_date') 
+            if obj_date and obj_date >= cutoff_date:
+                filtered_diff[category]['new'][name] = details
+
+        # 2. Modified Objects
+        for name, changes in diff[category]['modified'].items():
+            # For modified objects, we look up the object in source_schema to find its date
+            source_obj = source_schema[category].get(name)
+            if source_obj:
+                obj_date = source_obj.get('modify_date')
+                if obj_date and obj_date >= cutoff_date:
+                    filtered_diff[category]['modified'][name] = changes
+
+        # 3. Dropped Objects - INCLUDED
+        # Dropped objects are only in Target, so "Source Date" filter doesn't apply to them.
+        # We include them so the user sees all changes except those EXPLICITLY filtered out by source date.
+        if diff[category]['dropped']:
+            filtered_diff[category]['dropped'] = list(diff[category]['dropped'])
+        
+    return filtered_diff
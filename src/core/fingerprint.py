@@ -0,0 +1,108 @@
+import hashlib
+from src.core.compare import definition_digest
+from src.core.filters import OBJECT_TYPES
+from src.core.model import Column
+
+def _combine(entries):
+    """Digest of (name, fingerprint) pairs in name order."""
+    h = hashlib.blake2b(digest_size=16)
+    for name, fingerprint in sorted(entries):
+        h.update(name.encode('utf-8'))
+        h.update(b"\x00")
+        h.update(fingerprint)
+    return h.digest()
+
+def _sql_schema(name):
+    return name.partition('.')[0]
+
+class SchemaFingerprint:
+    """
+    Hierarchical fingerprints of a schema (get_full_schema structure):
+    database -> category -> SQL schema -> object. A table's fingerprint
+    covers its column set, a module's its definition digest. They cover
+    exactly what SchemaComparer compares (not modify_date or module types),
+    so equal fingerprints mean that subtree has no differences.
+        digest: the database's fingerprint
+        categories: { category: fingerprint }
+        schemas: { category: { sql schema: fingerprint } }
+        objects: { category: { 'schema.name': fingerprint } }
+    """
+    def __init__(self, schema, known=None):
+        """
+        known: optional SchemaFingerprint whose object fingerprints are reused
+               for objects of the same name (e.g. of the schema before an object
+               filter was applied to it).
+        """
+        self.objects = {}
+        self.schemas = {}
+        self.categories = {}
+        # Column definitions are shared records, so each distinct one is encoded once
+        # per fingerprint: { id(column): (column, encoded) }, the reference keeping ids valid
+        column_parts = {}
+        for category in OBJECT_TYPES:
+            objects = schema.get(category, {})
+            known_objects = known.objects.get(category, {}) if known is not None else {}
+            fingerprints = self.objects[category] = {}
+            grouped = {}
+            for name, obj in objects.items():
+                fingerprint = known_objects.get(name)
+                if fingerprint is None:
+                    fingerprint = self._table(obj, column_parts) if category == 'tables' else self._module(obj)
+                fingerprints[name] = fingerprint
+                grouped.setdefault(_sql_schema(name), []).append((name, fingerprint))
+            self.schemas[category] = {sql_schema: _combine(entries) for sql_schema, entries in grouped.items()}
+            self.categories[category] = _combine(self.schemas[category].items())
+        self.digest = _combine(self.categories.items())
+
+    def restrict(self, schema):
+        """Fingerprint of a subset of the fingerprinted schema (e.g. object-filtered)."""
+        return SchemaFingerprint(schema, known=self)
+
+    @property
+    def hexdigest(self):
+        return self.digest.hex()
+
+    def differences(self, other):
+        """
+        { category: [sql schema, ...] } of the subtrees whose fingerprints differ
+        from other's, found without looking at any object.
+        """
+        differences = {}
+        for category, fingerprint in self.categories.items():
+            if other.categories.get(category) == fingerprint:
+                continue
+            schemas, other_schemas = self.schemas[category], other.schemas.get(category, {})
+            differences[category] = sorted(sql_schema for sql_schema in schemas.keys() | other_schemas.keys()
+                                           if schemas.get(sql_schema) != other_schemas.get(sql_schema))
+        return differences
+
+    @staticmethod
+    def _table(table, cache):
+        chunks = []
+        for name, column in sorted(table['columns'].items()):
+            entry = cache.get(id(column))
+            if entry is None or entry[0] is not column:
+                entry = (column, f"\x00{column['type']}\x00{column['nullable']}\x00{column['length']}"
+                                 f"\x00{column['precision']}\x00{column['scale']}\x01")
+                if isinstance(column, Column):
+                    cache[id(column)] = entry
+            chunks.append(name)
+            chunks.append(entry[1])
+        return hashlib.blake2b("".join(chunks).encode('utf-8'), digest_size=16).digest()
+
+    @staticmethod
+    def _module(obj):
+        # Server digests and digests of downloaded bodies agree, so either side may be hash-only
+        digest = obj.get('definition_hash') or definition_digest(obj.get('definition')) or ""
+        return digest.encode('ascii')
+
+def group_by_fingerprint(fingerprints):
+    """
+    fingerprints: { database: SchemaFingerprint }
+    Returns [[database, ...], ...]: databases with identical schemas together,
+    largest group first.
+    """
+    groups = {}
+    for database, fingerprint in fingerprints.items():
+        groups.setdefault(fingerprint.digest, []).append(database)
+    return sorted(groups.values(), key=lambda databases: -len(databases))
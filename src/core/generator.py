@@ -1,24 +1,67 @@
 import re
+from src.core import profiling
 
 class ScriptGenerator:
+    # Approximate characters per batch yielded by iter_script
+    BATCH_CHARS = 1 << 20
+
     def generate(self, diff):
-        script_parts = []
-        
+        """Returns the whole script as one string. Prefer iter_script/write for large diffs."""
+        with profiling.span("generate", "generate"):
+            return "".join(self.iter_script(diff))
+
+    def iter_script(self, diff, batch_chars=BATCH_CHARS):
+        """
+        Yields the script in batches of roughly batch_chars characters, so only
+        one batch is held in memory. "".join(batches) equals generate(diff).
+        """
+        batch = []
+        size = 0
+        first = True
+        for part in self.iter_parts(diff):
+            batch.append(part)
+            size += len(part)
+            if size >= batch_chars:
+                yield ("" if first else "\n") + "\n".join(batch)
+                first = False
+                batch = []
+                size = 0
+        if batch:
+            yield ("" if first else "\n") + "\n".join(batch)
+
+    def write(self, diff, stream, progress=None):
+        """
+        Writes the script to a text stream batch by batch.
+        progress: optional callable receiving the characters written so far.
+        Returns the number of characters written.
+        """
+        written = 0
+        with profiling.span("write script", "generate") as span:
+            for batch in self.iter_script(diff):
+                stream.write(batch)
+                written += len(batch)
+                if progress:
+                    progress(written)
+            span.add(chars=written)
+        return written
+
+    def iter_parts(self, diff):
+        """Yields the script statements in order; the script joins them with newlines."""
         # 1. Tables
         table_diff = diff['tables']
         for table_name, table_def in table_diff['new'].items():
-            script_parts.append(self._generate_create_table(table_name, table_def))
+            yield self._generate_create_table(table_name, table_def)
             
         for table_name, changes in table_diff['modified'].items():
             for col_name, col_def in changes['add_columns'].items():
-                script_parts.append(self._generate_add_column(table_name, col_name, col_def))
+                yield self._generate_add_column(table_name, col_name, col_def)
             for col_name, col_def in changes['alter_columns'].items():
-                script_parts.append(self._generate_alter_column(table_name, col_name, col_def))
+                yield self._generate_alter_column(table_name, col_name, col_def)
             for col_name in changes['drop_columns']:
-                script_parts.append(self._generate_drop_column(table_name, col_name))
+                yield self._generate_drop_column(table_name, col_name)
                 
         for table_name in table_diff['dropped']:
-            script_parts.append(f"-- DROP TABLE {table_name};\n")
+            yield f"-- DROP TABLE {table_name};\n"
 
         # 2. Stored Objects (Procs, Funcs, Triggers)
         for obj_type in ['procedures', 'functions', 'triggers']:
@@ -26,18 +69,22 @@ class ScriptGenerator:
             
             # New or Modified
             for name, obj_def in obj_diff['new'].items():
-                script_parts.append(f"-- NEW {obj_type.upper()}: {name}")
-                script_parts.append(obj_def['definition'] + "\nGO\n")
+                yield f"-- NEW {obj_type.upper()}: {name}"
+                if obj_def['definition'] is None: # Compared by hash and the body couldn't be fetched
+                    yield f"-- definition unavailable for {name}\n"
+                    continue
+                yield obj_def['definition'] + "\nGO\n"
                 
             for name, obj_def in obj_diff['modified'].items():
-                script_parts.append(f"-- MODIFY {obj_type.upper()}: {name}")
+                yield f"-- MODIFY {obj_type.upper()}: {name}"
+                if obj_def['definition'] is None:
+                    yield f"-- definition unavailable for {name}\n"
+                    continue
                 alt_def = self._make_alter(obj_def['definition'])
-                script_parts.append(alt_def + "\nGO\n")
+                yield alt_def + "\nGO\n"
 
             for name in obj_diff['dropped']:
-                script_parts.append(f"-- DROP {obj_type[:-1].upper()}: {name};\n")
-
-        return "\n".join(script_parts)
+                yield f"-- DROP {obj_type[:-1].upper()}: {name};\n"
 
     def _make_alter(self, definition):
         # Very simple replacement for the first occurrence of CREATE with ALTER
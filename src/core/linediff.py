@@ -0,0 +1,283 @@
+import difflib
+import json
+import multiprocessing
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.core.model import Record, json_default, to_plain
+
+# Objects diffed per process pool task; amortises pickling and scheduling
+BATCH_SIZE = 20
+# Longer lines are shown as wholly changed instead of diffed character by character
+INTRALINE_MAX_LENGTH = 1000
+
+def format_definition(details):
+    """Text shown in the diff view: the body of stored objects, JSON for tables."""
+    if details is None:
+        return ""
+    if isinstance(details, Record):
+        details = to_plain(details)
+    if isinstance(details, dict) and 'definition' in details:
+        if details['definition'] is None:
+            return ""
+        return str(details['definition'])
+    if isinstance(details, dict):
+        return json.dumps(details, indent=4, default=json_default)
+    return str(details)
+
+class LineDiff:
+    """
+    Line-level difference between two texts. opcodes are SequenceMatcher
+    opcodes over the texts' splitlines(); added/removed count changed lines.
+    """
+    __slots__ = ('opcodes', 'added', 'removed')
+
+    def __init__(self, opcodes, added, removed):
+        self.opcodes = opcodes
+        self.added = added
+        self.removed = removed
+
+    @property
+    def stats(self):
+        return self.added, self.removed
+
+def _unique_lcs(a, alo, ahi, b, blo, bhi):
+    """
+    Longest increasing run of (i, j) pairs of lines that occur exactly once in
+    both a[alo:ahi] and b[blo:bhi] (patience sorting).
+    """
+    def unique_positions(seq, lo, hi):
+        positions = {}
+        for i in range(lo, hi):
+            positions[seq[i]] = -1 if seq[i] in positions else i
+        return positions
+
+    in_a = unique_positions(a, alo, ahi)
+    in_b = unique_positions(b, blo, bhi)
+    pairs = sorted((i, in_b[line]) for line, i in in_a.items() if i >= 0 and in_b.get(line, -1) >= 0)
+
+    tails = [] # Smallest j ending an increasing run of each length
+    tail_pairs = []
+    previous = [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_pairs.append(k)
+        else:
+            tails[pos] = j
+            tail_pairs[pos] = k
+        previous[k] = tail_pairs[pos - 1] if pos else None
+
+    run = []
+    k = tail_pairs[-1] if tail_pairs else None
+    while k is not None:
+        run.append(pairs[k])
+        k = previous[k]
+    return run[::-1]
+
+def patience_opcodes(a, b):
+    """
+    Patience diff of two line lists. Lines are replaced by integer ids first,
+    so every comparison is an int comparison. Regions without unique common
+    lines fall back to SequenceMatcher. Returns SequenceMatcher-style opcodes.
+    """
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in a]
+    b = [ids.setdefault(line, len(ids)) for line in b]
+
+    matches = [] # (i, j) of matching lines
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        # 1. Common prefix and suffix
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        # 2. Unique lines anchor the alignment; the gaps between them are diffed the same way
+        anchors = _unique_lcs(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi])
+            for i, j, n in matcher.get_matching_blocks():
+                matches.extend((alo + i + k, blo + j + k) for k in range(n))
+            continue
+        i_start, j_start = alo, blo
+        for i, j in anchors:
+            regions.append((i_start, i, j_start, j))
+            matches.append((i, j))
+            i_start, j_start = i + 1, j + 1
+        regions.append((i_start, ahi, j_start, bhi))
+
+    # 3. Matches -> opcodes
+    matches.sort()
+    matches.append((len(a), len(b))) # Sentinel
+    opcodes = []
+    i = j = 0
+    for ai, bj in matches:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, j))
+        elif j < bj:
+            opcodes.append(('insert', i, i, j, bj))
+        if ai < len(a):
+            if opcodes and opcodes[-1][0] == 'equal':
+                _, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = ('equal', i1, ai + 1, j1, bj + 1)
+            else:
+                opcodes.append(('equal', ai, ai + 1, bj, bj + 1))
+        i, j = ai + 1, bj + 1
+    return opcodes
+
+def compute_line_diff(old_text, new_text):
+    opcodes = patience_opcodes(old_text.splitlines(), new_text.splitlines())
+    added = sum(j2 - j1 for tag, _, _, j1, j2 in opcodes if tag in ('replace', 'insert'))
+    removed = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag in ('replace', 'delete'))
+    return LineDiff(opcodes, added, removed)
+
+def intraline_spans(old_line, new_line):
+    """
+    Character ranges that differ between two versions of a line.
+    Returns ([(start, length)] in old_line, [(start, length)] in new_line);
+    both empty when the lines are too long or too different to be worth marking.
+    """
+    if len(old_line) > INTRALINE_MAX_LENGTH or len(new_line) > INTRALINE_MAX_LENGTH:
+        return [], []
+    matcher = difflib.SequenceMatcher(None, old_line, new_line, autojunk=False)
+    if matcher.real_quick_ratio() < 0.3 or matcher.ratio() < 0.3:
+        return [], []
+    old_spans = []
+    new_spans = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ('replace', 'delete'):
+            old_spans.append((i1, i2 - i1))
+        if tag in ('replace', 'insert'):
+            new_spans.append((j1, j2 - j1))
+    return old_spans, new_spans
+
+class SideBySide:
+    """
+    Aligns two texts row by row for a side-by-side view. Each side has one
+    line per row ('' for filler rows) and a kind per row: 'equal', 'removed'
+    (left), 'added' (right) or 'filler'. hunks lists the first row of each
+    change. Intra-line spans are computed on first request per row.
+    """
+    def __init__(self, old_text, new_text, opcodes):
+        old_lines = old_text.splitlines()
+        new_lines = new_text.splitlines()
+        self.left_lines = []
+        self.right_lines = []
+        self.left_kinds = []
+        self.right_kinds = []
+        self.hunks = []
+        self._pairs = {} # row -> (old line, new line) of replaced lines
+        self._spans = {}
+
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                self.left_lines.extend(old_lines[i1:i2])
+                self.right_lines.extend(new_lines[j1:j2])
+                self.left_kinds.extend(['equal'] * (i2 - i1))
+                self.right_kinds.extend(['equal'] * (j2 - j1))
+                continue
+            self.hunks.append(len(self.left_lines))
+            for k in range(max(i2 - i1, j2 - j1)):
+                has_old = i1 + k < i2
+                has_new = j1 + k < j2
+                if has_old and has_new:
+                    self._pairs[len(self.left_lines)] = (old_lines[i1 + k], new_lines[j1 + k])
+                self.left_lines.append(old_lines[i1 + k] if has_old else "")
+                self.left_kinds.append('removed' if has_old else 'filler')
+                self.right_lines.append(new_lines[j1 + k] if has_new else "")
+                self.right_kinds.append('added' if has_new else 'filler')
+
+    def intraline(self, row):
+        """Returns (left spans, right spans) for row; empty unless it is a replaced line."""
+        spans = self._spans.get(row)
+        if spans is None:
+            pair = self._pairs.get(row)
+            spans = self._spans[row] = intraline_spans(*pair) if pair else ([], [])
+        return spans
+
+def _diff_batch(pairs):
+    # Runs in a pool process; plain tuples keep the result cheap to pickle
+    results = []
+    for key, old_text, new_text in pairs:
+        line_diff = compute_line_diff(old_text, new_text)
+        results.append((key, line_diff.opcodes, line_diff.added, line_diff.removed))
+    return results
+
+class LineDiffCache:
+    """
+    Thread-safe LRU cache of LineDiff results keyed by (category, name).
+    The (added, removed) counts are kept for every object ever stored, so
+    they outlive evicted entries.
+    """
+    DEFAULT_MAX_ENTRIES = 500
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            line_diff = self._entries.get(key)
+            if line_diff is not None:
+                self._entries.move_to_end(key)
+            return line_diff
+
+    def put(self, key, line_diff):
+        with self._lock:
+            self._entries[key] = line_diff
+            self._entries.move_to_end(key)
+            self._stats[key] = line_diff.stats
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def line_stats(self):
+        """Returns a copy of { key: (added, removed) }."""
+        with self._lock:
+            return dict(self._stats)
+
+    def __len__(self):
+        return len(self._entries)
+
+def precompute_line_diffs(pairs, cache, workers=None, on_batch=None, cancel_token=None):
+    """
+    Diffs pairs of (key, old_text, new_text) in a process pool and stores the
+    results in cache. on_batch() is called after each finished batch.
+    Returns the number of objects diffed.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return 0
+    batches = [pairs[i:i + BATCH_SIZE] for i in range(0, len(pairs), BATCH_SIZE)]
+    # Leave a core for the UI; spawn avoids forking a process with GUI threads
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    pool = ProcessPoolExecutor(min(workers, len(batches)), mp_context=multiprocessing.get_context('spawn'))
+    done = 0
+    try:
+        futures = [pool.submit(_diff_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            if cancel_token:
+                cancel_token.check()
+            for key, opcodes, added, removed in future.result():
+                cache.put(key, LineDiff(opcodes, added, removed))
+                done += 1
+            if on_batch:
+                on_batch()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return done
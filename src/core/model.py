@@ -0,0 +1,139 @@
+import sys
+from datetime import datetime, date
+
+class Record:
+    """
+    Base for the compact schema records. Values live in __slots__ instead of a
+    per-object dict, but the dict-style access used throughout the code base
+    (obj['type'], obj.get('modify_date'), 'definition' in obj) keeps working.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def get(self, key, default=None):
+        if key not in self._fields:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return self._fields
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self._fields]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.items() == other.items()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({values})"
+
+class Column(Record):
+    """
+    Column definition. Identical definitions are shared through Column.make,
+    so instances must be treated as immutable.
+    """
+    __slots__ = ('type', 'nullable', 'length', 'precision', 'scale')
+    _fields = __slots__
+    _cache = {}
+
+    def __init__(self, type, nullable, length, precision, scale):
+        self.type = type
+        self.nullable = nullable
+        self.length = length
+        self.precision = precision
+        self.scale = scale
+
+    @classmethod
+    def make(cls, type, nullable, length, precision, scale):
+        key = (type, nullable, length, precision, scale)
+        column = cls._cache.get(key)
+        if column is None:
+            column = cls._cache.setdefault(key, cls(sys.intern(type), nullable, length, precision, scale))
+        return column
+
+    def __hash__(self):
+        return hash((self.type, self.nullable, self.length, self.precision, self.scale))
+
+    def __setitem__(self, key, value):
+        raise TypeError("Column definitions are shared and cannot be modified")
+
+class Table(Record):
+    __slots__ = ('columns', 'modify_date')
+    _fields = __slots__
+
+    def __init__(self, columns, modify_date=None):
+        self.columns = columns
+        self.modify_date = modify_date
+
+class StoredObject(Record):
+    """Procedure, function or trigger. definition is None until loaded in hash-first mode."""
+    __slots__ = ('definition', 'type', 'modify_date', 'definition_hash', 'definition_length')
+    _fields = __slots__
+
+    def __init__(self, definition, type, modify_date=None, definition_hash=None, definition_length=None):
+        self.definition = definition
+        self.type = sys.intern(type) if type else type
+        self.modify_date = modify_date
+        self.definition_hash = definition_hash
+        self.definition_length = definition_length
+
+def intern_name(name):
+    """Interns object and column names so source and target share one copy."""
+    return sys.intern(name)
+
+def to_plain(obj):
+    """Recursively converts records to plain dicts (e.g. for JSON)."""
+    if isinstance(obj, Record):
+        return {field: to_plain(value) for field, value in obj.items()}
+    if isinstance(obj, dict):
+        return {key: to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [to_plain(value) for value in obj]
+    return obj
+
+def json_default(obj):
+    """json.dump default= hook for records and datetimes."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+def record_from_dict(category, details):
+    """Builds the record for one object of a plain (e.g. JSON-loaded) schema."""
+    if category == 'tables':
+        columns = {intern_name(name): Column.make(col['type'], col['nullable'], col['length'],
+                                                  col['precision'], col['scale'])
+                   for name, col in details['columns'].items()}
+        return Table(columns, details.get('modify_date'))
+    return StoredObject(details.get('definition'), details.get('type'), details.get('modify_date'),
+                        details.get('definition_hash'), details.get('definition_length'))
+
+def schema_from_dict(schema):
+    """Converts a plain schema dict (get_full_schema structure) to records."""
+    return {
+        category: {intern_name(name): record_from_dict(category, details)
+                   for name, details in objects.items()}
+        for category, objects in schema.items()
+    }
@@ -0,0 +1,216 @@
+import threading
+from src.core import profiling
+from src.core.compare import SchemaComparer
+from src.core.container import DefinitionReader
+from src.core.filters import ObjectFilter, apply_object_filter, apply_date_filter
+from src.db.parallel import ParallelExtractor, DEFAULT_WORKERS
+from src.db.schema import SchemaExtractor
+
+class OperationCancelled(Exception):
+    pass
+
+class CancelToken:
+    """
+    Shared cancellation flag. Callbacks registered with add_callback run once
+    when cancel() is called (e.g. DbConnector.cancel to abort running queries).
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        if self._event.is_set():
+            raise OperationCancelled("Operation cancelled.")
+
+STORED_OBJECT_TYPES = ['procedures', 'functions', 'triggers']
+# Bodies requested per fetch_definitions call by load_missing_definitions
+DEFINITION_BATCH_SIZE = 500
+
+def load_missing_definitions(schema, connector, names_by_category, cancel_token=None, store=None):
+    """
+    Fetches the bodies of digest-only objects in schema, DEFINITION_BATCH_SIZE at a time.
+    connector: the schema's database, or a DefinitionReader of a saved comparison
+    names_by_category: { category: iterable of 'schema.name' }
+    store: optional DefinitionStore; bodies it holds are not fetched, and fetched
+           ones are added to it.
+    Returns the number of definitions loaded.
+    """
+    missing = {}
+    for category, names in names_by_category.items():
+        for name in names:
+            obj = schema[category].get(name)
+            if obj is not None and obj.get('definition') is None and obj.get('definition_hash'):
+                missing[name] = category
+    if not missing:
+        return 0
+
+    with profiling.span("load definitions", "pipeline", requested=len(missing)) as span:
+        stored = 0
+        if store is not None:
+            for name, category in list(missing.items()):
+                obj = schema[category][name]
+                definition = store.get(obj['definition_hash'])
+                if definition is not None:
+                    obj['definition'] = definition
+                    del missing[name]
+                    stored += 1
+
+        # Module names are unique per SQL schema across all object types
+        fetcher = connector if isinstance(connector, DefinitionReader) else SchemaExtractor(connector)
+        names = list(missing)
+        fetched = 0
+        for start in range(0, len(names), DEFINITION_BATCH_SIZE):
+            if cancel_token:
+                cancel_token.check()
+            definitions = fetcher.fetch_definitions(names[start:start + DEFINITION_BATCH_SIZE])
+            for name, definition in definitions.items():
+                if name in missing:
+                    if store is not None:
+                        _, definition = store.put(definition)
+                    schema[missing[name]][name]['definition'] = definition
+            fetched += len(definitions)
+        span.add(fetched=fetched, from_store=stored)
+    return stored + fetched
+
+class ComparisonPipeline:
+    """
+    Extraction -> object filter -> comparison -> date filter, without any UI.
+    progress: optional callable receiving status messages.
+    object_filter: optional ObjectFilter (or set of 'schema.name'); only the objects
+                   it selects are extracted, and the extracted schemas are filtered
+                   exactly. Its hit counts cover the last run.
+    cutoff_date: optional datetime; only changes made on or after it are reported.
+                 Extraction skips source objects older than it and target objects
+                 the filtered diff can't include.
+    digests_only: extract only the metadata of stored objects (type, modify_date,
+                  definition hash and length) and compare them by hash.
+    lazy_definitions: with digests_only, leave every body unloaded instead of
+                      fetching the changed source bodies; callers load the ones
+                      they need with load_missing_definitions.
+    definition_store: optional DefinitionStore that extraction writes bodies into
+                      and that unloaded bodies are read from before the database.
+    """
+    def __init__(self, workers=DEFAULT_WORKERS, bulk_columns=True, object_filter=None,
+                 cutoff_date=None, progress=None, cancel_token=None, snapshot_cache=None,
+                 digests_only=False, lazy_definitions=False, definition_store=None):
+        self.workers = workers
+        self.bulk_columns = bulk_columns
+        self.object_filter = ObjectFilter.of(object_filter)
+        self.cutoff_date = cutoff_date
+        self.progress = progress
+        self.cancel_token = cancel_token or CancelToken()
+        self.snapshot_cache = snapshot_cache
+        self.digests_only = digests_only
+        self.lazy_definitions = lazy_definitions
+        self.definition_store = definition_store
+        self.extraction_report = ""
+
+    def run(self, source_connector, target_connector):
+        """Returns (source_schema, target_schema, diff)."""
+        token = self.cancel_token
+        token.add_callback(source_connector.cancel)
+        token.add_callback(target_connector.cancel)
+        if self.object_filter:
+            self.object_filter.reset_hits()
+
+        self.report_progress("Extracting schemas...")
+        extractor = self.make_extractor()
+        try:
+            source_schema, target_schema = extractor.extract_pair(source_connector, target_connector)
+        except Exception:
+            token.check()
+            raise
+        self.extraction_report = (f"Source {extractor.format_report('source')}; "
+                                  f"Target {extractor.format_report('target')}")
+        token.check()
+
+        source_schema, target_schema, diff = self.compare_schemas(source_schema, target_schema)
+        token.check()
+
+        if not self.lazy_definitions:
+            self.load_changed_definitions(source_schema, source_connector, diff)
+            token.check()
+
+        return source_schema, target_schema, diff
+
+    def make_extractor(self, workers=None, fingerprint=False):
+        return ParallelExtractor(workers or self.workers, bulk_columns=self.bulk_columns,
+                                 progress=self.progress, cancel_token=self.cancel_token,
+                                 snapshot_cache=self.snapshot_cache,
+                                 digests_only=self.digests_only,
+                                 object_filter=self.object_filter,
+                                 cutoff_date=self.cutoff_date,
+                                 definition_store=self.definition_store,
+                                 fingerprint=fingerprint)
+
+    def filter_schema(self, schema):
+        """Applies the object filter, if any, to an extracted schema."""
+        if self.object_filter:
+            return apply_object_filter(schema, self.object_filter)
+        return schema
+
+    def compare_schemas(self, source_schema, target_schema, fingerprints=None):
+        """
+        Object filter -> comparison -> date filter for already extracted schemas.
+        fingerprints: optional (source, target) SchemaFingerprints of the schemas as
+                      extracted, letting the comparison skip identical subtrees.
+        Returns (source_schema, target_schema, diff) with the filtered schemas.
+        """
+        # Apply file filter if exists
+        with profiling.span("object filter", "pipeline"):
+            source_schema = self.filter_schema(source_schema)
+            target_schema = self.filter_schema(target_schema)
+            if fingerprints and self.object_filter:
+                fingerprints = (fingerprints[0].restrict(source_schema), fingerprints[1].restrict(target_schema))
+
+        self.report_progress("Comparing...")
+        diff = SchemaComparer().compare(source_schema, target_schema, *(fingerprints or ()))
+
+        # Apply date filter if enabled
+        if self.cutoff_date:
+            self.report_progress("Applying date filter...")
+            with profiling.span("date filter", "pipeline"):
+                diff = apply_date_filter(diff, source_schema, self.cutoff_date)
+        return source_schema, target_schema, diff
+
+    def load_changed_definitions(self, source_schema, source_connector, diffs):
+        """
+        Fetches the source bodies that the script needs (new and modified objects)
+        when they were compared by hash. Target bodies are fetched on demand by the
+        diff view. diffs: a diff or a list of diffs against the same source.
+        """
+        if isinstance(diffs, dict):
+            diffs = [diffs]
+        names = {category: set() for category in STORED_OBJECT_TYPES}
+        for diff in diffs:
+            for category in STORED_OBJECT_TYPES:
+                names[category].update(diff[category]['new'])
+                names[category].update(diff[category]['modified'])
+        self.report_progress("Fetching changed definitions...")
+        return load_missing_definitions(source_schema, source_connector, names, self.cancel_token,
+                                        self.definition_store)
+
+    def report_progress(self, message):
+        if self.progress:
+            self.progress(message)
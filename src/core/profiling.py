@@ -0,0 +1,250 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Timed spans for one profiling session. Instrumented code calls span(), which
+# costs a global lookup while no session is active:
+#
+#     with profiling.span("compare", "compare", category='tables'):
+#         ...
+#
+# A session is started with start() (or the session() context manager) and
+# its Profiler exports JSON and the Chrome trace format (chrome://tracing,
+# ui.perfetto.dev).
+_active = None
+_active_lock = threading.Lock()
+
+class Span:
+    """
+    One timed operation. args holds counters and labels shown with it
+    (rows, bytes, category, ...); add() increments counters while it runs.
+    """
+    __slots__ = ('profiler', 'name', 'category', 'thread', 'start', 'end', 'args')
+
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.thread = threading.get_ident()
+        self.args = args
+        self.end = None
+        self.start = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.args[key] = self.args.get(key, 0) + value
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+            self.profiler._record(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and exc_type is not GeneratorExit: # A generator closed early is not an error
+            self.args['error'] = exc_type.__name__
+        self.finish()
+        return False
+
+class _NullSpan:
+    """Stands in for Span while no session is active."""
+    __slots__ = ()
+
+    def add(self, **counts):
+        pass
+
+    def finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Profiler:
+    """
+    Collects the finished spans of a session from every thread.
+    cprofile: also collect cProfile data on threads run under profile_thread()
+              (other threads are covered by their spans only).
+    """
+    def __init__(self, cprofile=False):
+        self.started_at = datetime.now()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._cprofile = cProfile.Profile() if cprofile else None
+
+    def begin(self, name, category="", **args):
+        return Span(self, name, category, args)
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        Totals per (category, name), slowest first:
+        [{ 'category', 'name', 'count', 'seconds', 'max_seconds', 'rows', 'bytes' }]
+        """
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            total = totals.get((span.category, span.name))
+            if total is None:
+                total = totals[(span.category, span.name)] = {
+                    'category': span.category, 'name': span.name, 'count': 0,
+                    'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'bytes': 0
+                }
+            seconds = span.seconds
+            total['count'] += 1
+            total['seconds'] += seconds
+            total['max_seconds'] = max(total['max_seconds'], seconds)
+            total['rows'] += span.args.get('rows', 0)
+            total['bytes'] += span.args.get('bytes', 0)
+        return sorted(totals.values(), key=lambda total: -total['seconds'])
+
+    def format_summary(self, limit=None):
+        """Returns the summary as a text table."""
+        lines = [f"{'category':<10} {'name':<28} {'count':>6} {'total ms':>10} {'max ms':>9} {'rows':>9} {'KB':>9}"]
+        for total in self.summary()[:limit]:
+            lines.append(f"{total['category']:<10} {total['name']:<28} {total['count']:>6} "
+                         f"{total['seconds'] * 1000:>10.1f} {total['max_seconds'] * 1000:>9.1f} "
+                         f"{total['rows']:>9} {total['bytes'] / 1024:>9.1f}")
+        return "\n".join(lines)
+
+    def to_json(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            'started_at': self.started_at.isoformat(),
+            'summary': self.summary(),
+            'spans': [{
+                'name': span.name,
+                'category': span.category,
+                'thread': span.thread,
+                'start_ms': round((span.start - self.origin) * 1000, 3),
+                'duration_ms': round(span.seconds * 1000, 3),
+                'args': span.args
+            } for span in spans]
+        }
+
+    def to_chrome_trace(self):
+        """Complete ('X') events in microseconds, one track per thread."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        pid = os.getpid()
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [{
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round(span.seconds * 1e6, 1),
+                'pid': pid,
+                'tid': span.thread,
+                'args': span.args
+            } for span in spans]
+        }
+
+    def save_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2, default=str)
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+
+    @contextmanager
+    def profile_thread(self):
+        """Runs cProfile on the calling thread for the duration of a block."""
+        if self._cprofile is None:
+            yield
+            return
+        self._cprofile.enable()
+        try:
+            yield
+        finally:
+            self._cprofile.disable()
+
+    @property
+    def has_cprofile(self):
+        return self._cprofile is not None
+
+    def cprofile_stats(self, limit=40, sort='cumulative'):
+        """Returns the cProfile report as text ("" without cProfile)."""
+        if self._cprofile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def save_cprofile(self, path):
+        """Writes the raw cProfile data, readable by pstats and snakeviz."""
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(path)
+
+def start(cprofile=False):
+    """Starts a session and returns its Profiler. Raises if one is already running."""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            raise Exception("A profiling session is already running.")
+        _active = Profiler(cprofile)
+        return _active
+
+def stop():
+    """Ends the running session and returns its Profiler (None if there was none)."""
+    global _active
+    with _active_lock:
+        profiler, _active = _active, None
+    return profiler
+
+def active():
+    return _active
+
+@contextmanager
+def session(cprofile=False):
+    """
+    Runs a session for the duration of a block and yields its Profiler;
+    with cprofile, the calling thread is profiled too.
+    """
+    profiler = start(cprofile)
+    try:
+        with profiler.profile_thread():
+            yield profiler
+    finally:
+        stop()
+
+def span(name, category="", **args):
+    """A Span of the running session, or a no-op span when none is running."""
+    profiler = _active
+    if profiler is None:
+        return NULL_SPAN
+    return profiler.begin(name, category, **args)
+
+def row_bytes(row):
+    """Approximate payload size of a result row: text and binary lengths, 8 bytes for other values."""
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value)
+        elif value is not None:
+            size += 8
+    return size
@@ -0,0 +1,33 @@
+from src.core.filters import OBJECT_TYPES
+from src.core.model import to_plain
+
+def summarize_diff(diff):
+    """Returns { category: {'new': n, 'modified': n, 'dropped': n} } plus a 'total' count."""
+    summary = {}
+    total = 0
+    for category in OBJECT_TYPES:
+        counts = {change: len(diff[category][change]) for change in ['new', 'modified', 'dropped']}
+        summary[category] = counts
+        total += sum(counts.values())
+    summary['total'] = total
+    return summary
+
+def diff_report(diff):
+    """
+    Machine-readable form of a diff: object names per change type, with the
+    column changes of modified tables. Definitions are left out; they belong
+    in the generated script.
+    """
+    report = {'summary': summarize_diff(diff)}
+    for category in OBJECT_TYPES:
+        category_diff = diff[category]
+        if category == 'tables':
+            modified = {name: to_plain(changes) for name, changes in category_diff['modified'].items()}
+        else:
+            modified = list(category_diff['modified'])
+        report[category] = {
+            'new': list(category_diff['new']),
+            'modified': modified,
+            'dropped': list(category_diff['dropped'])
+        }
+    return report
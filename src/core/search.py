@@ -0,0 +1,139 @@
+import re
+from bisect import bisect_left
+from fnmatch import translate
+
+from src.core.filters import OBJECT_TYPES
+
+class NameIndex:
+    """
+    Lowercased names with a trigram index for substring lookup and a sorted
+    list for prefix lookup. Duplicate names (e.g. the same column in many
+    tables) are stored once.
+    """
+    def __init__(self, names):
+        self.names = sorted({name.lower() for name in names})
+        self.trigrams = {}
+        for i, name in enumerate(self.names):
+            for gram in self._grams(name):
+                self.trigrams.setdefault(gram, set()).add(i)
+
+    @staticmethod
+    def _grams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _candidates(self, literal):
+        """Indexes of names that may contain literal (all names when it is too short)."""
+        grams = self._grams(literal)
+        if not grams:
+            return range(len(self.names))
+        postings = sorted((self.trigrams.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def contains(self, text):
+        names = self.names
+        return {names[i] for i in self._candidates(text) if text in names[i]}
+
+    def prefix(self, text):
+        names = self.names
+        matches = set()
+        i = bisect_left(names, text)
+        while i < len(names) and names[i].startswith(text):
+            matches.add(names[i])
+            i += 1
+        return matches
+
+    def wildcard(self, pattern, key=None):
+        """
+        Names matching a '*'/'?' pattern as a whole. key: optional callable
+        selecting the part of the name the pattern is matched against.
+        """
+        regex = re.compile(translate(pattern), re.DOTALL)
+        # The longest literal run narrows the candidates through the trigram index
+        literal = max(re.split(r'[*?\[\]]', pattern), key=len)
+        names = self.names
+        return {names[i] for i in self._candidates(literal)
+                if regex.match(key(names[i]) if key else names[i])}
+
+def _object_part(name):
+    return name.rsplit('.', 1)[-1]
+
+class DiffSearchIndex:
+    """
+    Search index over the object and column names of a diff, built once per
+    comparison. Queries (case-insensitive):
+        text        substring of the qualified name ('schema.name') or column name
+        text*       object or column names starting with text
+        a*b?c       wildcard match on the object part ('name') or column name
+        dbo.        qualified: schema is dbo, object name starts with the rest
+                    (other text with a '.' is a substring, e.g. 'bo.us' or '.usp')
+        dbo.a*      wildcard match on the qualified name
+    """
+    WILDCARDS = re.compile(r'[*?]')
+
+    def __init__(self, diff):
+        objects = []
+        columns = []
+        for category in OBJECT_TYPES:
+            objects.extend(diff[category]['new'])
+            objects.extend(diff[category]['modified'])
+            objects.extend(diff[category]['dropped'])
+        for changes in diff['tables']['modified'].values():
+            for key in ['add_columns', 'alter_columns', 'drop_columns']:
+                columns.extend(changes[key])
+        self.objects = NameIndex(objects)
+        self.columns = NameIndex(columns)
+        self.schemas = {name.split('.', 1)[0] for name in self.objects.names if '.' in name}
+        # Lowercased name -> names as they appear in the diff
+        self.originals = {}
+        for name in objects + columns:
+            self.originals.setdefault(name.lower(), set()).add(name)
+
+    def search(self, query):
+        """Returns (matching lowercased object names, matching lowercased column names)."""
+        query = query.strip().lower()
+        wildcard = bool(self.WILDCARDS.search(query))
+
+        if '.' in query:
+            # Qualified names never match columns
+            if wildcard:
+                return self.objects.wildcard(query), set()
+            if query.split('.', 1)[0] in self.schemas:
+                return self.objects.prefix(query), set()
+            return self.objects.contains(query), set()
+
+        if wildcard:
+            text = query[:-1]
+            if query.endswith('*') and self.WILDCARDS.search(text) is None:
+                # Trailing '*' only: prefix of the object part or column name
+                objects = {name for name in self.objects.contains(text) if _object_part(name).startswith(text)}
+                return objects, self.columns.prefix(text)
+            return (self.objects.wildcard(query, key=_object_part),
+                    self.columns.wildcard(query))
+
+        return self.objects.contains(query), self.columns.contains(query)
+
+    def filter(self, query):
+        """
+        Returns a callable(node_path) -> bool for DiffTreeModel.set_name_filter,
+        or None when the query is empty.
+        """
+        if not query.strip():
+            return None
+        objects, columns = (self._restore_case(names) for names in self.search(query))
+
+        def visible(path):
+            if len(path) > 3:
+                return path[3] in columns
+            return path[-1] in objects
+        return visible
+
+    def _restore_case(self, names):
+        restored = set()
+        for name in names:
+            restored.update(self.originals[name])
+        return restored
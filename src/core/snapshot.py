@@ -0,0 +1,112 @@
+import json
+import os
+import re
+from datetime import datetime
+from src.core.config import data_directory
+from src.core.model import json_default, schema_from_dict, to_plain
+
+class SnapshotCache:
+    """
+    Persists the last extracted schema of each database together with the
+    (object_id, modify_date) stamps it was built from, so the next extraction
+    only has to fetch objects that are new or changed.
+    store: optional DefinitionStore; bodies are kept there instead of in each
+           snapshot, and loaded snapshots leave them unloaded (digest only).
+    directory defaults to 'snapshots' in the per-user data directory.
+    """
+    def __init__(self, directory=None, store=None):
+        self.directory = directory or data_directory("snapshots")
+        self.store = store
+
+    def key_for(self, details):
+        return f"{details['server']}/{details['database']}"
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        for category in data['schema'].values():
+            for obj in category.values():
+                if obj.get('modify_date'):
+                    obj['modify_date'] = datetime.fromisoformat(obj['modify_date'])
+        data['schema'] = schema_from_dict(data['schema'])
+        return data
+
+    def save(self, key, stamps, schema):
+        """
+        stamps: { object_id: [type, 'schema.name', modify_date iso string] }
+        """
+        if self.store is not None:
+            schema = self._without_bodies(schema)
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            'saved_at': datetime.now().isoformat(),
+            'stamps': {str(object_id): stamp for object_id, stamp in stamps.items()},
+            'schema': schema
+        }
+        path = self._path(key)
+        # Write then rename so an interrupted run never leaves a truncated snapshot
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, default=json_default)
+        os.replace(path + '.tmp', path)
+
+    def _without_bodies(self, schema):
+        stripped = {}
+        for category, objects in schema.items():
+            if category == 'tables':
+                stripped[category] = objects
+                continue
+            entries = stripped[category] = {}
+            for name, obj in objects.items():
+                definition = obj.get('definition')
+                if definition is None:
+                    entries[name] = obj
+                    continue
+                digest, _ = self.store.put(definition, obj.get('definition_hash'))
+                entries[name] = dict(to_plain(obj), definition=None, definition_hash=digest)
+        return stripped
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _path(self, key):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', key)
+        return os.path.join(self.directory, f"{safe_name}.json")
+
+def make_stamps(rows):
+    """Converts get_object_stamps() rows to { object_id: [type, 'schema.name', modify_date iso] }."""
+    # sys.objects.type is char(2), so single-letter codes come back padded
+    return {
+        row.object_id: [row.type.strip(), f"{row.schema}.{row.name}",
+                        row.modify_date.isoformat() if row.modify_date else None]
+        for row in rows
+    }
+
+def plan_refresh(cached_stamps, current_stamps):
+    """
+    Compares the stamps of a snapshot with the current ones.
+    Returns (changed, removed):
+        changed: { type: [object_id, ...] } for new or modified objects
+        removed: [(type, 'schema.name'), ...] for objects that no longer exist as cached
+    A renamed object counts as removed under its old name and changed under the new one.
+    """
+    changed = {}
+    removed = []
+    for object_id, stamp in current_stamps.items():
+        cached = cached_stamps.get(str(object_id))
+        if cached != stamp:
+            changed.setdefault(stamp[0], []).append(object_id)
+            if cached:
+                removed.append((cached[0], cached[1]))
+    current_ids = {str(object_id) for object_id in current_stamps}
+    for object_id, cached in cached_stamps.items():
+        if object_id not in current_ids:
+            removed.append((cached[0], cached[1]))
+    return changed, removed
@@ -0,0 +1,100 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from src.core.compare import definition_digest
+from src.core.config import data_directory
+
+# Characters of bodies kept in memory; least recently used ones are evicted first
+DEFAULT_CACHE_CHARS = 64 * 1024 * 1024
+
+class DefinitionStore:
+    """
+    Content-addressed store of definition bodies, keyed by definition_digest
+    (the SHA-256 that HASHBYTES computes on the server, so digests from
+    hash-first extraction find their bodies here too).
+    Each distinct body is written once to disk, zlib-compressed under
+    <directory>/<first two hex digits>/<digest>, and kept once in memory:
+    put() returns the shared copy, so identical bodies from any number of
+    databases, snapshots and diffs are a single string.
+    directory defaults to 'definitions' in the per-user data directory.
+    """
+    def __init__(self, directory=None, compress=True, cache_chars=DEFAULT_CACHE_CHARS):
+        self.directory = directory or data_directory("definitions")
+        self.compress = compress
+        self.cache_chars = cache_chars
+        self._cache = OrderedDict() # digest -> body, most recently used last
+        self._cached_chars = 0
+        self._lock = threading.Lock()
+
+    def put(self, definition, digest=None):
+        """
+        Stores a body. digest: its definition_digest, when already known.
+        Returns (digest, body) with the store's shared copy of the body;
+        (None, None) for a missing (e.g. encrypted) definition.
+        """
+        if definition is None:
+            return None, None
+        digest = digest or definition_digest(definition)
+        with self._lock:
+            shared = self._cache.get(digest)
+            if shared is not None:
+                self._cache.move_to_end(digest)
+                return digest, shared
+            self._remember(digest, definition)
+        path = self._path(digest)
+        if not os.path.exists(path):
+            self._write(path, definition)
+        return digest, definition
+
+    def get(self, digest):
+        """Returns the body stored under digest, or None when it isn't stored."""
+        if digest is None:
+            return None
+        with self._lock:
+            definition = self._cache.get(digest)
+            if definition is not None:
+                self._cache.move_to_end(digest)
+                return definition
+        try:
+            with open(self._path(digest), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if self.compress:
+            data = zlib.decompress(data)
+        definition = data.decode('utf-8')
+        with self._lock:
+            # Another thread may have read it meanwhile; keep a single copy
+            shared = self._cache.get(digest)
+            if shared is not None:
+                return shared
+            self._remember(digest, definition)
+        return definition
+
+    def __contains__(self, digest):
+        with self._lock:
+            if digest in self._cache:
+                return True
+        return os.path.exists(self._path(digest))
+
+    def _remember(self, digest, definition):
+        self._cache[digest] = definition
+        self._cached_chars += len(definition)
+        while self._cached_chars > self.cache_chars and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_chars -= len(evicted)
+
+    def _write(self, path, definition):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = definition.encode('utf-8')
+        if self.compress:
+            data = zlib.compress(data)
+        # Write then rename: concurrent writers of the same digest write the same bytes
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
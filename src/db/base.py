@@ -0,0 +1,143 @@
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from src.core import profiling
+
+class BaseConnector(ABC):
+    """
+    Interface SchemaExtractor and ParallelExtractor use to reach a database.
+    Subclasses open self.connection (a DB-API connection) and implement
+    clone() and close(); query execution, streaming and cancellation are
+    shared. details identifies the database ('server' and 'database' keys)
+    and is None until connected. failed is set once a query on the
+    connection was cancelled or raised, so close() can discard it.
+    """
+    # Rows fetched per round trip by iter_rows
+    DEFAULT_ARRAYSIZE = 1000
+
+    def __init__(self, arraysize=DEFAULT_ARRAYSIZE):
+        self.arraysize = arraysize
+        self.connection = None
+        self.details = None
+        self.failed = False
+        self._active_cursors = set()
+        self._cursor_lock = threading.Lock()
+
+    def execute_query(self, query, params=None):
+        """
+        Executes a query and returns the cursor.
+        """
+        if not self.connection:
+            raise Exception("Not connected to a database.")
+
+        cursor = self.connection.cursor()
+        # Registered before execute so cancel() can interrupt a running query
+        with self._cursor_lock:
+            self._active_cursors.add(cursor)
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+        except Exception:
+            self.failed = True
+            self._release(cursor)
+            raise
+        return cursor
+
+    def iter_rows(self, query, params=None, arraysize=None, label=None):
+        """
+        Executes a query and yields its rows in batches of arraysize, so only one
+        batch is held in memory at a time. Values are accessed by column name as
+        attributes (row.name) or by index (row[0]).
+        The result set must be consumed before the next query on this connection.
+        label: name of the query's profiling span, which counts its rows and
+               bytes and lasts until the result set is consumed.
+        """
+        span = profiling.span(label or "query", "query")
+        counting = span is not profiling.NULL_SPAN
+        with span:
+            cursor = self.execute_query(query, params)
+            cursor.arraysize = arraysize or self.arraysize
+            try:
+                while True:
+                    try:
+                        rows = cursor.fetchmany()
+                    except Exception:
+                        self.failed = True
+                        raise
+                    if not rows:
+                        break
+                    if counting:
+                        span.add(rows=len(rows), bytes=sum(map(profiling.row_bytes, rows)))
+                    yield from rows
+            finally:
+                self._release(cursor)
+                cursor.close()
+
+    def fetch_all(self, query, params=None, label=None):
+        with profiling.span(label or "query", "query") as span:
+            cursor = self.execute_query(query, params)
+            try:
+                columns = [column[0] for column in cursor.description]
+                try:
+                    rows = cursor.fetchall()
+                except Exception:
+                    self.failed = True
+                    raise
+                results = []
+                for row in rows:
+                    results.append(dict(zip(columns, row)))
+                if span is not profiling.NULL_SPAN:
+                    span.add(rows=len(results), bytes=sum(map(profiling.row_bytes, rows)))
+                return results
+            finally:
+                self._release(cursor)
+
+    def cancel(self):
+        """
+        Cancels every query currently running on this connection.
+        Safe to call from another thread; the interrupted call raises.
+        """
+        with self._cursor_lock:
+            cursors = list(self._active_cursors)
+            if cursors:
+                self.failed = True
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:
+                pass
+
+    def _release(self, cursor):
+        with self._cursor_lock:
+            self._active_cursors.discard(cursor)
+
+    @abstractmethod
+    def clone(self):
+        """
+        Returns a connector on another connection to the same database.
+        Connections must not be shared between threads, so each
+        extraction worker uses its own clone.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def lease(self):
+        """Yields a clone for the duration of a block, then closes it."""
+        clone = self.clone()
+        try:
+            yield clone
+        finally:
+            clone.close()
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError
+
+    def dispose(self):
+        """
+        Closes the connector when its database won't be used again (e.g. one
+        tenant of a batch), including connections kept for reuse.
+        """
+        self.close()
@@ -1,19 +1,19 @@
 import pyodbc
+from .base import BaseConnector
+from .pool import close_pool, get_pool, resolve_driver
 
-class DbConnector:
-    def __init__(self):
-        self.connection = None
+class DbConnector(BaseConnector):
+    """SQL Server through pyodbc. Rows are pyodbc.Row objects."""
+    def __init__(self, arraysize=BaseConnector.DEFAULT_ARRAYSIZE):
+        super().__init__(arraysize)
+        self.pool = None
 
     def connect(self, server, database, username=None, password=None, trusted=False, trust_cert=False):
         """
         Establishes a connection to the MSSQL database.
+        Connections come from a pool shared by every connector of the same profile.
         """
-        drivers = [d for d in pyodbc.drivers() if 'SQL Server' in d]
-        if not drivers:
-            raise Exception("No ODBC Drivers for SQL Server found.")
-        
-        # Prefer newer drivers
-        driver = sorted(drivers, reverse=True)[0]
+        driver = resolve_driver()
         
         conn_str = f'DRIVER={{{driver}}};SERVER={server};DATABASE={database};'
         
@@ -29,34 +29,58 @@ class DbConnector:
         # We can also explicitly set Encrypt=yes if we wanted, but the error specifically suggests self-signed cert issue.
 
         try:
-            self.connection = pyodbc.connect(conn_str)
+            pool = get_pool(conn_str)
+            connection = pool.acquire()
+            self.close()
+            self.pool = pool
+            self.connection = connection
+            self.failed = False
+            self.details = {
+                'server': server,
+                'database': database,
+                'username': username,
+                'password': password,
+                'trusted': trusted,
+                'trust_cert': trust_cert
+            }
             return True
         except pyodbc.Error as e:
             raise Exception(f"Connection failed: {str(e)}")
 
-    def execute_query(self, query, params=None):
+    def clone(self):
         """
-        Executes a query and returns the cursor.
+        Returns a connector on another connection to the same database.
+        Reuses an idle pooled connection when there is one.
         """
-        if not self.connection:
+        if not self.details:
             raise Exception("Not connected to a database.")
-        
-        cursor = self.connection.cursor()
-        if params:
-            cursor.execute(query, params)
+        clone = DbConnector(self.arraysize)
+        if self.pool:
+            # Reuses an idle pooled connection without driver discovery; the pool is
+            # looked up again in case another connector to this database disposed it
+            clone.pool = get_pool(self.pool.conn_str)
+            clone.connection = clone.pool.acquire()
+            clone.details = self.details
         else:
-            cursor.execute(query)
-        return cursor
-
-    def fetch_all(self, query, params=None):
-        cursor = self.execute_query(query, params)
-        columns = [column[0] for column in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        return results
+            clone.connect(**self.details)
+        return clone
 
     def close(self):
+        """
+        Returns the connection to its pool (or closes it when not pooled).
+        A connection whose queries were cancelled or failed is closed instead.
+        """
         if self.connection:
-            self.connection.close()
+            if self.pool:
+                self.pool.release(self.connection, discard=self.failed)
+            else:
+                self.connection.close()
             self.connection = None
+            self.failed = False
+
+    def dispose(self):
+        """Closes the connection and the pool of this database's idle connections."""
+        pool = self.pool
+        self.close()
+        if pool:
+            close_pool(pool)
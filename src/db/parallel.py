@@ -0,0 +1,288 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .schema import SchemaExtractor
+from src.core import profiling
+from src.core.filters import ObjectFilter
+from src.core.fingerprint import SchemaFingerprint
+from src.core.snapshot import make_stamps, plan_refresh
+
+DEFAULT_WORKERS = 4
+
+class CutoffSelection:
+    """
+    The objects a comparison filtered by a "changes from" date needs, decided
+    from the source's name list before any definition is read: source objects
+    modified on or after the cutoff, and target objects with those names or
+    with names the source doesn't have (dropped objects). Extraction work then
+    grows with the number of recent changes rather than with database size.
+    """
+    def __init__(self, cutoff_date, source_connector):
+        self.cutoff_date = cutoff_date
+        self.extractor = SchemaExtractor(source_connector)
+        self.source_stamps = make_stamps(self.extractor.get_object_stamps())
+        # Stamps hold ISO strings, which order like the dates they encode
+        self._cutoff = cutoff_date.isoformat()
+        self.source_names = {stamp[1] for stamp in self.source_stamps.values()}
+        self.recent_names = {stamp[1] for stamp in self.source_stamps.values() if self.is_recent(stamp)}
+
+    def is_recent(self, stamp):
+        return stamp[2] is not None and stamp[2] >= self._cutoff
+
+    def is_needed_in_target(self, stamp):
+        return stamp[1] in self.recent_names or stamp[1] not in self.source_names
+
+class ParallelExtractor:
+    """
+    Extracts schemas with a small pool of worker connections per database.
+    Each work unit of SchemaExtractor.CATEGORY_UNITS runs on its own worker,
+    and source and target are extracted at the same time, so the wall time
+    approaches the slowest single unit instead of the sum of all of them.
+    """
+    def __init__(self, workers=DEFAULT_WORKERS, bulk_columns=True, progress=None, cancel_token=None,
+                 snapshot_cache=None, digests_only=False, object_filter=None, cutoff_date=None,
+                 definition_store=None, fingerprint=False):
+        """
+        progress: optional callable receiving per-category status messages.
+        cancel_token: optional CancelToken; worker connections register their
+                      cancel() with it so running queries are aborted.
+        snapshot_cache: optional SnapshotCache; only objects whose modify_date
+                        changed since the cached snapshot are re-extracted.
+        digests_only: extract definition digests instead of bodies (see SchemaExtractor).
+        object_filter: optional ObjectFilter (or set of 'schema.name'); only the objects
+                       it selects are extracted (others may still come from a snapshot).
+                       Its rule hits are recorded for every object considered.
+        cutoff_date: optional datetime; extract_pair only extracts what a comparison
+                     filtered to changes on or after it needs (see CutoffSelection).
+        definition_store: optional DefinitionStore receiving the extracted bodies.
+        fingerprint: compute the SchemaFingerprint of each extracted schema (it hashes
+                     every body, so only batch comparisons and fingerprinting ask for it).
+        """
+        self.workers = max(1, int(workers))
+        self.bulk_columns = bulk_columns
+        self.snapshot_cache = snapshot_cache
+        self.digests_only = digests_only
+        self.object_filter = ObjectFilter.of(object_filter)
+        self.cutoff_date = cutoff_date
+        self.definition_store = definition_store
+        self.fingerprint = fingerprint
+        self.progress = progress
+        self.cancel_token = cancel_token
+        self.reports = {}
+        self.fingerprints = {}
+        self._progress_lock = threading.Lock()
+
+    def extract(self, connector):
+        """Extracts a single database. Returns the get_full_schema structure."""
+        return self.extract_many({'schema': connector})['schema']
+
+    def extract_pair(self, source_connector, target_connector):
+        """Extracts source and target concurrently. Returns (source_schema, target_schema)."""
+        cutoff = self.cutoff_selection(source_connector) if self.cutoff_date else None
+        schemas = self.extract_many({'source': source_connector, 'target': target_connector}, cutoff, 'source')
+        return schemas['source'], schemas['target']
+
+    def cutoff_selection(self, source_connector):
+        """Reads the source's name list for cutoff_date. Returns a CutoffSelection."""
+        with profiling.span("cutoff selection", "extract"):
+            return CutoffSelection(self.cutoff_date, source_connector)
+
+    def extract_many(self, connectors, cutoff=None, source_key=None):
+        """
+        connectors: { key: DbConnector }
+        cutoff: optional CutoffSelection; the database under source_key is the
+                source it was read from, every other one is a target.
+        Returns { key: full_schema }. Per-database reports are kept in self.reports,
+        with fingerprint, the SchemaFingerprint of each schema in self.fingerprints.
+        """
+        self.reports = {}
+        self.fingerprints = {}
+
+        def extract(key, connector):
+            with profiling.span(f"extract {key}", "extract"):
+                return self._extract_database(key, connector, cutoff, key == source_key)
+
+        with ThreadPoolExecutor(max_workers=len(connectors)) as executor:
+            futures = {key: executor.submit(extract, key, connector)
+                       for key, connector in connectors.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    def _extract_database(self, key, connector, cutoff=None, is_source=False):
+        started = time.perf_counter()
+        extractors = []
+        extractors_lock = threading.Lock()
+
+        def run_unit(category, object_type):
+            if self.cancel_token:
+                self.cancel_token.check()
+            # Each unit borrows a pooled connection only while it runs
+            with connector.lease() as worker_connector:
+                if self.cancel_token:
+                    self.cancel_token.add_callback(worker_connector.cancel)
+                extractor = SchemaExtractor(worker_connector, self.definition_store)
+                with extractors_lock:
+                    extractors.append(extractor)
+                object_ids = None
+                if changed is not None:
+                    object_ids = changed.get(object_type or 'U', [])
+                return category, extractor.extract_unit(category, object_type, self.bulk_columns, object_ids,
+                                                        self.digests_only, modified_since)
+
+        full_schema = {
+            'tables': {},
+            'procedures': {},
+            'functions': {},
+            'triggers': {}
+        }
+        units = SchemaExtractor.CATEGORY_UNITS
+
+        # Date cutoff: the source's unit queries carry the cutoff themselves,
+        # targets select the names the CutoffSelection needs by object id
+        stamps = None
+        keep = None
+        modified_since = None
+        if cutoff is not None and is_source:
+            stamps = dict(cutoff.source_stamps)
+            extractors.append(cutoff.extractor)
+            keep = cutoff.is_recent
+            modified_since = cutoff.cutoff_date
+        elif cutoff is not None:
+            stamps = self._read_stamps(connector, extractors)
+            keep = cutoff.is_needed_in_target
+
+        # Incremental mode: start from the cached snapshot and only re-extract what changed
+        changed = None
+        snapshot_key = None
+        retained = {}
+        if self.snapshot_cache and connector.details:
+            snapshot_key = self.snapshot_cache.key_for(connector.details)
+            if stamps is None:
+                stamps = self._read_stamps(connector, extractors)
+            snapshot = self.snapshot_cache.load(snapshot_key)
+            if snapshot:
+                full_schema = snapshot['schema']
+                changed, removed = plan_refresh(snapshot['stamps'], stamps)
+                if modified_since is not None:
+                    # Source objects changed before the cutoff aren't re-extracted; their
+                    # snapshot entries stay so they still count as present in the source
+                    retained = self._retained_stamps(snapshot['stamps'], stamps, keep)
+                    kept_names = {(stamp[0], stamp[1]) for stamp in retained.values()}
+                    removed = [entry for entry in removed if entry not in kept_names]
+                for obj_type, name in removed:
+                    full_schema[SchemaExtractor.OBJECT_TYPE_CATEGORIES[obj_type]].pop(name, None)
+                self._report(f"{key.capitalize()}: {sum(len(ids) for ids in changed.values())} changed, "
+                             f"{len(removed)} removed since snapshot")
+
+        # Object filter: only selected objects go over the wire, in batches of object ids.
+        # The source's cutoff needs ids only when they are selected anyway, or to keep a
+        # saved snapshot from claiming objects that were skipped.
+        if self.object_filter or (keep is not None and (modified_since is None or snapshot_key is not None)):
+            changed = self._select_objects(connector, extractors, stamps, changed, keep)
+            if retained:
+                # Saved with the stamps their entries were extracted at, so they are
+                # re-extracted once the cutoff no longer skips them
+                stamps.update(retained)
+            self._report(f"{key.capitalize()}: {sum(len(ids) for ids in changed.values())} selected objects to extract")
+
+        if changed is not None:
+            units = [(category, object_type) for category, object_type in units
+                     if changed.get(object_type or 'U')]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(units)))) as executor:
+            futures = [executor.submit(run_unit, category, object_type)
+                       for category, object_type in units]
+            try:
+                for done, future in enumerate(futures, 1):
+                    category, objects = future.result()
+                    full_schema[category].update(objects)
+                    self._report(f"{key.capitalize()}: {category} extracted ({done}/{len(units)})")
+            except Exception:
+                # Don't start units that are still queued
+                for future in futures:
+                    future.cancel()
+                raise
+
+        if snapshot_key is not None:
+            self.snapshot_cache.save(snapshot_key, stamps, full_schema)
+
+        if self.fingerprint:
+            # Computed here, while other databases may still be extracting
+            with profiling.span("fingerprint", "extract", database=key):
+                self.fingerprints[key] = SchemaFingerprint(full_schema)
+
+        self.reports[key] = SchemaExtractor.build_report(
+            self.bulk_columns,
+            sum(e.query_count for e in extractors),
+            sum(e.table_count for e in extractors),
+            sum(e.column_query_count for e in extractors),
+            time.perf_counter() - started
+        )
+        return full_schema
+
+    def _read_stamps(self, connector, extractors):
+        stamp_extractor = SchemaExtractor(connector)
+        extractors.append(stamp_extractor)
+        return make_stamps(stamp_extractor.get_object_stamps())
+
+    @staticmethod
+    def _retained_stamps(cached_stamps, stamps, keep):
+        """
+        Returns { object_id: cached stamp } of the objects changed since the
+        snapshot, under the same type and name, that keep() rejects.
+        """
+        retained = {}
+        for object_id, stamp in stamps.items():
+            cached = cached_stamps.get(str(object_id))
+            if cached and cached != stamp and cached[:2] == stamp[:2] and not keep(stamp):
+                retained[object_id] = cached
+        return retained
+
+    def _select_objects(self, connector, extractors, stamps, changed, keep=None):
+        """
+        Returns { type: [object_id, ...] } of the objects to extract that
+        object_filter selects (when set) and whose stamps keep() accepts (when
+        given). Ids come from the stamps when there are any, otherwise from
+        sys.objects lookups narrowed by the filter's names and patterns.
+        Stamps of objects left out are dropped, so a saved snapshot never
+        claims them as current.
+        """
+        object_filter = self.object_filter
+        if stamps is None:
+            extractor = SchemaExtractor(connector)
+            extractors.append(extractor)
+            listed = {}
+            for row in extractor.find_object_ids(object_filter):
+                if object_filter.matches(f"{row.schema}.{row.name}", record=True):
+                    listed.setdefault(row.type.strip(), []).append(row.object_id)
+            return listed
+
+        # Every stamp is matched, so rule hits include objects kept from a snapshot
+        selected = None
+        if object_filter:
+            selected = {object_id for object_id, stamp in stamps.items()
+                        if object_filter.matches(stamp[1], record=True)}
+        if changed is None: # No snapshot yet: everything is pending
+            changed = {}
+            for object_id, stamp in stamps.items():
+                changed.setdefault(stamp[0], []).append(object_id)
+        listed = {}
+        for obj_type, object_ids in changed.items():
+            for object_id in object_ids:
+                if (selected is None or object_id in selected) and (keep is None or keep(stamps[object_id])):
+                    listed.setdefault(obj_type, []).append(object_id)
+                else:
+                    del stamps[object_id] # Seen as changed again next time
+        return listed
+
+    def _report(self, message):
+        if self.progress:
+            with self._progress_lock:
+                self.progress(message)
+
+    def format_report(self, key):
+        report = self.reports.get(key)
+        if not report:
+            return "No extraction has been run."
+        return (f"{report['mode']} extraction: {report['tables']} tables, {report['queries']} queries "
+                f"({report['round_trips_saved']} round trips saved), {report['total_seconds']:.2f}s "
+                f"on {self.workers} workers")
@@ -0,0 +1,175 @@
+import threading
+import time
+from functools import lru_cache
+import pyodbc
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_IDLE_TIMEOUT = 300 # Seconds before an idle connection is closed
+DEFAULT_HEALTH_CHECK_AFTER = 30 # Idle seconds after which a connection is pinged before reuse
+REAP_INTERVAL = 60 # Seconds between sweeps closing idle connections of every pool
+
+@lru_cache(maxsize=1)
+def resolve_driver():
+    """
+    Returns the newest installed SQL Server ODBC driver.
+    Driver discovery is slow, so the result is cached for the process.
+    """
+    drivers = [d for d in pyodbc.drivers() if 'SQL Server' in d]
+    if not drivers:
+        raise Exception("No ODBC Drivers for SQL Server found.")
+    
+    # Prefer newer drivers
+    return sorted(drivers, reverse=True)[0]
+
+class ConnectionPool:
+    """
+    Bounded pool of pyodbc connections for one connection string.
+    A connection is used by one thread at a time: acquire() hands it out
+    exclusively until release(), so it can be lent to worker threads.
+    """
+    def __init__(self, conn_str, max_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 health_check_after=DEFAULT_HEALTH_CHECK_AFTER):
+        self.conn_str = conn_str
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self._idle = [] # (connection, released_at), most recently used last
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Returns an open connection, reusing an idle one when possible.
+        Blocks while max_size connections are in use; raises after timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            connection, released_at = self._take(deadline)
+            if connection is None:
+                try:
+                    return pyodbc.connect(self.conn_str)
+                except Exception:
+                    self._discard_slot()
+                    raise
+            if time.monotonic() - released_at < self.health_check_after or self._is_healthy(connection):
+                return connection
+            self._close_quietly(connection)
+            self._discard_slot()
+
+    def release(self, connection, discard=False):
+        """Returns a connection to the pool. discard=True closes it instead."""
+        with self._cond:
+            if discard or self._closed:
+                self._close_quietly(connection)
+                self._size -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._evict_idle()
+            self._cond.notify()
+
+    def evict_idle(self):
+        """Closes connections idle for longer than idle_timeout."""
+        with self._cond:
+            self._evict_idle()
+
+    def close(self):
+        """Closes idle connections; connections in use are closed when released."""
+        with self._cond:
+            self._closed = True
+            for connection, _ in self._idle:
+                self._close_quietly(connection)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    def _take(self, deadline):
+        """Returns (idle connection, released_at), or (None, None) after reserving a slot for a new one."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("Connection pool is closed.")
+                self._evict_idle()
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise Exception(f"Timed out waiting for a connection ({self.max_size} in use).")
+                self._cond.wait(remaining)
+
+    def _discard_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _evict_idle(self):
+        # Caller holds self._cond
+        now = time.monotonic()
+        keep = []
+        for connection, released_at in self._idle:
+            if now - released_at > self.idle_timeout:
+                self._close_quietly(connection)
+                self._size -= 1
+            else:
+                keep.append((connection, released_at))
+        self._idle = keep
+
+    def _is_healthy(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except pyodbc.Error:
+            pass
+
+_pools = {}
+_pools_lock = threading.Lock()
+_reaper = None
+
+def get_pool(conn_str, max_size=DEFAULT_POOL_SIZE):
+    """Returns the shared pool for a connection string, creating it on first use."""
+    global _reaper
+    with _pools_lock:
+        pool = _pools.get(conn_str)
+        if pool is None or pool._closed:
+            pool = _pools[conn_str] = ConnectionPool(conn_str, max_size)
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap_idle, name="broono-pool-reaper", daemon=True)
+            _reaper.start()
+        return pool
+
+def _reap_idle():
+    # Idle timeouts hold even for pools that are not used again
+    while True:
+        time.sleep(REAP_INTERVAL)
+        with _pools_lock:
+            pools = list(_pools.values())
+        for pool in pools:
+            pool.evict_idle()
+
+def close_pool(pool):
+    """Closes a pool and forgets it, once its database won't be used again."""
+    with _pools_lock:
+        if _pools.get(pool.conn_str) is pool:
+            del _pools[pool.conn_str]
+    pool.close()
+
+def close_all_pools():
+    """Closes every pool; called at shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
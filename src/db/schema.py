@@ -1,12 +1,40 @@
-from .connector import DbConnector
+import time
+from .base import BaseConnector
+from src.core import profiling
+from src.core.compare import digest_from_server
+from src.core.model import Column, Table, StoredObject, intern_name
 
 class SchemaExtractor:
-    def __init__(self, connector: DbConnector):
+    def __init__(self, connector: BaseConnector, definition_store=None):
+        """
+        definition_store: optional DefinitionStore; extracted bodies are written
+                          into it and objects share its copy and carry its digest.
+        """
         self.connector = connector
+        self.definition_store = definition_store
+        self.report = None
+        self.query_count = 0
+        self.table_count = 0
+        self.column_query_count = 0 # Bulk column queries, one per batch of ids
+
+    # SQL Server allows 2100 parameters per statement
+    ID_BATCH_SIZE = 1000
 
-    def get_tables(self):
+    # sys.objects type codes for each schema category
+    OBJECT_TYPE_CATEGORIES = {
+        'U': 'tables',
+        'P': 'procedures',
+        'FN': 'functions',
+        'IF': 'functions',
+        'TF': 'functions',
+        'TR': 'triggers'
+    }
+
+    def get_tables(self, object_ids=None, modified_since=None):
         """
-        Retrieves a list of tables from the database.
+        Yields the tables of the database.
+        object_ids: optional iterable restricting the result to these tables.
+        modified_since: optional datetime; only tables modified on or after it.
         """
         query = """
         SELECT 
@@ -15,13 +43,15 @@ class SchemaExtractor:
             t.modify_date
         FROM sys.tables t
         JOIN sys.schemas s ON t.schema_id = s.schema_id
+        {where}
         ORDER BY s.name, t.name
         """
-        return self.connector.fetch_all(query)
+        predicates, params = self._since('t', modified_since)
+        return self._fetch(query, predicates, params, 't.object_id', object_ids, label='get_tables')
 
     def get_columns(self, schema, table):
         """
-        Retrieves column details for a specific table.
+        Yields column details for a specific table.
         """
         query = """
         SELECT 
@@ -32,16 +62,55 @@ class SchemaExtractor:
             NUMERIC_PRECISION,
             NUMERIC_SCALE
         FROM INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?
+        {where}
         ORDER BY ORDINAL_POSITION
         """
-        return self.connector.fetch_all(query, (schema, table))
+        return self._fetch(query, ['TABLE_SCHEMA = ?', 'TABLE_NAME = ?'], (schema, table), label='get_columns')
+
+    def get_all_columns(self, object_ids=None, modified_since=None):
+        """
+        Yields column details for every user table from a single catalog query
+        (one query per batch of ids when object_ids is given), optionally only
+        of the tables modified on or after modified_since.
+        Values mirror INFORMATION_SCHEMA.COLUMNS so both extraction modes compare equal.
+        """
+        query = """
+        SELECT 
+            s.name AS TABLE_SCHEMA,
+            t.name AS TABLE_NAME,
+            c.name AS COLUMN_NAME,
+            COALESCE(bt.name, ty.name) AS DATA_TYPE,
+            c.is_nullable AS IS_NULLABLE,
+            CASE
+                WHEN COALESCE(bt.name, ty.name) IN ('varchar', 'char', 'varbinary', 'binary') THEN c.max_length
+                WHEN COALESCE(bt.name, ty.name) IN ('nvarchar', 'nchar') THEN
+                    CASE WHEN c.max_length = -1 THEN -1 ELSE c.max_length / 2 END
+                WHEN COALESCE(bt.name, ty.name) = 'xml' THEN -1
+                WHEN COALESCE(bt.name, ty.name) IN ('text', 'image') THEN 2147483647
+                WHEN COALESCE(bt.name, ty.name) = 'ntext' THEN 1073741823
+            END AS CHARACTER_MAXIMUM_LENGTH,
+            CASE WHEN c.system_type_id IN (48, 52, 56, 59, 60, 62, 106, 108, 122, 127)
+                 THEN c.precision END AS NUMERIC_PRECISION,
+            CASE WHEN c.system_type_id IN (48, 52, 56, 60, 106, 108, 122, 127)
+                 THEN c.scale END AS NUMERIC_SCALE
+        FROM sys.columns c
+        JOIN sys.tables t ON c.object_id = t.object_id
+        JOIN sys.schemas s ON t.schema_id = s.schema_id
+        JOIN sys.types ty ON c.user_type_id = ty.user_type_id
+        LEFT JOIN sys.types bt ON c.system_type_id = bt.user_type_id
+        {where}
+        ORDER BY s.name, t.name, c.column_id
+        """
+        predicates, params = self._since('t', modified_since)
+        return self._fetch(query, predicates, params, 't.object_id', object_ids, label='get_all_columns')
 
-    def get_stored_objects(self, object_type):
+    def get_stored_objects(self, object_type, object_ids=None, modified_since=None):
         """
-        Retrieves stored objects (Procedures, Functions, Triggers) and their definitions.
+        Yields stored objects (Procedures, Functions, Triggers) and their definitions.
         object_type: 'P' (Procedure), 'FN' (Scalar Function), 'IF' (Inline Table-valued Function), 
                      'TF' (Table-valued Function), 'TR' (Trigger)
+        object_ids: optional iterable restricting the result to these objects.
+        modified_since: optional datetime; only objects modified on or after it.
         """
         query = """
         SELECT 
@@ -53,14 +122,191 @@ class SchemaExtractor:
         FROM sys.objects o
         JOIN sys.schemas s ON o.schema_id = s.schema_id
         JOIN sys.sql_modules m ON o.object_id = m.object_id
-        WHERE o.type = ?
+        {where}
+        ORDER BY s.name, o.name
+        """
+        predicates, params = self._since('o', modified_since)
+        return self._fetch(query, ['o.type = ?'] + predicates, (object_type,) + params, 'o.object_id', object_ids,
+                           label='get_stored_objects')
+
+    def get_stored_object_digests(self, object_type, object_ids=None, modified_since=None):
+        """
+        Same as get_stored_objects, but returns a server-side SHA2_256 digest and the
+        byte length of each definition instead of the definition itself.
+        HASHBYTES accepts nvarchar(max) input from SQL Server 2016 onwards.
+        """
+        query = """
+        SELECT 
+            s.name AS [schema],
+            o.name,
+            HASHBYTES('SHA2_256', m.definition) AS definition_hash,
+            DATALENGTH(m.definition) AS definition_length,
+            o.type_desc,
+            o.modify_date
+        FROM sys.objects o
+        JOIN sys.schemas s ON o.schema_id = s.schema_id
+        JOIN sys.sql_modules m ON o.object_id = m.object_id
+        {where}
         ORDER BY s.name, o.name
         """
-        return self.connector.fetch_all(query, (object_type,))
+        predicates, params = self._since('o', modified_since)
+        return self._fetch(query, ['o.type = ?'] + predicates, (object_type,) + params, 'o.object_id', object_ids,
+                           label='get_stored_object_digests')
+
+    def fetch_definitions(self, names):
+        """
+        Fetches the definitions of specific modules by 'schema.name'.
+        Returns { 'schema.name': definition }.
+        """
+        query = """
+        SELECT 
+            s.name AS [schema],
+            o.name,
+            m.definition
+        FROM sys.objects o
+        JOIN sys.schemas s ON o.schema_id = s.schema_id
+        JOIN sys.sql_modules m ON o.object_id = m.object_id
+        {where}
+        """
+        return {f"{row.schema}.{row.name}": row.definition
+                for row in self._fetch_names(query, names, label='fetch_definitions')}
+
+    def get_object_stamps(self):
+        """
+        Retrieves (object_id, modify_date) for every table and module, without
+        any definitions. Used to decide what changed since a cached snapshot.
+        sys.objects.type is char(2), so single-letter codes come back padded.
+        """
+        query = """
+        SELECT 
+            o.object_id,
+            s.name AS [schema],
+            o.name,
+            o.type,
+            o.modify_date
+        FROM sys.objects o
+        JOIN sys.schemas s ON o.schema_id = s.schema_id
+        {where}
+        """
+        types = list(self.OBJECT_TYPE_CATEGORIES)
+        predicate = f"o.type IN ({', '.join('?' * len(types))})"
+        return self._fetch(query, [predicate], types, label='get_object_stamps')
+
+    def find_object_ids(self, object_filter):
+        """
+        Yields (object_id, type, schema, name) rows of the tables and modules
+        an ObjectFilter may select: its exact names match by equality and its
+        patterns by LIKE on the full name. When a rule has no LIKE form, every
+        table and module is returned.
+        Rows are a superset (exclude rules aren't applied), so callers match
+        each name with object_filter.matches.
+        """
+        query = """
+        SELECT 
+            o.object_id,
+            o.type,
+            s.name AS [schema],
+            o.name
+        FROM sys.objects o
+        JOIN sys.schemas s ON o.schema_id = s.schema_id
+        {where}
+        """
+        types = list(self.OBJECT_TYPE_CATEGORIES)
+        predicate = f"o.type IN ({', '.join('?' * len(types))})"
+        patterns = object_filter.like_patterns()
+        if patterns is None:
+            return self._fetch(query, [predicate], types, label='find_object_ids')
+        clauses = self._name_clauses(object_filter.names)
+        clauses += [("CONCAT(s.name, '.', o.name) LIKE ? ESCAPE '\\'", (pattern,)) for pattern in patterns]
+        return self._fetch_any(query, clauses, [predicate], types, label='find_object_ids')
+
+    def _fetch(self, query, predicates=(), params=(), id_column=None, object_ids=None, label=None):
+        """
+        Runs query with its {where} placeholder built from predicates and yields
+        its rows. When object_ids is given, the query runs once per batch of ids
+        with an extra IN predicate on id_column. label names the query when profiling.
+        """
+        if object_ids is None:
+            self.query_count += 1
+            yield from self.connector.iter_rows(query.format(where=self._where(predicates)), tuple(params),
+                                                label=label)
+            return
+
+        object_ids = list(object_ids)
+        for i in range(0, len(object_ids), self.ID_BATCH_SIZE):
+            batch = object_ids[i:i + self.ID_BATCH_SIZE]
+            batch_predicates = list(predicates) + [f"{id_column} IN ({', '.join('?' * len(batch))})"]
+            self.query_count += 1
+            yield from self.connector.iter_rows(query.format(where=self._where(batch_predicates)),
+                                                tuple(params) + tuple(batch), label=label)
+
+    def _fetch_names(self, query, names, predicates=(), params=(), schema_column='s.name', name_column='o.name',
+                     label=None):
+        """
+        Runs query once per batch of 'schema.name' values, matching them
+        against schema_column and name_column, and yields the rows.
+        """
+        clauses = self._name_clauses(names, schema_column, name_column)
+        return self._fetch_any(query, clauses, predicates, params, label)
+
+    @staticmethod
+    def _name_clauses(names, schema_column='s.name', name_column='o.name'):
+        # Schema and object names may both contain '.', so every split of the name is tried
+        clauses = []
+        for name in names:
+            for split in [index for index, c in enumerate(name) if c == '.']:
+                clauses.append((f"({schema_column} = ? AND {name_column} = ?)", (name[:split], name[split + 1:])))
+        return clauses
+
+    def _fetch_any(self, query, clauses, predicates=(), params=(), label=None):
+        """
+        Runs query with rows matching any of clauses, (sql, params) pairs, and
+        yields the rows; one query per batch of up to ID_BATCH_SIZE parameters.
+        """
+        batches = []
+        for sql, clause_params in clauses:
+            if not batches or len(batches[-1][1]) + len(clause_params) > self.ID_BATCH_SIZE:
+                batches.append(([], []))
+            batches[-1][0].append(sql)
+            batches[-1][1].extend(clause_params)
+        for batch, batch_params in batches:
+            match = " OR ".join(batch)
+            self.query_count += 1
+            yield from self.connector.iter_rows(query.format(where=self._where(list(predicates) + [f"({match})"])),
+                                                tuple(params) + tuple(batch_params), label=label)
+
+    @staticmethod
+    def _since(alias, modified_since):
+        """Predicates and params limiting alias's rows to modify_date >= modified_since."""
+        if modified_since is None:
+            return [], ()
+        return [f"{alias}.modify_date >= ?"], (modified_since,)
+
+    @staticmethod
+    def _where(predicates):
+        if not predicates:
+            return ""
+        return "WHERE " + " AND ".join(predicates)
+
+    # Work units that make up a full extraction: (category, sys.objects types)
+    CATEGORY_UNITS = [
+        ('tables', None),
+        ('procedures', 'P'),
+        ('functions', 'FN'),
+        ('functions', 'IF'),
+        ('functions', 'TF'),
+        ('triggers', 'TR')
+    ]
 
-    def get_full_schema(self):
+    def get_full_schema(self, bulk_columns=True, digests_only=False):
         """
         Builds a comprehensive dictionary of the entire schema.
+        bulk_columns: fetch all columns in one catalog query instead of one
+                      INFORMATION_SCHEMA query per table (the legacy path).
+        digests_only: fetch a server-side digest of each definition instead of the
+                      body; 'definition' is None until fetch_definitions fills it in.
+        Objects are compact records from src.core.model that support the same
+        dict-style access as the structure below.
         Structure:
         {
             'tables': { 'schema.name': { 'columns': {...}, 'modify_date': datetime } },
@@ -75,60 +321,117 @@ class SchemaExtractor:
             'functions': {},
             'triggers': {}
         }
+        self.query_count = 0
+        self.table_count = 0
+        self.column_query_count = 0
+        started = time.perf_counter()
+
+        for category, object_type in self.CATEGORY_UNITS:
+            full_schema[category].update(self.extract_unit(category, object_type, bulk_columns,
+                                                           digests_only=digests_only))
+
+        self.report = self.build_report(bulk_columns, self.query_count, self.table_count,
+                                        self.column_query_count, time.perf_counter() - started)
+        return full_schema
+
+    def extract_unit(self, category, object_type=None, bulk_columns=True, object_ids=None, digests_only=False,
+                     modified_since=None):
+        """
+        Extracts one work unit of the full schema: all tables, or all stored
+        objects of a single sys.objects type. Returns { 'schema.name': {...} }.
+        object_ids: optional iterable restricting the unit to these objects.
+        modified_since: optional datetime; only objects modified on or after it.
+        """
+        with profiling.span(f"extract {category}", "extract", type=object_type or 'U'):
+            if category == 'tables':
+                return self.extract_tables(bulk_columns, object_ids, modified_since)
+            return self.extract_stored_objects(object_type, object_ids, digests_only, modified_since)
+
+    def extract_tables(self, bulk_columns=True, object_ids=None, modified_since=None):
+        # Rows are streamed, and a connection serves one result set at a time,
+        # so bulk columns are grouped before the table list is read.
+        if bulk_columns:
+            grouped = {}
+            queries = self.query_count
+            for col in self.get_all_columns(object_ids, modified_since):
+                full_name = f"{col.TABLE_SCHEMA}.{col.TABLE_NAME}"
+                grouped.setdefault(full_name, {})[intern_name(col.COLUMN_NAME)] = self._column_def(col)
+            self.column_query_count += self.query_count - queries
+            tables = self.get_tables(object_ids, modified_since)
+        else:
+            tables = list(self.get_tables(object_ids, modified_since))
 
-        # 1. Tables
-        tables = self.get_tables()
+        result = {}
         for t in tables:
-            schema_name = t['TABLE_SCHEMA']
-            table_name = t['TABLE_NAME']
-            full_name = f"{schema_name}.{table_name}"
-            
-            columns = self.get_columns(schema_name, table_name)
-            col_dict = {}
-            for col in columns:
-                col_name = col['COLUMN_NAME']
-                col_dict[col_name] = {
-                    'type': col['DATA_TYPE'],
-                    'nullable': col['IS_NULLABLE'] == 'YES',
-                    'length': col['CHARACTER_MAXIMUM_LENGTH'],
-                    'precision': col['NUMERIC_PRECISION'],
-                    'scale': col['NUMERIC_SCALE']
-                }
+            schema_name = t.TABLE_SCHEMA
+            table_name = t.TABLE_NAME
+            full_name = intern_name(f"{schema_name}.{table_name}")
             
-            full_schema['tables'][full_name] = {
-                'columns': col_dict,
-                'modify_date': t['modify_date']
-            }
-
-        # 2. Procedures
-        procs = self.get_stored_objects('P')
-        for p in procs:
-            full_name = f"{p['schema']}.{p['name']}"
-            full_schema['procedures'][full_name] = {
-                'definition': p['definition'],
-                'type': p['type_desc'],
-                'modify_date': p['modify_date']
-            }
-
-        # 3. Functions (FN, IF, TF)
-        for ftype in ['FN', 'IF', 'TF']:
-            funcs = self.get_stored_objects(ftype)
-            for f in funcs:
-                full_name = f"{f['schema']}.{f['name']}"
-                full_schema['functions'][full_name] = {
-                    'definition': f['definition'],
-                    'type': f['type_desc'],
-                    'modify_date': f['modify_date']
-                }
-
-        # 4. Triggers
-        triggers = self.get_stored_objects('TR')
-        for tr in triggers:
-            full_name = f"{tr['schema']}.{tr['name']}"
-            full_schema['triggers'][full_name] = {
-                'definition': tr['definition'],
-                'type': tr['type_desc'],
-                'modify_date': tr['modify_date']
-            }
+            if bulk_columns:
+                col_dict = grouped.get(full_name, {})
+            else:
+                col_dict = {intern_name(col.COLUMN_NAME): self._column_def(col)
+                            for col in self.get_columns(schema_name, table_name)}
             
-        return full_schema
+            result[full_name] = Table(col_dict, t.modify_date)
+        self.table_count += len(result)
+        return result
+
+    def _column_def(self, col):
+        return Column.make(
+            col.DATA_TYPE,
+            self._is_nullable(col.IS_NULLABLE),
+            col.CHARACTER_MAXIMUM_LENGTH,
+            col.NUMERIC_PRECISION,
+            col.NUMERIC_SCALE
+        )
+
+    def extract_stored_objects(self, object_type, object_ids=None, digests_only=False, modified_since=None):
+        result = {}
+        if digests_only:
+            for o in self.get_stored_object_digests(object_type, object_ids, modified_since):
+                full_name = intern_name(f"{o.schema}.{o.name}")
+                result[full_name] = StoredObject(
+                    None,
+                    o.type_desc,
+                    o.modify_date,
+                    definition_hash=digest_from_server(o.definition_hash),
+                    definition_length=o.definition_length
+                )
+            return result
+
+        store = self.definition_store
+        for o in self.get_stored_objects(object_type, object_ids, modified_since):
+            full_name = intern_name(f"{o.schema}.{o.name}")
+            if store is None:
+                result[full_name] = StoredObject(o.definition, o.type_desc, o.modify_date)
+            else:
+                # The digest makes SchemaComparer compare hashes instead of bodies
+                digest, definition = store.put(o.definition)
+                result[full_name] = StoredObject(definition, o.type_desc, o.modify_date, definition_hash=digest)
+        return result
+
+    @staticmethod
+    def build_report(bulk_columns, queries, tables, column_queries, total_seconds):
+        # Per-table mode queries the columns of each table instead of running the bulk column queries
+        return {
+            'mode': 'bulk' if bulk_columns else 'per-table',
+            'tables': tables,
+            'queries': queries,
+            'round_trips_saved': tables - column_queries if bulk_columns else 0,
+            'total_seconds': total_seconds
+        }
+
+    def format_report(self):
+        """Returns a one-line summary of the last get_full_schema run."""
+        if not self.report:
+            return "No extraction has been run."
+        r = self.report
+        return (f"{r['mode']} extraction: {r['tables']} tables, {r['queries']} queries "
+                f"({r['round_trips_saved']} round trips saved), {r['total_seconds']:.2f}s")
+
+    def _is_nullable(self, value):
+        # INFORMATION_SCHEMA reports 'YES'/'NO', sys.columns reports a bit
+        if isinstance(value, str):
+            return value == 'YES'
+        return bool(value)
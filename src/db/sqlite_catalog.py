@@ -0,0 +1,247 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from .base import BaseConnector
+
+# Stand-in catalog: SQLite files shaped like the SQL Server catalog views that
+# SchemaExtractor reads, attached under the same names so its queries run as is.
+#   <directory>/sys.db                 sys.schemas, sys.objects, sys.tables,
+#                                      sys.sql_modules, sys.columns, sys.types
+#   <directory>/information_schema.db  INFORMATION_SCHEMA.COLUMNS
+SYS_FILE = "sys.db"
+INFORMATION_SCHEMA_FILE = "information_schema.db"
+
+# (name, system_type_id) of the SQL Server built-in types
+SYSTEM_TYPES = [
+    ('image', 34), ('text', 35), ('uniqueidentifier', 36), ('date', 40), ('time', 41),
+    ('datetime2', 42), ('datetimeoffset', 43), ('tinyint', 48), ('smallint', 52), ('int', 56),
+    ('smalldatetime', 58), ('real', 59), ('money', 60), ('datetime', 61), ('float', 62),
+    ('sql_variant', 98), ('ntext', 99), ('bit', 104), ('decimal', 106), ('numeric', 108),
+    ('smallmoney', 122), ('bigint', 127), ('varbinary', 165), ('varchar', 167), ('binary', 173),
+    ('char', 175), ('timestamp', 189), ('nvarchar', 231), ('nchar', 239), ('xml', 241)
+]
+# sys.objects type and type_desc of each category; functions keep the type_desc
+# they were saved with. type is char(2), so single letters are padded.
+OBJECT_TYPES = {
+    'tables': ('U ', 'USER_TABLE'),
+    'procedures': ('P ', 'SQL_STORED_PROCEDURE'),
+    'functions': ('FN', 'SQL_SCALAR_FUNCTION'),
+    'triggers': ('TR', 'SQL_TRIGGER')
+}
+FUNCTION_TYPES = {
+    'SQL_SCALAR_FUNCTION': 'FN',
+    'SQL_INLINE_TABLE_VALUED_FUNCTION': 'IF',
+    'SQL_TABLE_VALUED_FUNCTION': 'TF'
+}
+HASH_ALGORITHMS = {'MD5': 'md5', 'SHA1': 'sha1', 'SHA2_256': 'sha256', 'SHA2_512': 'sha512'}
+
+sqlite3.register_converter("CATALOG_DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+SYS_DDL = """
+CREATE TABLE sys.schemas (schema_id INTEGER PRIMARY KEY, name TEXT COLLATE NOCASE);
+-- RTRIM: char(2) comparisons ignore the padding, as on SQL Server
+CREATE TABLE sys.objects (object_id INTEGER PRIMARY KEY, name TEXT COLLATE NOCASE, schema_id INTEGER,
+                          type TEXT COLLATE RTRIM, type_desc TEXT, modify_date CATALOG_DATETIME);
+CREATE TABLE sys.tables (object_id INTEGER PRIMARY KEY, name TEXT COLLATE NOCASE, schema_id INTEGER,
+                         modify_date CATALOG_DATETIME);
+CREATE TABLE sys.sql_modules (object_id INTEGER PRIMARY KEY, definition TEXT);
+CREATE TABLE sys.columns (object_id INTEGER, name TEXT COLLATE NOCASE, column_id INTEGER,
+                          system_type_id INTEGER, user_type_id INTEGER, max_length INTEGER,
+                          precision INTEGER, scale INTEGER, is_nullable INTEGER);
+CREATE TABLE sys.types (user_type_id INTEGER PRIMARY KEY, system_type_id INTEGER, name TEXT);
+CREATE INDEX sys.objects_type ON objects (type);
+CREATE INDEX sys.objects_name ON objects (name);
+CREATE INDEX sys.columns_object ON columns (object_id, column_id);
+CREATE TABLE INFORMATION_SCHEMA.COLUMNS (TABLE_SCHEMA TEXT COLLATE NOCASE, TABLE_NAME TEXT COLLATE NOCASE,
+                                         COLUMN_NAME TEXT, ORDINAL_POSITION INTEGER, DATA_TYPE TEXT,
+                                         IS_NULLABLE TEXT, CHARACTER_MAXIMUM_LENGTH INTEGER,
+                                         NUMERIC_PRECISION INTEGER, NUMERIC_SCALE INTEGER);
+CREATE INDEX INFORMATION_SCHEMA.COLUMNS_table ON COLUMNS (TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION);
+"""
+
+# INFORMATION_SCHEMA.COLUMNS is derived from sys.columns the way SQL Server derives it,
+# so bulk and per-table extraction return the same values
+INFORMATION_SCHEMA_COLUMNS = """
+INSERT INTO INFORMATION_SCHEMA.COLUMNS
+SELECT s.name, t.name, c.name, c.column_id, ty.name,
+       CASE WHEN c.is_nullable THEN 'YES' ELSE 'NO' END,
+       CASE
+           WHEN ty.name IN ('varchar', 'char', 'varbinary', 'binary') THEN c.max_length
+           WHEN ty.name IN ('nvarchar', 'nchar') THEN
+               CASE WHEN c.max_length = -1 THEN -1 ELSE c.max_length / 2 END
+           WHEN ty.name = 'xml' THEN -1
+           WHEN ty.name IN ('text', 'image') THEN 2147483647
+           WHEN ty.name = 'ntext' THEN 1073741823
+       END,
+       CASE WHEN c.system_type_id IN (48, 52, 56, 59, 60, 62, 106, 108, 122, 127) THEN c.precision END,
+       CASE WHEN c.system_type_id IN (48, 52, 56, 60, 106, 108, 122, 127) THEN c.scale END
+FROM sys.columns c
+JOIN sys.tables t ON c.object_id = t.object_id
+JOIN sys.schemas s ON t.schema_id = s.schema_id
+JOIN sys.types ty ON c.user_type_id = ty.user_type_id
+"""
+
+def _hashbytes(algorithm, value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.encode('utf-16-le') # nvarchar
+    return hashlib.new(HASH_ALGORITHMS[algorithm.upper()], value).digest()
+
+def _concat(*values):
+    # NULL arguments count as empty strings, as in SQL Server
+    return "".join(str(value) for value in values if value is not None)
+
+def _datalength(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return len(value.encode('utf-16-le'))
+    if isinstance(value, bytes):
+        return len(value)
+    return len(str(value))
+
+@lru_cache(maxsize=64)
+def _row_class(fields):
+    return namedtuple('Row', fields, rename=True)
+
+def _row_factory(cursor, row):
+    # Attribute access by column name, as on pyodbc.Row
+    return _row_class(tuple(column[0] for column in cursor.description))(*row)
+
+def _max_length(type_name, length):
+    if length is None:
+        return 0
+    if type_name in ('nvarchar', 'nchar') and length != -1:
+        return length * 2
+    return length
+
+def _split_name(full_name):
+    schema, _, name = full_name.partition('.')
+    return (schema, name) if name else ('dbo', schema)
+
+def build_catalog(directory, schema):
+    """
+    Writes schema (the get_full_schema structure, plain dicts or records) as a
+    stand-in catalog in directory, replacing any catalog already there.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for file_name in [SYS_FILE, INFORMATION_SCHEMA_FILE]:
+        path = os.path.join(directory, file_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    connection = sqlite3.connect(':memory:')
+    try:
+        connection.execute("ATTACH DATABASE ? AS sys", (os.path.join(directory, SYS_FILE),))
+        connection.execute("ATTACH DATABASE ? AS INFORMATION_SCHEMA",
+                           (os.path.join(directory, INFORMATION_SCHEMA_FILE),))
+        connection.executescript(SYS_DDL)
+
+        types = {name: type_id for name, type_id in SYSTEM_TYPES}
+        schema_ids = {}
+        objects = []
+        tables = []
+        modules = []
+        columns = []
+        object_id = 1000
+        for category, (type_code, type_desc) in OBJECT_TYPES.items():
+            for full_name, obj in schema.get(category, {}).items():
+                object_id += 1
+                schema_name, name = _split_name(full_name)
+                schema_id = schema_ids.setdefault(schema_name, len(schema_ids) + 1)
+                modify_date = obj.get('modify_date')
+                modify_date = modify_date.isoformat() if modify_date else None
+                obj_type_code, obj_type_desc = type_code, type_desc
+                if category == 'tables':
+                    tables.append((object_id, name, schema_id, modify_date))
+                    for column_id, (column_name, col) in enumerate(obj['columns'].items(), 1):
+                        # User-defined type names are registered as their own base type
+                        type_id = types.setdefault(col['type'], 256 + len(types))
+                        columns.append((object_id, column_name, column_id, type_id, type_id,
+                                        _max_length(col['type'], col['length']),
+                                        col['precision'] or 0, col['scale'] or 0, int(bool(col['nullable']))))
+                else:
+                    obj_type_desc = obj.get('type') or type_desc
+                    if category == 'functions':
+                        obj_type_code = FUNCTION_TYPES.get(obj_type_desc, type_code)
+                    modules.append((object_id, obj.get('definition')))
+                objects.append((object_id, name, schema_id, obj_type_code, obj_type_desc, modify_date))
+
+        connection.executemany("INSERT INTO sys.schemas VALUES (?, ?)",
+                               [(schema_id, name) for name, schema_id in schema_ids.items()])
+        connection.executemany("INSERT INTO sys.types VALUES (?, ?, ?)",
+                               [(type_id, type_id, name) for name, type_id in types.items()])
+        connection.executemany("INSERT INTO sys.objects VALUES (?, ?, ?, ?, ?, ?)", objects)
+        connection.executemany("INSERT INTO sys.tables VALUES (?, ?, ?, ?)", tables)
+        connection.executemany("INSERT INTO sys.sql_modules VALUES (?, ?)", modules)
+        connection.executemany("INSERT INTO sys.columns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", columns)
+        connection.execute(INFORMATION_SCHEMA_COLUMNS)
+        connection.commit()
+    finally:
+        connection.close()
+
+class SqliteConnector(BaseConnector):
+    """
+    Connector for a stand-in catalog written by build_catalog, for measuring
+    extraction without SQL Server. The catalog is opened read-only, rows are
+    namedtuples and HASHBYTES/DATALENGTH behave as on SQL Server.
+    latency: seconds added to every query, so round-trip counts show up in
+             timings the way they do against a remote server.
+    """
+    def __init__(self, arraysize=BaseConnector.DEFAULT_ARRAYSIZE, latency=0.0):
+        super().__init__(arraysize)
+        self.latency = latency
+        self.query_count = 0
+        self._cancelled = threading.Event()
+
+    def connect(self, directory):
+        for file_name in [SYS_FILE, INFORMATION_SCHEMA_FILE]:
+            if not os.path.exists(os.path.join(directory, file_name)):
+                raise Exception(f"Connection failed: no stand-in catalog in {directory}")
+        connection = sqlite3.connect(':memory:', uri=True, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        for alias, file_name in [('sys', SYS_FILE), ('INFORMATION_SCHEMA', INFORMATION_SCHEMA_FILE)]:
+            uri = 'file:' + os.path.abspath(os.path.join(directory, file_name)) + '?mode=ro'
+            connection.execute(f"ATTACH DATABASE ? AS {alias}", (uri,))
+        connection.create_function('HASHBYTES', 2, _hashbytes, deterministic=True)
+        connection.create_function('DATALENGTH', 1, _datalength, deterministic=True)
+        connection.create_function('CONCAT', -1, _concat, deterministic=True)
+        connection.row_factory = _row_factory
+        self.close()
+        self.connection = connection
+        self.details = {'server': 'sqlite', 'database': os.path.abspath(directory)}
+        return True
+
+    def execute_query(self, query, params=None):
+        self.query_count += 1
+        cancelled = self._cancelled
+        if self.latency and cancelled.wait(self.latency):
+            raise Exception("Query cancelled.")
+        if params:
+            # Bound datetimes (e.g. a modify_date cutoff) compare against the stored ISO text
+            params = tuple(value.isoformat() if isinstance(value, datetime) else value for value in params)
+        return super().execute_query(query, params)
+
+    def cancel(self):
+        # Wakes queries waiting out their latency; later queries get a fresh event
+        cancelled, self._cancelled = self._cancelled, threading.Event()
+        cancelled.set()
+        if self.connection:
+            self.connection.interrupt()
+
+    def clone(self):
+        if not self.details:
+            raise Exception("Not connected to a database.")
+        clone = SqliteConnector(self.arraysize, self.latency)
+        clone.connect(self.details['database'])
+        return clone
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
@@ -1,8 +1,11 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, 
-                             QCheckBox, QDialogButtonBox, QMessageBox, QComboBox, QHBoxLayout, QPushButton, QInputDialog, QLabel, QTextEdit, QSplitter)
+                             QCheckBox, QDialogButtonBox, QMessageBox, QComboBox, QHBoxLayout, QPushButton, QInputDialog, QLabel, QSplitter,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QPlainTextEdit, QFileDialog)
 from PyQt6.QtCore import Qt
-import difflib
+from bisect import bisect_left, bisect_right
 from src.core.config import ConfigManager
+from src.core.linediff import SideBySide, compute_line_diff, format_definition
+from src.ui.diff_view import DiffTextView
 
 class ConnectionDialog(QDialog):
     def __init__(self, parent=None):
@@ -102,7 +105,11 @@ class ConnectionDialog(QDialog):
         }
 
 class DiffDialog(QDialog):
-    def __init__(self, obj_name, source_def, target_def, parent=None):
+    """
+    Side-by-side view of target vs source. line_diff: a precomputed LineDiff of
+    the target text against the source text; computed here when not given.
+    """
+    def __init__(self, obj_name, source_def, target_def, parent=None, line_diff=None):
         super().__init__(parent)
         self.setWindowTitle(f"Diff - {obj_name}")
         self.resize(1200, 800)
@@ -117,21 +124,17 @@ class DiffDialog(QDialog):
         header.setFixedHeight(20)
         layout.addWidget(header)
         
+        # Generate diff
+        src_text = format_definition(source_def)
+        tgt_text = format_definition(target_def)
+        if line_diff is None:
+            line_diff = compute_line_diff(tgt_text, src_text)
+        self.rows = SideBySide(tgt_text, src_text, line_diff.opcodes)
+        
         # Splitter for side-by-side view
         self.splitter = QSplitter(Qt.Orientation.Horizontal)
-        
-        self.left_view = QTextEdit()
-        self.left_view.setReadOnly(True)
-        self.left_view.setFontFamily("Courier New")
-        self.left_view.setFontPointSize(10)
-        self.left_view.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
-        
-        self.right_view = QTextEdit()
-        self.right_view.setReadOnly(True)
-        self.right_view.setFontFamily("Courier New")
-        self.right_view.setFontPointSize(10)
-        self.right_view.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
-        
+        self.left_view = DiffTextView(self.rows, 0)
+        self.right_view = DiffTextView(self.rows, 1)
         self.splitter.addWidget(self.left_view)
         self.splitter.addWidget(self.right_view)
         layout.addWidget(self.splitter)
@@ -140,16 +143,20 @@ class DiffDialog(QDialog):
         self.left_view.verticalScrollBar().valueChanged.connect(self.right_view.verticalScrollBar().setValue)
         self.right_view.verticalScrollBar().valueChanged.connect(self.left_view.verticalScrollBar().setValue)
         
-        # Generate diff
-        src_text = self._format_def(source_def)
-        tgt_text = self._format_def(target_def)
-        
-        left_html, right_html = self._generate_side_by_side_diff(tgt_text, src_text)
-        self.left_view.setHtml(left_html)
-        self.right_view.setHtml(right_html)
-        
-        
         btn_layout = QHBoxLayout()
+        self.btn_prev = QPushButton("◀ Previous Change")
+        self.btn_prev.setShortcut("Shift+F8")
+        self.btn_prev.setToolTip("Shift+F8")
+        self.btn_prev.clicked.connect(lambda: self.go_to_change(-1))
+        self.btn_next = QPushButton("Next Change ▶")
+        self.btn_next.setShortcut("F8")
+        self.btn_next.setToolTip("F8")
+        self.btn_next.clicked.connect(lambda: self.go_to_change(1))
+        self.change_label = QLabel(f"{len(self.rows.hunks)} changes, +{line_diff.added} / −{line_diff.removed} lines")
+        btn_layout.addWidget(self.btn_prev)
+        btn_layout.addWidget(self.btn_next)
+        btn_layout.addWidget(self.change_label)
+        
         btn_close = QPushButton("Close")
         btn_close.setFixedWidth(100)
         btn_close.clicked.connect(self.accept)
@@ -157,64 +164,88 @@ class DiffDialog(QDialog):
         btn_layout.addWidget(btn_close)
         layout.addLayout(btn_layout)
 
-    def _format_def(self, details):
-        if details is None:
-            return ""
-        if isinstance(details, dict) and 'definition' in details:
-            return str(details['definition'])
-        if isinstance(details, dict):
-            import json
-            from datetime import date, datetime
+    def go_to_change(self, step):
+        """Moves both views to the next (step=1) or previous (step=-1) change."""
+        hunks = self.rows.hunks
+        if not hunks:
+            return
+        row = self.left_view.current_row()
+        if step > 0:
+            position = bisect_right(hunks, row)
+            position = position if position < len(hunks) else 0 # Wrap around
+        else:
+            position = bisect_left(hunks, row) - 1 # -1 wraps to the last change
+        self.left_view.go_to_row(hunks[position])
+        self.right_view.go_to_row(hunks[position])
+        self.change_label.setText(f"Change {position % len(hunks) + 1} of {len(hunks)}")
+
+class ProfileDialog(QDialog):
+    """
+    Summary of a profiling session: time, rows and bytes per phase and query,
+    with JSON, Chrome trace and cProfile exports.
+    """
+    HEADERS = ["Category", "Name", "Count", "Total ms", "Max ms", "Rows", "KB"]
 
-            def default_serializer(obj):
-                if isinstance(obj, (datetime, date)):
-                    return obj.isoformat()
-                raise TypeError(f"Type {type(obj)} not serializable")
+    def __init__(self, profiler, parent=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.setWindowTitle("Timings")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout(self)
+        header = QLabel(f"Session started {profiler.started_at:%Y-%m-%d %H:%M:%S} - "
+                        f"{len(profiler.spans)} spans. Query spans last until their rows are consumed.")
+        layout.addWidget(header)
+
+        summary = profiler.summary()
+        table = QTableWidget(len(summary), len(self.HEADERS))
+        table.setHorizontalHeaderLabels(self.HEADERS)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        for row, total in enumerate(summary):
+            values = [total['category'], total['name'], total['count'], total['seconds'] * 1000,
+                      total['max_seconds'] * 1000, total['rows'], total['bytes'] / 1024]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                # Numbers are set as data so the columns sort numerically
+                item.setData(Qt.ItemDataRole.DisplayRole, round(value, 1) if isinstance(value, float) else value)
+                table.setItem(row, column, item)
+        table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        table.setSortingEnabled(True)
 
-            return json.dumps(details, indent=4, default=default_serializer)
-        return str(details)
+        if profiler.has_cprofile:
+            splitter = QSplitter(Qt.Orientation.Vertical)
+            splitter.addWidget(table)
+            stats = QPlainTextEdit(profiler.cprofile_stats())
+            stats.setReadOnly(True)
+            stats.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+            splitter.addWidget(stats)
+            layout.addWidget(splitter)
+        else:
+            layout.addWidget(table)
 
-    def _generate_side_by_side_diff(self, old_text, new_text):
-        old_lines = old_text.splitlines()
-        new_lines = new_text.splitlines()
-        
-        matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
-        
-        left_parts = ["<pre style='font-family: monospace; white-space: pre;'>"]
-        right_parts = ["<pre style='font-family: monospace; white-space: pre;'>"]
-        
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'equal':
-                for i in range(i1, i2):
-                    line = self._html_escape(old_lines[i])
-                    # Need consistent line height if possible. divs help.
-                    left_parts.append(f"<div>{line}</div>")
-                    right_parts.append(f"<div>{line}</div>")
-            elif tag == 'replace':
-                max_len = max(i2 - i1, j2 - j1)
-                for k in range(max_len):
-                    if i1 + k < i2:
-                        left_parts.append(f"<div style='background-color: #fee2e2; color: #991b1b;'>{self._html_escape(old_lines[i1+k])}</div>")
-                    else:
-                        left_parts.append("<div style='background-color: #f0f7ff;'>&nbsp;</div>")
-                    
-                    if j1 + k < j2:
-                        right_parts.append(f"<div style='background-color: #dcfce7; color: #166534;'>{self._html_escape(new_lines[j1+k])}</div>")
-                    else:
-                        right_parts.append("<div style='background-color: #f0f7ff;'>&nbsp;</div>")
-            elif tag == 'delete':
-                for i in range(i1, i2):
-                    left_parts.append(f"<div style='background-color: #fee2e2; color: #991b1b;'>{self._html_escape(old_lines[i])}</div>")
-                    right_parts.append("<div style='background-color: #f0f7ff;'>&nbsp;</div>")
-            elif tag == 'insert':
-                for j in range(j1, j2):
-                    left_parts.append("<div style='background-color: #f0f7ff;'>&nbsp;</div>")
-                    right_parts.append(f"<div style='background-color: #dcfce7; color: #166534;'>{self._html_escape(new_lines[j])}</div>")
-                    
-        left_parts.append("</pre>")
-        right_parts.append("</pre>")
-        return "".join(left_parts), "".join(right_parts)
+        btn_layout = QHBoxLayout()
+        btn_json = QPushButton("Export JSON...")
+        btn_json.clicked.connect(lambda: self._export("JSON Files (*.json)", profiler.save_json))
+        btn_trace = QPushButton("Export Chrome Trace...")
+        btn_trace.clicked.connect(lambda: self._export("Trace Files (*.json)", profiler.save_chrome_trace))
+        btn_layout.addWidget(btn_json)
+        btn_layout.addWidget(btn_trace)
+        if profiler.has_cprofile:
+            btn_cprofile = QPushButton("Save cProfile...")
+            btn_cprofile.clicked.connect(lambda: self._export("Profile Files (*.prof)", profiler.save_cprofile))
+            btn_layout.addWidget(btn_cprofile)
+        btn_close = QPushButton("Close")
+        btn_close.setFixedWidth(100)
+        btn_close.clicked.connect(self.accept)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
 
-    def _html_escape(self, text):
-        if not text: return "&nbsp;"
-        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace(" ", "&nbsp;")
+    def _export(self, file_filter, save):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Timings", "", file_filter)
+        if file_path:
+            try:
+                save(file_path)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to export timings: {str(e)}")
@@ -0,0 +1,312 @@
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from src.core.filters import OBJECT_TYPES, empty_diff
+
+SEGMENTS = [
+    ('new', "New", "Create"),
+    ('modified', "Modified", "Alter/Modify"),
+    ('dropped', "Dropped (Target only)", "Drop")
+]
+SEGMENT_LABELS = {key: label for key, label, _ in SEGMENTS}
+SEGMENT_CHANGES = {key: change for key, _, change in SEGMENTS}
+
+COLUMN_CHANGES = [
+    ('add_columns', "Add Column", ""),
+    ('alter_columns', "Alter Column", "Mismatch"),
+    ('drop_columns', "Drop Column", "")
+]
+
+class DiffNode:
+    """
+    One row of the diff tree. path identifies the node independently of
+    row positions: (category,), (category, segment), (category, segment, name)
+    or (category, segment, name, column).
+    """
+    __slots__ = ('parent', 'row', 'path', 'label', 'change', 'details', 'children')
+
+    def __init__(self, parent, row, path, label, change="", details=""):
+        self.parent = parent
+        self.row = row
+        self.path = path
+        self.label = label
+        self.change = change
+        self.details = details
+        self.children = None # Created on first access
+
+    @property
+    def level(self):
+        return len(self.path)
+
+    @property
+    def category(self):
+        return self.path[0] if self.path else None
+
+    @property
+    def segment(self):
+        return self.path[1] if len(self.path) > 1 else None
+
+    @property
+    def name(self):
+        return self.path[2] if len(self.path) > 2 else None
+
+class DiffTreeModel(QAbstractItemModel):
+    """
+    Tree model read directly from a diff structure. Child rows are created
+    only when a node is expanded, and check states live in a dict keyed by
+    node path, so building the model costs the same for any diff size.
+    Unchecked paths apply to all of their descendants.
+    """
+    HEADERS = ["Object", "Change Type", "Details", "Lines +/−"]
+    LINES_COLUMN = 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.diff = empty_diff()
+        self._root = DiffNode(None, 0, (), "")
+        self._checks = {}
+        self._name_filter = None
+        self._line_stats = {}
+        self._sort = None # (column, order) applied to object and column rows
+
+    # --- Public API ---
+
+    def set_diff(self, diff):
+        self.beginResetModel()
+        self.diff = diff
+        self._checks = {}
+        self._name_filter = None
+        self._line_stats = {}
+        self._root = DiffNode(None, 0, (), "")
+        self.endResetModel()
+
+    def set_line_stats(self, line_stats):
+        """line_stats: { (category, name): (added, removed) } for the Lines column."""
+        self._line_stats = line_stats
+        self._emit_column_changed(self._root, self.LINES_COLUMN)
+
+    def set_name_filter(self, visible):
+        """
+        visible: callable(node_path) -> bool deciding which objects and columns are
+                 shown, or None to show everything. Check states are kept.
+        """
+        self.beginResetModel()
+        self._name_filter = visible
+        self._root = DiffNode(None, 0, (), "")
+        self.endResetModel()
+
+    def node(self, index):
+        if not index.isValid():
+            return self._root
+        return index.internalPointer()
+
+    def is_checked(self, path):
+        """Effective check state of a path: the nearest explicitly set ancestor wins."""
+        for length in range(len(path), 0, -1):
+            state = self._checks.get(path[:length])
+            if state is not None:
+                return state == Qt.CheckState.Checked
+        return True
+
+    def selected_diff(self):
+        """Constructs a new diff containing only the checked objects."""
+        s_diff = empty_diff()
+        for category in OBJECT_TYPES:
+            for segment in ['new', 'modified']:
+                for name, details in self.diff[category][segment].items():
+                    if self.is_checked((category, segment, name)):
+                        s_diff[category][segment][name] = details
+            s_diff[category]['dropped'] = [name for name in self.diff[category]['dropped']
+                                           if self.is_checked((category, 'dropped', name))]
+        return s_diff
+
+    # --- QAbstractItemModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self._children(self.node(parent))
+        if 0 <= row < len(children) and 0 <= column < len(self.HEADERS):
+            return self.createIndex(row, column, children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._children(self.node(parent)))
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Answered without building the children, so collapsed nodes stay unbuilt
+        node = self.node(parent)
+        if node.children is not None or node.level < 2:
+            return self.rowCount(parent) > 0
+        if node.level == 2:
+            return True # Segments are only listed when they have visible objects
+        return node.level == 3 and node.category == 'tables' and node.segment == 'modified'
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == self.LINES_COLUMN:
+                stats = self._stats(node)
+                return f"+{stats[0]} / −{stats[1]}" if stats else ""
+            return [node.label, node.change, node.details][index.column()]
+        if role == Qt.ItemDataRole.CheckStateRole and index.column() == 0 and self._is_checkable(node):
+            return Qt.CheckState.Checked if self.is_checked(node.path) else Qt.CheckState.Unchecked
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == 0 and self._is_checkable(index.internalPointer()):
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or not index.isValid():
+            return False
+        node = index.internalPointer()
+        state = Qt.CheckState(value)
+        # Setting a parent overrides whatever was set on its descendants
+        prefix_length = len(node.path)
+        for path in [p for p in self._checks if len(p) > prefix_length and p[:prefix_length] == node.path]:
+            del self._checks[path]
+        self._checks[node.path] = state
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        self._emit_children_changed(index, node)
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Objects within a segment and columns within a table are sorted;
+        # categories and segments keep their fixed order.
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        cells = [(index.internalPointer(), index.column()) for index in persistent]
+        self._sort = (column, order)
+        self._sort_children(self._root)
+        self.changePersistentIndexList(persistent, [self.createIndex(node.row, cell_column, node)
+                                                    for node, cell_column in cells])
+        self.layoutChanged.emit()
+
+    # --- Internals ---
+
+    def _stats(self, node):
+        if node.level != 3:
+            return None
+        return self._line_stats.get((node.category, node.name))
+
+    def _sort_key(self, node):
+        column = self._sort[0]
+        if column == self.LINES_COLUMN:
+            stats = self._stats(node)
+            return sum(stats) if stats else -1
+        return [node.label.lower(), node.change, node.details][column]
+
+    def _order(self, children):
+        children.sort(key=self._sort_key, reverse=self._sort[1] == Qt.SortOrder.DescendingOrder)
+        for row, child in enumerate(children):
+            child.row = row
+
+    def _sort_children(self, node):
+        if not node.children:
+            return
+        if node.level >= 2:
+            self._order(node.children)
+        for child in node.children:
+            self._sort_children(child)
+
+    def _emit_column_changed(self, node, column):
+        # Only built rows can be on screen; unbuilt ones read the value when created
+        if not node.children:
+            return
+        if node.level == 2:
+            first = self.createIndex(0, column, node.children[0])
+            last = self.createIndex(len(node.children) - 1, column, node.children[-1])
+            self.dataChanged.emit(first, last, [Qt.ItemDataRole.DisplayRole])
+            return
+        for child in node.children:
+            self._emit_column_changed(child, column)
+
+    def _is_checkable(self, node):
+        # Categories, segments and objects; columns follow their table
+        return 0 < node.level < 4
+
+    def _emit_children_changed(self, index, node):
+        # Only built children can be on screen; unbuilt ones read the new state when created
+        if not node.children:
+            return
+        first = self.index(0, 0, index)
+        last = self.index(len(node.children) - 1, 0, index)
+        self.dataChanged.emit(first, last, [Qt.ItemDataRole.CheckStateRole])
+        for child in node.children:
+            if child.children:
+                self._emit_children_changed(self.createIndex(child.row, 0, child), child)
+
+    def _children(self, node):
+        if node.children is None:
+            node.children = self._build_children(node)
+        return node.children
+
+    def _build_children(self, node):
+        rows = []
+        if node.level == 0:
+            for category in OBJECT_TYPES:
+                if any(self._has_visible(category, segment) for segment, _, _ in SEGMENTS):
+                    rows.append(((category,), category.capitalize(), "", ""))
+        elif node.level == 1:
+            for segment, label, _ in SEGMENTS:
+                if self._has_visible(node.category, segment):
+                    rows.append(((node.category, segment), label, "", ""))
+        elif node.level == 2:
+            change = SEGMENT_CHANGES[node.segment]
+            for name in self._visible_names(node.category, node.segment):
+                rows.append(((node.category, node.segment, name), name, change, ""))
+        elif node.level == 3 and node.category == 'tables' and node.segment == 'modified':
+            changes = self.diff['tables']['modified'][node.name]
+            for key, change, details in COLUMN_CHANGES:
+                for col_name in changes[key]:
+                    path = node.path + (col_name,)
+                    if self._name_filter is None or self._name_filter(path) or self._name_filter(node.path):
+                        rows.append((path, col_name, change, details))
+        children = [DiffNode(node, row, path, label, change, details)
+                    for row, (path, label, change, details) in enumerate(rows)]
+        if self._sort and node.level >= 2:
+            self._order(children)
+        return children
+
+    def _has_visible(self, category, segment):
+        names = self.diff[category][segment]
+        if self._name_filter is None:
+            return bool(names)
+        return any(self._object_visible(category, segment, name) for name in names)
+
+    def _visible_names(self, category, segment):
+        names = self.diff[category][segment]
+        if self._name_filter is None:
+            return list(names)
+        return [name for name in names if self._object_visible(category, segment, name)]
+
+    def _object_visible(self, category, segment, name):
+        path = (category, segment, name)
+        if self._name_filter(path):
+            return True
+        if category == 'tables' and segment == 'modified':
+            changes = self.diff['tables']['modified'][name]
+            return any(self._name_filter(path + (col_name,))
+                       for key, _, _ in COLUMN_CHANGES for col_name in changes[key])
+        return False
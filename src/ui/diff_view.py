@@ -0,0 +1,76 @@
+from PyQt6.QtWidgets import QPlainTextEdit
+from PyQt6.QtGui import QColor, QFont, QPainter, QSyntaxHighlighter, QTextCharFormat, QTextCursor
+from PyQt6.QtCore import QRectF
+
+ROW_BACKGROUNDS = {
+    'removed': QColor("#fee2e2"),
+    'added': QColor("#dcfce7"),
+    'filler': QColor("#f0f7ff")
+}
+ROW_TEXT = {'removed': QColor("#991b1b"), 'added': QColor("#166534")}
+CHANGED_TEXT_BACKGROUNDS = {'removed': QColor("#fca5a5"), 'added': QColor("#86efac")}
+
+class DiffHighlighter(QSyntaxHighlighter):
+    """Colours the text of changed rows and the changed characters of replaced lines."""
+    def __init__(self, document, rows, side):
+        super().__init__(document)
+        self.rows = rows
+        self.side = side # 0 = left (old), 1 = right (new)
+        self.kinds = rows.left_kinds if side == 0 else rows.right_kinds
+        self.kind = 'removed' if side == 0 else 'added'
+
+        self.line_format = QTextCharFormat()
+        self.line_format.setForeground(ROW_TEXT[self.kind])
+        self.changed_format = QTextCharFormat(self.line_format)
+        self.changed_format.setBackground(CHANGED_TEXT_BACKGROUNDS[self.kind])
+
+    def highlightBlock(self, text):
+        row = self.currentBlock().blockNumber()
+        if row >= len(self.kinds) or self.kinds[row] != self.kind:
+            return
+        self.setFormat(0, len(text), self.line_format)
+        for start, length in self.rows.intraline(row)[self.side]:
+            self.setFormat(start, length, self.changed_format)
+
+class DiffTextView(QPlainTextEdit):
+    """
+    One side of a SideBySide diff. QPlainTextEdit lays out and paints only the
+    visible blocks; row backgrounds are painted the same way in paintEvent.
+    """
+    def __init__(self, rows, side, parent=None):
+        super().__init__(parent)
+        self.kinds = rows.left_kinds if side == 0 else rows.right_kinds
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        font = QFont("Courier New", 10)
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        self.setFont(font)
+
+        self.setPlainText("\n".join(rows.left_lines if side == 0 else rows.right_lines))
+        self.highlighter = DiffHighlighter(self.document(), rows, side)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        offset = self.contentOffset()
+        width = self.viewport().width()
+        bottom = event.rect().bottom()
+        block = self.firstVisibleBlock()
+        while block.isValid():
+            rect = self.blockBoundingGeometry(block).translated(offset)
+            if rect.top() > bottom:
+                break
+            row = block.blockNumber()
+            color = ROW_BACKGROUNDS.get(self.kinds[row]) if row < len(self.kinds) else None
+            if color is not None:
+                painter.fillRect(QRectF(0, rect.top(), width, rect.height()), color)
+            block = block.next()
+        painter.end()
+        super().paintEvent(event)
+
+    def current_row(self):
+        return self.textCursor().blockNumber()
+
+    def go_to_row(self, row):
+        cursor = QTextCursor(self.document().findBlockByNumber(row))
+        self.setTextCursor(cursor)
+        self.centerCursor()
@@ -1,17 +1,48 @@
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QGroupBox, QTextEdit, QTreeWidget, 
-                             QTreeWidgetItem, QMessageBox, QSplitter, QLineEdit, QFileDialog, QMenu, QHeaderView,
+from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+                             QPushButton, QLabel, QGroupBox, QTextEdit, QTreeView, 
+                             QMessageBox, QSplitter, QLineEdit, QFileDialog, QMenu, QHeaderView,
                              QCheckBox, QDateEdit)
-from PyQt6.QtCore import Qt, QPoint, QDate
+from PyQt6.QtCore import Qt, QPoint, QDate, QTimer
 import json
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
 from datetime import datetime, date
 from src.db.connector import DbConnector
+from src.db.pool import close_all_pools
+from src.db.parallel import DEFAULT_WORKERS
 from src.db.schema import SchemaExtractor
-from src.core.compare import SchemaComparer
+from src.core import profiling
+from src.core.filters import OBJECT_TYPES, ObjectFilter, empty_diff
+from src.core.container import FILE_EXTENSION, SavedComparison, save_comparison
 from src.core.generator import ScriptGenerator
-from src.ui.dialogs import ConnectionDialog, DiffDialog
+from src.core.linediff import LineDiffCache, compute_line_diff, format_definition, precompute_line_diffs
+from src.core.search import DiffSearchIndex
+from src.core.pipeline import CancelToken, ComparisonPipeline, load_missing_definitions, STORED_OBJECT_TYPES
+from src.core.snapshot import SnapshotCache
+from src.core.store import DefinitionStore
+from src.core.model import json_default
+from src.ui.dialogs import ConnectionDialog, DiffDialog, ProfileDialog
+from src.ui.diff_model import DiffTreeModel
+from src.ui.worker import TaskWorker
+
+def _load_definitions(schema, definition_source, names_by_category, cancel_token, store=None):
+    """load_missing_definitions off the main connections: a database gets its own pooled connection."""
+    if isinstance(definition_source, DbConnector):
+        with definition_source.lease() as connector:
+            cancel_token.add_callback(connector.cancel)
+            return load_missing_definitions(schema, connector, names_by_category, cancel_token, store)
+    return load_missing_definitions(schema, definition_source, names_by_category, cancel_token, store)
+
+def _body_missing(obj):
+    # Stored objects compared by hash whose body was not downloaded
+    return obj is None or (obj.get('definition_hash') is not None and obj.get('definition') is None)
 
 class MainWindow(QMainWindow):
+    SEARCH_DELAY_MS = 250 # Typing pause before the search is applied
+    SCRIPT_PREVIEW_CHARS = 200_000 # The script pane shows at most this much of the script
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Broono")
@@ -23,7 +54,18 @@ class MainWindow(QMainWindow):
         self.diff = None
         self.source_schema = None
         self.target_schema = None
-        self.object_filter = None # Set of object names (schema.object)
+        self.object_filter = None # ObjectFilter of names, patterns and exclusions
+        self.bulk_columns = True # False restores the legacy per-table column queries
+        self.extraction_workers = DEFAULT_WORKERS # Worker connections per database
+        self.worker = None # Background TaskWorker while a comparison or generation runs
+        self.definition_store = DefinitionStore() # Bodies shared by comparisons and snapshots
+        self.snapshot_cache = SnapshotCache(store=self.definition_store) # None forces a full extraction every run
+        self.search_index = DiffSearchIndex(empty_diff()) # Rebuilt for each comparison
+        self.line_diffs = LineDiffCache() # Line diffs of the current comparison
+        self.diff_worker = None # Background TaskWorker precomputing line diffs
+        self.script_path = None # Temporary file holding the last generated script
+        self.saved_comparison = None # SavedComparison the results were loaded from
+        self.profiler = None # Profiling session of the last comparison, ended when its task finishes
         
         # UI Setup
         central_widget = QWidget()
@@ -107,6 +149,16 @@ class MainWindow(QMainWindow):
         self.btn_generate.clicked.connect(self.generate_script)
         self.btn_generate.setEnabled(False)
         
+        self.btn_save_script = QPushButton("📝 Save Script...")
+        self.btn_save_script.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_save_script.clicked.connect(self.save_script)
+        self.btn_save_script.setEnabled(False)
+        
+        self.btn_cancel = QPushButton("⛔ Cancel")
+        self.btn_cancel.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_cancel.clicked.connect(self.cancel_task)
+        self.btn_cancel.setVisible(False)
+        
         self.btn_save_comp = QPushButton("💾 Save Comp.")
         self.btn_save_comp.setCursor(Qt.CursorShape.PointingHandCursor)
         self.btn_save_comp.clicked.connect(self.save_comparison)
@@ -118,6 +170,8 @@ class MainWindow(QMainWindow):
         
         action_layout.addWidget(self.btn_compare)
         action_layout.addWidget(self.btn_generate)
+        action_layout.addWidget(self.btn_save_script)
+        action_layout.addWidget(self.btn_cancel)
 
         # Date Filter
         self.chk_date_filter = QCheckBox("Changes from:")
@@ -131,6 +185,29 @@ class MainWindow(QMainWindow):
 
         action_layout.addWidget(self.chk_date_filter)
         action_layout.addWidget(self.date_edit)
+
+        # Hash-first comparison (SQL Server 2016+)
+        self.chk_digests = QCheckBox("Compare by hash")
+        self.chk_digests.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.chk_digests.setToolTip("Extract only metadata and hashes of definitions; bodies are downloaded when a diff is opened or a script is generated (SQL Server 2016+)")
+        action_layout.addWidget(self.chk_digests)
+
+        # Phase and query timings of the next comparison
+        self.chk_profile = QCheckBox("Profile")
+        self.chk_profile.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.chk_profile.setToolTip("Time every query and phase of the next comparison, including building the results tree")
+        self.chk_cprofile = QCheckBox("cProfile")
+        self.chk_cprofile.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.chk_cprofile.setToolTip("Also run cProfile on the comparison thread (slower)")
+        self.chk_cprofile.setEnabled(False)
+        self.chk_profile.toggled.connect(self.chk_cprofile.setEnabled)
+        self.btn_timings = QPushButton("⏱ Timings")
+        self.btn_timings.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_timings.clicked.connect(self.show_timings)
+        self.btn_timings.setEnabled(False)
+        action_layout.addWidget(self.chk_profile)
+        action_layout.addWidget(self.chk_cprofile)
+        action_layout.addWidget(self.btn_timings)
         
         action_layout.addStretch(1) # Gap between primary and secondary
         
@@ -151,12 +228,22 @@ class MainWindow(QMainWindow):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 Search objects...")
         self.search_input.setClearButtonEnabled(True)
-        self.search_input.textChanged.connect(self.filter_tree)
+        self.search_input.setToolTip("Substring, prefix* or wild?card match; 'schema.' limits to a schema")
+        # Searches run once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_tree(self.search_input.text()))
+        self.search_input.textChanged.connect(self.search_timer.start)
         tree_container_layout.addWidget(self.search_input)
         
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["Object", "Change Type", "Details"])
-        self.tree.itemDoubleClicked.connect(self.show_diff)
+        self.tree = QTreeView()
+        self.tree_model = DiffTreeModel(self)
+        self.tree.setModel(self.tree_model)
+        self.tree.setUniformRowHeights(True) # Lets the view skip measuring off-screen rows
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.tree.doubleClicked.connect(self.show_diff)
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
         self.tree.setColumnWidth(0, 300) # 30% of original 330 container width
@@ -206,17 +293,18 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Object List", "", "Text Files (*.txt);;All Files (*)")
         if file_path:
             try:
-                with open(file_path, 'r') as f:
-                    self.object_filter = {line.strip() for line in f if line.strip()}
-                self.statusBar().showMessage(f"Loaded {len(self.object_filter)} objects from list")
+                self.object_filter = ObjectFilter.from_file(file_path)
+                self.statusBar().showMessage(f"Loaded {len(self.object_filter)} rules from list")
                 self.btn_clear_list.setEnabled(True)
-                QMessageBox.information(self, "Success", f"Loaded {len(self.object_filter)} objects. Comparison will be restricted to these items.")
+                self.btn_load_list.setToolTip("")
+                QMessageBox.information(self, "Success", f"Loaded {len(self.object_filter)} rules. Comparison will be restricted to the objects they select.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to load file: {str(e)}")
 
     def clear_object_list(self):
         self.object_filter = None
         self.btn_clear_list.setEnabled(False)
+        self.btn_load_list.setToolTip("")
         self.statusBar().showMessage("Object list cleared. Next comparison will include all objects.")
 
     def run_comparison(self):
@@ -224,100 +312,253 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please connect to both Source and Target databases.")
             return
 
-        try:
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-            self.btn_compare.setEnabled(False)
-            
-            self.statusBar().showMessage("Extracting schemas...")
-            QApplication.processEvents() # Force UI update
-            
-            source_extractor = SchemaExtractor(self.source_connector)
-            target_extractor = SchemaExtractor(self.target_connector)
-            
-            self.source_schema = source_extractor.get_full_schema()
-            self.target_schema = target_extractor.get_full_schema()
-            
-            # Apply file filter if exists
-            if self.object_filter:
-                self.source_schema = self._apply_object_filter(self.source_schema)
-                self.target_schema = self._apply_object_filter(self.target_schema)
-
-            self.statusBar().showMessage("Comparing...")
-            QApplication.processEvents() # Force UI update
-
-            comparer = SchemaComparer()
-            self.diff = comparer.compare(self.source_schema, self.target_schema)
-
-            # Apply date filter if enabled
-            if self.chk_date_filter.isChecked():
-                filter_date_q = self.date_edit.date()
-                filter_dt = datetime(filter_date_q.year(), filter_date_q.month(), filter_date_q.day())
-                self.diff = self._apply_date_filter(self.diff, filter_dt)
-            
+        cutoff_date = None
+        if self.chk_date_filter.isChecked():
+            filter_date_q = self.date_edit.date()
+            cutoff_date = datetime(filter_date_q.year(), filter_date_q.month(), filter_date_q.day())
+
+        pipeline = ComparisonPipeline(
+            self.extraction_workers,
+            bulk_columns=self.bulk_columns,
+            object_filter=self.object_filter,
+            cutoff_date=cutoff_date,
+            snapshot_cache=self.snapshot_cache,
+            definition_store=self.definition_store,
+            digests_only=self.chk_digests.isChecked(),
+            lazy_definitions=True # Bodies are fetched when a diff is opened or a script generated
+        )
+        profiler = self._start_profiling()
+
+        def task(progress, cancel_token):
+            pipeline.progress = progress
+            pipeline.cancel_token = cancel_token
+            with profiler.profile_thread() if profiler else nullcontext():
+                return pipeline.run(self.source_connector, self.target_connector)
+
+        def on_success(result):
+            self.source_schema, self.target_schema, self.diff = result
+            self._set_saved_comparison(None)
+            self.statusBar().showMessage("Building results tree...")
             self._populate_tree(self.diff)
             self.btn_generate.setEnabled(True)
             self.btn_save_comp.setEnabled(True)
-            self.statusBar().showMessage("Comparison Complete")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Comparison failed: {str(e)}")
-            self.statusBar().showMessage("Error during comparison")
-        finally:
-            QApplication.restoreOverrideCursor()
-            self.btn_compare.setEnabled(True)
+            message = f"Comparison Complete - {pipeline.extraction_report}"
+            if pipeline.object_filter:
+                # Hits per rule in the tooltip, to spot rules that select nothing
+                unused = sum(1 for _, _, hits in pipeline.object_filter.hit_counts() if not hits)
+                message += f"; {unused} of {len(pipeline.object_filter)} filter rules without hits"
+                self.btn_load_list.setToolTip(pipeline.object_filter.format_hits())
+            self.statusBar().showMessage(message)
 
-    def show_context_menu(self, pos):
-        item = self.tree.itemAt(pos)
-        if not item or item.parent() is None: # Not an object
+        self._start_task(task, on_success, "Comparison")
+
+    def generate_script(self):
+        if not self.diff:
             return
-            
+        
+        selected_diff = self._get_selected_diff()
+        source_definitions = self._definition_source('source')
+        source_schema = self.source_schema
+        store = self.definition_store
+        preview_limit = self.SCRIPT_PREVIEW_CHARS
+
+        def task(progress, cancel_token):
+            if source_definitions:
+                # Only the selected objects' bodies are needed
+                progress("Fetching definitions...")
+                _load_definitions(source_schema, source_definitions,
+                                  {category: list(selected_diff[category]['new']) + list(selected_diff[category]['modified'])
+                                   for category in STORED_OBJECT_TYPES}, cancel_token, store)
+            # The script goes straight to disk; only the preview is kept in memory
+            preview = []
+            preview_size = 0
+            written = 0
+            script_file = tempfile.NamedTemporaryFile('w', suffix='.sql', prefix='broono_', delete=False, encoding='utf-8')
+            try:
+                with script_file, profiling.span("generate script", "generate") as span:
+                    for batch in ScriptGenerator().iter_script(selected_diff):
+                        cancel_token.check()
+                        script_file.write(batch)
+                        written += len(batch)
+                        if preview_size < preview_limit:
+                            preview.append(batch[:preview_limit - preview_size])
+                            preview_size += len(preview[-1])
+                        progress(f"Generating script... {written / 1048576:.1f} MB")
+                    span.add(chars=written)
+            except BaseException:
+                os.remove(script_file.name)
+                raise
+            return script_file.name, "".join(preview), written
+
+        def on_success(result):
+            path, preview, size = result
+            self._set_script_path(path)
+            if size > len(preview):
+                preview += (f"\n\n-- Preview truncated: showing {len(preview):,} of {size:,} characters. "
+                            "Use 'Save Script...' to get the full script.")
+            self.script_view.setPlainText(preview)
+            # Show the script view (30/70 split)
+            self.results_splitter.setSizes([330, 770])
+            self.statusBar().showMessage(f"Script generated ({size / 1048576:.1f} MB)")
+
+        self._start_task(task, on_success, "Generation")
+
+    def save_script(self):
+        if not self.script_path:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Script", "", "SQL Files (*.sql);;All Files (*)")
+        if file_path:
+            try:
+                shutil.copyfile(self.script_path, file_path)
+                self.statusBar().showMessage(f"Script saved to {file_path}")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to save script: {str(e)}")
+
+    def _set_script_path(self, path):
+        """Replaces the generated script file, deleting the previous one."""
+        if self.script_path and os.path.exists(self.script_path):
+            os.remove(self.script_path)
+        self.script_path = path
+        self.btn_save_script.setEnabled(path is not None)
+
+    def _start_task(self, task, on_success, label):
+        """Runs task on a TaskWorker, streaming its progress to the status bar."""
+        if self.worker and self.worker.isRunning():
+            return
+
+        self.worker = TaskWorker(task, self)
+        self.worker.progress.connect(self.statusBar().showMessage)
+        self.worker.succeeded.connect(on_success)
+        self.worker.failed.connect(lambda message: self._task_failed(label, message))
+        self.worker.cancelled.connect(lambda: self.statusBar().showMessage(f"{label} cancelled"))
+        self.worker.finished.connect(self._task_finished)
+
+        self._set_busy(True)
+        self.statusBar().showMessage(f"{label} started...")
+        self.worker.start()
+
+    def _task_failed(self, label, message):
+        QMessageBox.critical(self, "Error", f"{label} failed: {message}")
+        self.statusBar().showMessage(f"Error during {label.lower()}")
+
+    def _task_finished(self):
+        # The results are shown by now; later spans would pile up in the session
+        self._stop_profiling()
+        self._set_busy(False)
+        self.worker.deleteLater()
+        self.worker = None
+
+    def _set_busy(self, busy):
+        self.btn_compare.setEnabled(not busy)
+        self.btn_load_comp.setEnabled(not busy)
+        self.btn_cancel.setVisible(busy)
+        self.btn_cancel.setEnabled(busy)
+        if busy:
+            self.btn_generate.setEnabled(False)
+            self.btn_save_comp.setEnabled(False)
+        else:
+            self.btn_generate.setEnabled(self.diff is not None)
+            self.btn_save_comp.setEnabled(self.diff is not None)
+
+    def _start_profiling(self):
+        """Ends the previous session and starts a new one when profiling is checked."""
+        self._stop_profiling()
+        self.profiler = None
+        if self.chk_profile.isChecked():
+            try:
+                self.profiler = profiling.start(cprofile=self.chk_cprofile.isChecked())
+            except Exception as e: # Another session is running
+                self.statusBar().showMessage(f"Profiling unavailable: {str(e)}")
+        self.btn_timings.setEnabled(self.profiler is not None)
+        return self.profiler
+
+    def _stop_profiling(self):
+        """Ends the comparison's session; its Profiler stays available to show_timings."""
+        if self.profiler is not None and profiling.active() is self.profiler:
+            profiling.stop()
+
+    def show_timings(self):
+        if self.profiler:
+            ProfileDialog(self.profiler, self).exec()
+
+    def cancel_task(self):
+        if self.worker and self.worker.isRunning():
+            self.btn_cancel.setEnabled(False)
+            self.statusBar().showMessage("Cancelling...")
+            self.worker.cancel()
+
+    def show_context_menu(self, pos):
+        index = self.tree.indexAt(pos)
         # Only show for objects, not categories like "New" or "Tables"
-        if item.childCount() > 0 and item.text(1) == "":
+        if not index.isValid() or self.tree_model.node(index).level < 3:
             return
 
         menu = QMenu()
         diff_action = menu.addAction("Show Comparison")
-        diff_action.triggered.connect(lambda: self.show_diff(item))
+        diff_action.triggered.connect(lambda: self.show_diff(index))
         menu.exec(self.tree.viewport().mapToGlobal(pos))
 
     def save_comparison(self):
         if not self.diff:
             return
             
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Comparison", "", "JSON Files (*.json);;All Files (*)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Comparison", "",
+                                                   f"Broono Comparison (*{FILE_EXTENSION});;JSON Files (*.json)")
         if file_path:
             try:
-                data = {
-                    "saved_at": datetime.now().isoformat(),
-                    "diff": self.diff,
-                    "source_schema": self.source_schema,
-                    "target_schema": self.target_schema
-                }
-                def json_serial(obj):
-                    """JSON serializer for objects not serializable by default json code"""
-                    if isinstance(obj, (datetime, date)):
-                        return obj.isoformat()
-                    raise TypeError(f"Type {type(obj)} not serializable")
-
-                with open(file_path, 'w') as f:
-                    json.dump(data, f, indent=4, default=json_serial)
+                if file_path.lower().endswith('.json'):
+                    # The JSON format holds every body, so unloaded ones are fetched first
+                    for side, schema in [('source', self.source_schema), ('target', self.target_schema)]:
+                        definition_source = self._definition_source(side)
+                        if definition_source:
+                            load_missing_definitions(schema, definition_source,
+                                                     {category: list(schema[category]) for category in STORED_OBJECT_TYPES},
+                                                     store=self.definition_store)
+                    data = {
+                        "saved_at": datetime.now().isoformat(),
+                        "diff": self.diff,
+                        "source_schema": self.source_schema,
+                        "target_schema": self.target_schema
+                    }
+                    with open(file_path, 'w') as f:
+                        json.dump(data, f, indent=4, default=json_default)
+                else:
+                    # Unloaded bodies are copied from the open file or fetched from the database
+                    fetchers = {}
+                    for side in ['source', 'target']:
+                        definition_source = self._definition_source(side)
+                        if isinstance(definition_source, DbConnector):
+                            definition_source = SchemaExtractor(definition_source)
+                        if definition_source:
+                            fetchers[side] = definition_source
+                    replaced = None
+                    if self.saved_comparison and os.path.exists(file_path) \
+                            and os.path.samefile(file_path, self.saved_comparison.path):
+                        # Bodies are read from the open file while writing; it is closed just before the swap
+                        replaced = self.saved_comparison.path
+                    try:
+                        save_comparison(file_path, self.diff, self.source_schema, self.target_schema, fetchers,
+                                        self.definition_store,
+                                        before_replace=(lambda: self._set_saved_comparison(None)) if replaced else None)
+                    finally:
+                        if replaced and self.saved_comparison is None:
+                            # Read bodies from the new file (or the old one if the save failed)
+                            self._set_saved_comparison(SavedComparison(replaced))
                 self.statusBar().showMessage(f"Comparison saved to {file_path}")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save comparison: {str(e)}")
 
     def load_comparison(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Load Comparison", "", "JSON Files (*.json);;All Files (*)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Comparison", "",
+                                                   f"Comparisons (*{FILE_EXTENSION} *.json);;All Files (*)")
         if file_path:
             try:
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                
-                self.diff = data.get("diff")
-                self.source_schema = data.get("source_schema")
-                self.target_schema = data.get("target_schema")
-                
-                if not self.diff or not self.source_schema or not self.target_schema:
-                    raise ValueError("Invalid comparison file format.")
+                # Container files open from their index; bodies are read when needed
+                comparison = SavedComparison(file_path)
+                self._set_saved_comparison(comparison)
+                self.diff = comparison.diff
+                self.source_schema = comparison.source_schema
+                self.target_schema = comparison.target_schema
                 
                 self._populate_tree(self.diff)
                 self.btn_generate.setEnabled(True)
@@ -326,220 +567,153 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to load comparison: {str(e)}")
 
-    def show_diff(self, item, column=0):
-        # Determine object name and type
-        obj_name = item.text(0)
-        
-        # Traverse up to find the category (Tables, Procedures, etc.)
-        p = item.parent()
-        if not p: return
-        
+    def _set_saved_comparison(self, comparison):
+        """Replaces the open saved comparison (None after a live comparison)."""
+        if self.saved_comparison:
+            if self.diff_worker and self.diff_worker.isRunning():
+                # It may still be reading from the file, which must stay mapped until it stops
+                self.diff_worker.cancel()
+                self.diff_worker.wait()
+            self.saved_comparison.close()
+        self.saved_comparison = comparison
+
+    def _definition_source(self, side):
+        """Where unloaded bodies of 'source'/'target' come from: the open saved comparison, else its database."""
+        if self.saved_comparison:
+            return self.saved_comparison.definitions.get(side)
+        connector = self.source_connector if side == 'source' else self.target_connector
+        return connector if connector.connection else None
+
+    def show_diff(self, index):
+        node = self.tree_model.node(index)
+        if node.level < 3: # Category or segment
+            return
+
         # If double clicked a child (like a column), go up to the object
-        if p.parent() and p.parent().parent():
-             item = p
-             obj_name = item.text(0)
-             p = item.parent()
-             
-        # Now p is "New", "Modified", or "Dropped"
-        if not p.parent(): return
-        category = p.parent().text(0).lower()
+        if node.level > 3:
+            node = node.parent
+        obj_name = node.name
+        category = node.category
         
         src_def = None
         tgt_def = None
         
+        if category in STORED_OBJECT_TYPES:
+            # Hash-first comparisons and saved comparisons leave bodies unloaded
+            try:
+                for schema, side in [(self.source_schema, 'source'), (self.target_schema, 'target')]:
+                    definition_source = self._definition_source(side)
+                    if definition_source:
+                        # A comparison may be running on the main connections meanwhile
+                        _load_definitions(schema, definition_source, {category: [obj_name]}, CancelToken(),
+                                          self.definition_store)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to fetch definition: {str(e)}")
+                return
+
         if category in self.source_schema:
             src_def = self.source_schema[category].get(obj_name)
         if category in self.target_schema:
             tgt_def = self.target_schema[category].get(obj_name)
             
         if src_def or tgt_def:
-            dlg = DiffDialog(obj_name, src_def, tgt_def, self)
+            key = (category, obj_name)
+            with profiling.span("diff dialog", "ui", object=obj_name) as span:
+                line_diff = self.line_diffs.get(key)
+                span.add(cached=int(line_diff is not None))
+                if line_diff is None: # Not precomputed yet, or evicted
+                    line_diff = compute_line_diff(format_definition(tgt_def), format_definition(src_def))
+                    self.line_diffs.put(key, line_diff)
+                    self._refresh_line_stats()
+                dlg = DiffDialog(obj_name, src_def, tgt_def, self, line_diff=line_diff)
             dlg.exec()
 
-    def _apply_object_filter(self, schema):
-        """Restricts the schema to only include objects present in self.object_filter."""
-        filtered_schema = {}
-        for obj_type in ['tables', 'procedures', 'functions', 'triggers']:
-            filtered_schema[obj_type] = {
-                name: details for name, details in schema[obj_type].items() 
-                if name in self.object_filter
-            }
-        return filtered_schema
-
-    def _apply_date_filter(self, diff, cutoff_date):
-        """Filters the diff to include only objects modified on or after cutoff_date.
-           Note: Dropped objects are filtered out because they don't exist in source to have a date."""
-        filtered_diff = {
-            'tables': {'new': {}, 'modified': {}, 'dropped': []},
-            'procedures': {'new': {}, 'modified': {}, 'dropped': []},
-            'functions': {'new': {}, 'modified': {}, 'dropped': []},
-            'triggers': {'new': {}, 'modified': {}, 'dropped': []}
-        }
-
-        for category in ['tables', 'procedures', 'functions', 'triggers']:
-            # 1. New Objects
-            for name, details in diff[category]['new'].items():
-                # For new objects, the details ARE the schema definition from source
-                # schema.py puts modify_date in the definition
-                obj_date = details.get('modify_date') 
-                if obj_date and obj_date >= cutoff_date:
-                    filtered_diff[category]['new'][name] = details
-
-            # 2. Modified Objects
-            for name, changes in diff[category]['modified'].items():
-                # For modified objects, we look up the object in self.source_schema to find its date
-                source_obj = self.source_schema[category].get(name)
-                if source_obj:
-                    obj_date = source_obj.get('modify_date')
-                    if obj_date and obj_date >= cutoff_date:
-                        filtered_diff[category]['modified'][name] = changes
-
-            # 3. Dropped Objects - INCLUDED
-            # Dropped objects are only in Target, so "Source Date" filter doesn't apply to them.
-            # We include them so the user sees all changes except those EXPLICITLY filtered out by source date.
-            if diff[category]['dropped']:
-                filtered_diff[category]['dropped'] = list(diff[category]['dropped'])
-            
-        return filtered_diff
-
     def _populate_tree(self, diff):
-        self.tree.itemChanged.disconnect(self._handle_tree_check) if hasattr(self, '_handle_tree_check_connected') else None
-        self.tree.clear()
-        
-        for section in ['tables', 'procedures', 'functions', 'triggers']:
-            section_diff = diff[section]
-            
-            if not section_diff['new'] and not section_diff['modified'] and not section_diff['dropped']:
-                continue
-                
-            root = QTreeWidgetItem(self.tree, [section.capitalize(), "", ""])
-            root.setCheckState(0, Qt.CheckState.Checked)
-            
-            # New
-            if section_diff['new']:
-                new_root = QTreeWidgetItem(root, ["New", "", ""])
-                new_root.setCheckState(0, Qt.CheckState.Checked)
-                for name in section_diff['new']:
-                    item = QTreeWidgetItem(new_root, [name, "Create", ""])
-                    item.setCheckState(0, Qt.CheckState.Checked)
-            
-            # Modified
-            if section_diff['modified']:
-                mod_root = QTreeWidgetItem(root, ["Modified", "", ""])
-                mod_root.setCheckState(0, Qt.CheckState.Checked)
-                for name, changes in section_diff['modified'].items():
-                    obj_node = QTreeWidgetItem(mod_root, [name, "Alter/Modify", ""])
-                    obj_node.setCheckState(0, Qt.CheckState.Checked)
-                    if section == 'tables':
-                        for col_name in changes['add_columns']:
-                            QTreeWidgetItem(obj_node, [col_name, "Add Column", ""])
-                        for col_name in changes['alter_columns']:
-                             QTreeWidgetItem(obj_node, [col_name, "Alter Column", "Mismatch"])
-                        for col_name in changes['drop_columns']:
-                            QTreeWidgetItem(obj_node, [col_name, "Drop Column", ""])
-            
-            # Dropped
-            if section_diff['dropped']:
-                drop_root = QTreeWidgetItem(root, ["Dropped (Target only)", "", ""])
-                drop_root.setCheckState(0, Qt.CheckState.Checked)
-                for name in section_diff['dropped']:
-                    item = QTreeWidgetItem(drop_root, [name, "Drop", ""])
-                    item.setCheckState(0, Qt.CheckState.Checked)
-                
-        self.tree.collapseAll()
-        self.tree.itemChanged.connect(self._handle_tree_check)
-        self._handle_tree_check_connected = True
+        with profiling.span("search index", "ui"):
+            self.search_index = DiffSearchIndex(diff)
+        with profiling.span("populate tree", "ui"):
+            self.tree_model.set_diff(diff)
+            self.tree.collapseAll()
         self.search_input.clear() # Clear search when data changes
+        self._start_line_diffs()
 
-    def filter_tree(self, text):
-        """Filters the tree view based on the search text."""
-        text = text.lower()
-        
-        for i in range(self.tree.topLevelItemCount()):
-            root_item = self.tree.topLevelItem(i)
-            self._filter_item(root_item, text)
+    def _start_line_diffs(self):
+        """Diffs every modified object in the background so DiffDialog opens from the cache."""
+        if self.diff_worker:
+            self.diff_worker.cancel()
+        # A new cache per comparison, so a cancelled run cannot store stale results
+        cache = self.line_diffs = LineDiffCache()
+        diff, source_schema, target_schema = self.diff, self.source_schema, self.target_schema
+        # Bodies of saved comparisons are local and read ahead; database bodies
+        # of hash comparisons are left for the diff view to fetch on demand
+        saved_definitions = self.saved_comparison.definitions if self.saved_comparison else {}
+        store = self.definition_store
 
-    def _filter_item(self, item, text):
-        """Recursively checks if item or any of its children matches text."""
-        match = text in item.text(0).lower()
-        
-        any_child_match = False
-        for i in range(item.childCount()):
-            if self._filter_item(item.child(i), text):
-                any_child_match = True
-        
-        should_be_visible = match or any_child_match
-        item.setHidden(not should_be_visible)
-        
-        # Expand item if a child matches to show it
-        if any_child_match and text != "":
-            item.setExpanded(True)
-            
-        return should_be_visible
+        def task(progress, cancel_token):
+            modified = {category: diff[category]['modified'] for category in STORED_OBJECT_TYPES}
+            for schema, side in [(source_schema, 'source'), (target_schema, 'target')]:
+                if side in saved_definitions:
+                    load_missing_definitions(schema, saved_definitions[side], modified, cancel_token, store)
 
-    def _handle_tree_check(self, item, column):
-        """Recursively check/uncheck children if a parent is toggled."""
-        if column != 0:
-            return
-            
-        state = item.checkState(0)
-        self.tree.blockSignals(True)
-        self._set_children_checkstate(item, state)
-        self.tree.blockSignals(False)
+            pairs = []
+            for category in OBJECT_TYPES:
+                for name in diff[category]['modified']:
+                    source_obj = source_schema[category].get(name)
+                    target_obj = target_schema[category].get(name)
+                    if _body_missing(source_obj) or _body_missing(target_obj):
+                        continue # Diffed when opened
+                    pairs.append(((category, name), format_definition(target_obj), format_definition(source_obj)))
+            with profiling.span("precompute line diffs", "ui", objects=len(pairs)):
+                return precompute_line_diffs(pairs, cache, on_batch=lambda: progress(""), cancel_token=cancel_token)
 
-    def _set_children_checkstate(self, item, state):
-        for i in range(item.childCount()):
-            child = item.child(i)
-            child.setCheckState(0, state)
-            self._set_children_checkstate(child, state)
+        worker = TaskWorker(task, self)
+        worker.progress.connect(lambda _: self._refresh_line_stats())
+        worker.succeeded.connect(lambda _: self._refresh_line_stats())
+        worker.failed.connect(lambda message: self.statusBar().showMessage(f"Line diffs unavailable: {message}"))
+        worker.finished.connect(lambda: self._line_diffs_finished(worker))
+        self.diff_worker = worker
+        worker.start()
 
-    def generate_script(self):
-        if not self.diff:
+    def _refresh_line_stats(self):
+        self.tree_model.set_line_stats(self.line_diffs.line_stats())
+
+    def _line_diffs_finished(self, worker):
+        worker.deleteLater()
+        if self.diff_worker is worker:
+            self.diff_worker = None
+
+    def closeEvent(self, event):
+        # Background threads must finish before their QThread objects are destroyed
+        for worker in [self.worker, self.diff_worker]:
+            if worker and worker.isRunning():
+                worker.cancel()
+                worker.wait()
+        self._set_script_path(None)
+        self._set_saved_comparison(None)
+        self._stop_profiling()
+        self.source_connector.close()
+        self.target_connector.close()
+        close_all_pools()
+        super().closeEvent(event)
+
+    def filter_tree(self, text):
+        """Filters the tree view based on the search text."""
+        self.search_timer.stop()
+        name_filter = self.search_index.filter(text)
+        self.tree_model.set_name_filter(name_filter)
+        if name_filter is None:
             return
-        
-        try:
-            selected_diff = self._get_selected_diff()
-            generator = ScriptGenerator()
-            sql = generator.generate(selected_diff)
-            self.script_view.setText(sql)
-            
-            # Show the script view (30/70 split)
-            self.results_splitter.setSizes([330, 770])
-        except Exception as e:
-             QMessageBox.critical(self, "Error", f"Generation failed: {str(e)}")
+
+        # Expand categories and segments so matching objects are visible
+        model = self.tree_model
+        self.tree.setUpdatesEnabled(False)
+        for i in range(model.rowCount()):
+            category_index = model.index(i, 0)
+            self.tree.expand(category_index)
+            for j in range(model.rowCount(category_index)):
+                self.tree.expand(model.index(j, 0, category_index))
+        self.tree.setUpdatesEnabled(True)
 
     def _get_selected_diff(self):
         """Constructs a new diff object containing only checked items from the tree."""
-        # Initialize as empty structure
-        s_diff = {
-            'tables': {'new': {}, 'modified': {}, 'dropped': []},
-            'procedures': {'new': {}, 'modified': {}, 'dropped': []},
-            'functions': {'new': {}, 'modified': {}, 'dropped': []},
-            'triggers': {'new': {}, 'modified': {}, 'dropped': []}
-        }
-        
-        # Traverse categories
-        for i in range(self.tree.topLevelItemCount()):
-            category_node = self.tree.topLevelItem(i)
-            category_name = category_node.text(0).lower() # Tables, Procedures, etc.
-            
-            # Traverse segments (New, Modified, Dropped)
-            for j in range(category_node.childCount()):
-                segment_node = category_node.child(j)
-                segment_name = segment_node.text(0).lower() # New, Modified, Dropped...
-                
-                # Traverse individual objects
-                for k in range(segment_node.childCount()):
-                    obj_node = segment_node.child(k)
-                    if obj_node.checkState(0) == Qt.CheckState.Checked:
-                        obj_name = obj_node.text(0)
-                        
-                        # Populate s_diff from self.diff
-                        if "new" in segment_name:
-                            s_diff[category_name]['new'][obj_name] = self.diff[category_name]['new'][obj_name]
-                        elif "modified" in segment_name:
-                            s_diff[category_name]['modified'][obj_name] = self.diff[category_name]['modified'][obj_name]
-                        elif "dropped" in segment_name:
-                            s_diff[category_name]['dropped'].append(obj_name)
-                            
-        return s_diff
+        return self.tree_model.selected_diff()
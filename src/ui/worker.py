@@ -0,0 +1,34 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from src.core.pipeline import CancelToken, OperationCancelled
+
+class TaskWorker(QThread):
+    """
+    Runs task(progress, cancel_token) off the GUI thread.
+    Progress messages and the outcome are delivered through queued signals.
+    """
+    progress = pyqtSignal(str)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self.cancel_token = CancelToken()
+
+    def run(self):
+        try:
+            result = self.task(self.progress.emit, self.cancel_token)
+        except OperationCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            # A cancelled pyodbc query surfaces as a driver error
+            if self.cancel_token.cancelled:
+                self.cancelled.emit()
+            else:
+                self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
+
+    def cancel(self):
+        self.cancel_token.cancel()
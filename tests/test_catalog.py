@@ -0,0 +1,148 @@
+import sys
+import os
+import shutil
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.compare import definition_digest
+from src.core.filters import ObjectFilter
+from src.core.pipeline import ComparisonPipeline
+from src.core.model import schema_from_dict
+from src.core.snapshot import SnapshotCache
+from src.db.parallel import ParallelExtractor
+from src.db.schema import SchemaExtractor
+from src.db.sqlite_catalog import SqliteConnector, build_catalog
+
+def build_catalog_schema():
+    # Values as SQL Server reports them, so extraction returns them unchanged
+    return {
+        'tables': {
+            'dbo.Users': {
+                'columns': {
+                    'ID': {'type': 'int', 'nullable': False, 'length': None, 'precision': 10, 'scale': 0},
+                    'Name': {'type': 'nvarchar', 'nullable': True, 'length': 100, 'precision': None, 'scale': None},
+                    'Notes': {'type': 'nvarchar', 'nullable': True, 'length': -1, 'precision': None, 'scale': None},
+                    'Balance': {'type': 'decimal', 'nullable': False, 'length': None, 'precision': 18, 'scale': 2}
+                },
+                'modify_date': datetime(2024, 3, 1, 12, 30)
+            }
+        },
+        'procedures': {
+            'dbo.GetUser': {'definition': 'CREATE PROCEDURE dbo.GetUser AS SELECT * FROM Users',
+                            'type': 'SQL_STORED_PROCEDURE', 'modify_date': datetime(2024, 3, 2)}
+        },
+        'functions': {
+            'sales.Total': {'definition': 'CREATE FUNCTION sales.Total() RETURNS TABLE AS RETURN SELECT 1 AS x',
+                            'type': 'SQL_INLINE_TABLE_VALUED_FUNCTION', 'modify_date': datetime(2024, 3, 3)}
+        },
+        'triggers': {}
+    }
+
+def test_catalog():
+    print("Testing stand-in catalog...")
+    test_dir = "test_catalog"
+    if os.path.exists(test_dir):
+        shutil.rmtree(test_dir)
+
+    schema = build_catalog_schema()
+    build_catalog(test_dir, schema)
+    connector = SqliteConnector()
+    connector.connect(test_dir)
+    extractor = SchemaExtractor(connector)
+
+    # Test 1: Bulk and per-table extraction both return the schema the catalog was built from
+    expected = schema_from_dict(schema)
+    assert extractor.get_full_schema() == expected
+    assert extractor.report['round_trips_saved'] == 0, "One bulk column query instead of one per table"
+    assert extractor.get_full_schema(bulk_columns=False) == expected
+    assert extractor.report['queries'] == 7, "Per-table mode should query the one table's columns"
+
+    # Test 2: HASHBYTES and DATALENGTH match SQL Server's results for nvarchar bodies
+    digests = extractor.get_full_schema(digests_only=True)
+    get_user = digests['procedures']['dbo.GetUser']
+    definition = schema['procedures']['dbo.GetUser']['definition']
+    assert get_user['definition'] is None
+    assert get_user['definition_hash'] == definition_digest(definition)
+    assert get_user['definition_length'] == 2 * len(definition)
+
+    # Test 3: Names match case-insensitively, as under the default collation
+    assert extractor.fetch_definitions(['DBO.getuser']) == {'dbo.GetUser': definition}
+    assert [params for _, params in SchemaExtractor._name_clauses(['hr.v2.Staff'])] == \
+        [('hr', 'v2.Staff'), ('hr.v2', 'Staff')], "Either part of a name may contain '.'"
+
+    # Test 4: Latency applies per query, on clones too
+    slow = SqliteConnector(latency=0.05)
+    slow.connect(test_dir)
+    with slow.lease() as clone:
+        assert clone.latency == 0.05
+        assert [row.x for row in clone.iter_rows("SELECT 1 AS x")] == [1]
+        assert clone.query_count == 1
+    slow.close()
+
+    # Test 5: An object list is pushed into extraction; the snapshot stays complete
+    listed = {'dbo.GetUser', 'dbo.Missing'}
+    cache = SnapshotCache(os.path.join(test_dir, "snapshots"))
+    extractor = ParallelExtractor(workers=2, object_filter=listed, snapshot_cache=cache)
+    partial = extractor.extract(connector)
+    assert set(partial['procedures']) == {'dbo.GetUser'} and not partial['tables']
+    assert extractor.reports['schema']['tables'] == 0, "Unlisted tables should not be extracted"
+    assert ParallelExtractor(workers=2, snapshot_cache=cache).extract(connector) == expected
+    without_stamps = ParallelExtractor(workers=2, object_filter=listed)
+    assert without_stamps.extract(connector) == partial
+    assert without_stamps.reports['schema']['queries'] == 2, "Name lookup plus the procedures unit"
+    patterns = ObjectFilter.parse(["*.Get%", "sales.*", "!sales.Total"])
+    assert ParallelExtractor(workers=2, object_filter=patterns).extract(connector) == partial
+    assert [hits for _, _, hits in patterns.hit_counts()] == [1, 0, 1]
+
+    # Test 6: A date cutoff limits both sides to what the filtered diff can contain
+    target_schema = build_catalog_schema()
+    target_schema['procedures']['dbo.GetUser']['definition'] += " WHERE 1 = 0"
+    target_schema['functions']['sales.Total']['definition'] += " -- old"
+    target_schema['procedures']['dbo.Retired'] = {'definition': 'CREATE PROCEDURE dbo.Retired AS RETURN',
+                                                  'type': 'SQL_STORED_PROCEDURE', 'modify_date': datetime(2023, 1, 1)}
+    build_catalog(os.path.join(test_dir, "target"), target_schema)
+    target = SqliteConnector()
+    target.connect(os.path.join(test_dir, "target"))
+    pipeline = ComparisonPipeline(workers=2, cutoff_date=datetime(2024, 3, 3))
+    source_schema, extracted_target, diff = pipeline.run(connector, target)
+    assert list(diff['functions']['modified']) == ['sales.Total']
+    assert not diff['procedures']['modified'], "dbo.GetUser changed before the cutoff"
+    assert diff['procedures']['dropped'] == ['dbo.Retired']
+    assert set(source_schema['functions']) == {'sales.Total'} and not source_schema['procedures']
+    assert set(extracted_target['procedures']) == {'dbo.Retired'}, "Only dropped and recent names are extracted"
+    target.close()
+
+    # A source object changed before the cutoff since the snapshot still exists in the source
+    pair_dir = os.path.join(test_dir, "pair")
+    build_catalog(os.path.join(pair_dir, "source"), build_catalog_schema())
+    build_catalog(os.path.join(pair_dir, "target"), build_catalog_schema())
+    cache = SnapshotCache(os.path.join(pair_dir, "snapshots"))
+
+    def run_pair(cutoff_date=None):
+        source, target = SqliteConnector(), SqliteConnector()
+        source.connect(os.path.join(pair_dir, "source"))
+        target.connect(os.path.join(pair_dir, "target"))
+        try:
+            return ComparisonPipeline(workers=2, cutoff_date=cutoff_date, snapshot_cache=cache).run(source, target)[2]
+        finally:
+            source.close()
+            target.close()
+
+    assert not any(run_pair()[category]['dropped'] for category in diff)
+    changed_schema = build_catalog_schema()
+    changed_schema['procedures']['dbo.GetUser'].update(definition='CREATE PROCEDURE dbo.GetUser AS RETURN',
+                                                       modify_date=datetime(2024, 2, 1))
+    build_catalog(os.path.join(pair_dir, "source"), changed_schema)
+    cutoff_diff = run_pair(datetime(2024, 3, 1))
+    assert not any(cutoff_diff[category]['dropped'] for category in cutoff_diff)
+    assert not cutoff_diff['procedures']['modified'], "dbo.GetUser changed before the cutoff"
+    assert 'dbo.GetUser' in run_pair()['procedures']['modified'], "Re-extracted without the cutoff"
+
+    connector.close()
+    shutil.rmtree(test_dir)
+    print("Stand-in Catalog Logic: PASS")
+
+if __name__ == "__main__":
+    test_catalog()
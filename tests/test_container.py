@@ -0,0 +1,71 @@
+import sys
+import os
+import json
+import shutil
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.compare import SchemaComparer
+from src.core.container import SavedComparison, save_comparison
+from src.core.model import StoredObject, json_default, schema_from_dict
+from test_logic import build_test_schemas
+
+def test_container():
+    print("Testing saved comparison container...")
+    test_dir = "test_container"
+    if os.path.exists(test_dir):
+        shutil.rmtree(test_dir)
+    os.makedirs(test_dir)
+
+    source_schema, target_schema = build_test_schemas()
+    source_schema = schema_from_dict(source_schema)
+    target_schema = schema_from_dict(target_schema)
+    # Same body on both sides should be stored once
+    body = 'CREATE PROCEDURE dbo.Shared AS SELECT 1'
+    source_schema['procedures']['dbo.Shared'] = StoredObject(body, 'SQL_STORED_PROCEDURE')
+    target_schema['procedures']['dbo.Shared'] = StoredObject(body, 'SQL_STORED_PROCEDURE')
+    diff = SchemaComparer().compare(source_schema, target_schema)
+
+    # Test 1: Index opens without bodies; diff entries are the schema objects
+    path = os.path.join(test_dir, "comparison.broono")
+    save_comparison(path, diff, source_schema, target_schema)
+    loaded = SavedComparison(path)
+    assert len(loaded.blobs) == 3, "Identical bodies should be stored once"
+    assert loaded.diff['tables']['modified']['dbo.Users'] == diff['tables']['modified']['dbo.Users']
+    get_user = loaded.diff['procedures']['modified']['dbo.GetUser']
+    assert get_user is loaded.source_schema['procedures']['dbo.GetUser'], "Diff should share the schema's object"
+    assert get_user['definition'] is None and get_user['definition_hash'], "Bodies should load lazily"
+
+    # Test 2: Bodies are read on demand
+    definitions = loaded.definitions['target'].fetch_definitions(['dbo.GetUser', 'dbo.Shared'])
+    assert definitions['dbo.GetUser'] == target_schema['procedures']['dbo.GetUser']['definition']
+    assert definitions['dbo.Shared'] == body
+
+    # Test 3: Re-saving copies bodies that were never hydrated
+    resaved = os.path.join(test_dir, "resaved.broono")
+    save_comparison(resaved, loaded.diff, loaded.source_schema, loaded.target_schema, loaded.definitions)
+    loaded.close()
+    reloaded = SavedComparison(resaved)
+    assert reloaded.definitions['source'].fetch_definitions(['dbo.GetUser'])['dbo.GetUser'] == \
+        source_schema['procedures']['dbo.GetUser']['definition']
+
+    # Saving over the open file closes it only once every body has been copied
+    save_comparison(resaved, reloaded.diff, reloaded.source_schema, reloaded.target_schema, reloaded.definitions,
+                    before_replace=reloaded.close)
+    reloaded = SavedComparison(resaved)
+    assert reloaded.definitions['target'].fetch_definitions(['dbo.Shared'])['dbo.Shared'] == body
+    reloaded.close()
+
+    # Test 4: JSON comparisons are still importable
+    json_path = os.path.join(test_dir, "comparison.json")
+    with open(json_path, 'w') as f:
+        json.dump({"diff": diff, "source_schema": source_schema, "target_schema": target_schema}, f, default=json_default)
+    legacy = SavedComparison(json_path)
+    assert legacy.source_schema == source_schema and not legacy.definitions
+
+    shutil.rmtree(test_dir)
+    print("Saved Comparison Logic: PASS")
+
+if __name__ == "__main__":
+    test_container()
@@ -1,15 +1,19 @@
+import io
 import sys
 import os
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.core.compare import SchemaComparer
+from src.core.compare import SchemaComparer, definition_digest
+from src.core.filters import ObjectFilter
+from src.core.fingerprint import SchemaFingerprint, group_by_fingerprint
 from src.core.generator import ScriptGenerator
+from src.core.model import schema_from_dict, to_plain
+from src.core.linediff import LineDiffCache, SideBySide, compute_line_diff
+from src.core.search import DiffSearchIndex
 
-def test_logic():
-    print("Setting up test schemas...")
-    
+def build_test_schemas():
     # Source: User wants this state
     source_schema = {
         'tables': {
@@ -44,6 +48,11 @@ def test_logic():
         'functions': {},
         'triggers': {}
     }
+    return source_schema, target_schema
+
+def test_logic():
+    print("Setting up test schemas...")
+    source_schema, target_schema = build_test_schemas()
 
     print("Running Comparison...")
     comparer = SchemaComparer()
@@ -65,8 +74,169 @@ def test_logic():
     
     assert "ALTER PROCEDURE dbo.GetUser" in script, "Script should alter GetUser"
     assert "ALTER TABLE dbo.Users ALTER COLUMN [Name] varchar(100) NOT NULL" in script, "Script should alter Name"
+
+    stream = io.StringIO()
+    generator.write(diff, stream)
+    assert stream.getvalue() == script, "Streamed script should match the generated one"
+    assert "".join(generator.iter_script(diff, batch_chars=1)) == script, "Batches should join to the script"
+    unloaded = dict(diff, procedures=dict(diff['procedures'], modified={
+        'dbo.GetUser': dict(diff['procedures']['modified']['dbo.GetUser'], definition=None)}))
+    assert "-- definition unavailable for dbo.GetUser" in generator.generate(unloaded), "Missing bodies are skipped"
     
     print("Generation Logic: PASS")
 
+def test_record_schema():
+    print("Testing compact schema records...")
+    source_schema, target_schema = build_test_schemas()
+    comparer = SchemaComparer()
+    plain_diff = comparer.compare(source_schema, target_schema)
+    record_diff = comparer.compare(schema_from_dict(source_schema), schema_from_dict(target_schema))
+
+    for category in plain_diff:
+        for change in ['new', 'modified', 'dropped']:
+            assert list(record_diff[category][change]) == list(plain_diff[category][change]), "Records should compare exactly like plain dicts"
+    assert to_plain(record_diff['tables']) == plain_diff['tables'], "Column changes should match"
+    assert ScriptGenerator().generate(record_diff) == ScriptGenerator().generate(plain_diff), "Scripts should match"
+    print("Record Schema Logic: PASS")
+
+def test_hash_compare():
+    print("Testing hash-first comparison...")
+    body = 'CREATE PROCEDURE dbo.GetUser AS SELECT * FROM Users'
+
+    def digest_only(definition):
+        return {'definition': None, 'definition_hash': definition_digest(definition), 'type': 'SQL_STORED_PROCEDURE'}
+
+    source_schema = {
+        'tables': {}, 'functions': {}, 'triggers': {},
+        'procedures': {
+            'dbo.Same': digest_only(body),
+            'dbo.Changed': digest_only(body),
+            'dbo.Mixed': {'definition': body, 'type': 'SQL_STORED_PROCEDURE'}
+        }
+    }
+    target_schema = {
+        'tables': {}, 'functions': {}, 'triggers': {},
+        'procedures': {
+            'dbo.Same': digest_only(body),
+            'dbo.Changed': digest_only(body + ' WHERE 1 = 0'),
+            'dbo.Mixed': digest_only(body)
+        }
+    }
+
+    diff = SchemaComparer().compare(source_schema, target_schema)
+    assert list(diff['procedures']['modified']) == ['dbo.Changed'], "Only differing digests should be modified"
+    print("Hash Comparison Logic: PASS")
+
+def test_search_index():
+    print("Testing diff search index...")
+    source_schema, target_schema = build_test_schemas()
+    diff = SchemaComparer().compare(source_schema, target_schema)
+    index = DiffSearchIndex(diff)
+
+    def objects(query):
+        return index.search(query)[0]
+
+    assert objects("USERS") == {'dbo.users'}, "Substring should match case-insensitively"
+    assert objects("dbo.") == {'dbo.users', 'dbo.getuser'}, "'schema.' should list the schema's objects"
+    assert objects("dbo.get") == {'dbo.getuser'}, "Qualified names should match by prefix"
+    assert objects("bo.us") == {'dbo.users'} and objects(".getu") == {'dbo.getuser'}, \
+        "Text with a '.' that doesn't start with a schema should match as a substring"
+    assert objects("get*") == {'dbo.getuser'}, "Prefix should match the object part"
+    assert objects("u?er*") == {'dbo.users'}, "Wildcards should match the whole object part"
+    assert index.search("email")[1] == {'email'}, "Column names should be searchable"
+
+    visible = index.filter("Email")
+    assert visible(('tables', 'modified', 'dbo.Users', 'Email'))
+    assert not visible(('tables', 'modified', 'dbo.Users'))
+    assert index.filter("  ") is None
+    print("Search Index Logic: PASS")
+
+def test_line_diff_cache():
+    print("Testing line diff cache...")
+    line_diff = compute_line_diff("a\nb\nc", "a\nB\nc\nd")
+    assert line_diff.stats == (2, 1), "Replaced lines count as added and removed"
+
+    cache = LineDiffCache(max_entries=2)
+    for name in ['dbo.A', 'dbo.B', 'dbo.C']:
+        cache.put(('procedures', name), line_diff)
+    assert cache.get(('procedures', 'dbo.A')) is None, "Oldest entry should be evicted"
+    assert cache.get(('procedures', 'dbo.C')) is line_diff
+    assert cache.line_stats()[('procedures', 'dbo.A')] == (2, 1), "Stats should outlive eviction"
+    print("Line Diff Cache Logic: PASS")
+
+def test_side_by_side():
+    print("Testing side-by-side alignment...")
+    old_text = "BEGIN\nSELECT a FROM t\nEND\nGO"
+    new_text = "BEGIN\nSELECT a, b FROM t\nWHERE 1 = 1\nEND\nGO"
+    rows = SideBySide(old_text, new_text, compute_line_diff(old_text, new_text).opcodes)
+
+    assert len(rows.left_lines) == len(rows.right_lines) == 5, "Both sides should have one line per row"
+    assert rows.left_kinds == ['equal', 'removed', 'filler', 'equal', 'equal']
+    assert rows.right_kinds == ['equal', 'added', 'added', 'equal', 'equal']
+    assert rows.hunks == [1]
+    assert rows.intraline(1) == ([], [(8, 3)]), "Only the inserted ', b' should be marked"
+    assert rows.intraline(2) == ([], [])
+    print("Side-by-side Logic: PASS")
+
+def test_object_filter():
+    print("Testing object filter rules...")
+    object_filter = ObjectFilter.parse(["# reporting objects", "", "dbo.Users", "sales.*", "dbo.usp_Report%",
+                                        "re:audit[.]log_[0-9]+", "!sales.tmp*", "archive.*"])
+    assert "DBO.users" in object_filter, "Matching should ignore case"
+    assert "sales.Orders" in object_filter and "sales.tmp_Orders" not in object_filter
+    assert "dbo.usp_Report1" in object_filter and "dbo.uspXReport1" not in object_filter, "'_' is literal"
+    assert "audit.log_12" in object_filter and "audit.log_12x" not in object_filter, "Regexes match whole names"
+    assert ObjectFilter.parse(["!sales.*"]).matches("dbo.Users"), "Only excludes: everything else is selected"
+
+    for name in ["dbo.Users", "sales.Orders", "sales.tmp_Orders", "dbo.Other"]:
+        object_filter.matches(name, record=True)
+    hits = {rule: count for rule, _, count in object_filter.hit_counts()}
+    assert hits == {"dbo.Users": 1, "sales.*": 1, "dbo.usp_Report%": 0, "re:audit[.]log_[0-9]+": 0,
+                    "!sales.tmp*": 1, "archive.*": 0}
+    assert object_filter.like_patterns() is None, "A regex can't narrow a server-side lookup"
+    assert ObjectFilter.parse(["sales.*", "dbo.a_b?"]).like_patterns() == ["sales.%", "dbo.a\\_b_"]
+    assert ObjectFilter.parse([r"re:(dbo)\.\1x", "sales.*"]).matches("dbo.dbox"), "Backreferences keep their group"
+    assert ObjectFilter.parse([r"re:(?i)DBO\..*", "sales.*"]).matches("dbo.Users"), "Inline flags are allowed"
+    try:
+        ObjectFilter.parse(["re:dbo.(x"])
+        assert False, "An invalid regex should be rejected"
+    except ValueError:
+        pass
+    print("Object Filter Logic: PASS")
+
+def test_fingerprint():
+    print("Testing schema fingerprints...")
+    source_schema, target_schema = build_test_schemas()
+    source_schema['tables']['sales.Orders'] = {'columns': {'ID': source_schema['tables']['dbo.Users']['columns']['ID']}}
+    target_schema['tables']['sales.Orders'] = {'columns': {'ID': target_schema['tables']['dbo.Users']['columns']['ID']}}
+    source_schema, target_schema = schema_from_dict(source_schema), schema_from_dict(target_schema)
+    source, target = SchemaFingerprint(source_schema), SchemaFingerprint(target_schema)
+    copy = SchemaFingerprint(schema_from_dict(to_plain(source_schema)))
+    assert copy.digest == source.digest and source.digest != target.digest
+    assert source.differences(target) == {'tables': ['dbo'], 'procedures': ['dbo']}, "sales is identical"
+
+    comparer = SchemaComparer()
+    assert comparer.compare(source_schema, target_schema, source, target) == comparer.compare(source_schema, target_schema)
+    assert not any(changes['modified'] for changes in comparer.compare(source_schema, source_schema, source, copy).values())
+
+    # A body and its server-side digest fingerprint alike
+    hashed = schema_from_dict(to_plain(source_schema))
+    procedure = hashed['procedures']['dbo.GetUser']
+    procedure['definition_hash'], procedure['definition'] = definition_digest(procedure['definition']), None
+    assert SchemaFingerprint(hashed).digest == source.digest
+
+    filtered = {category: {name: obj for name, obj in objects.items() if name.startswith('sales.')}
+                for category, objects in source_schema.items()}
+    assert source.restrict(filtered).digest == target.restrict(filtered).digest
+    assert group_by_fingerprint({'a': target, 'b': source, 'c': copy}) == [['b', 'c'], ['a']]
+    print("Fingerprint Logic: PASS")
+
 if __name__ == "__main__":
     test_logic()
+    test_record_schema()
+    test_hash_compare()
+    test_search_index()
+    test_line_diff_cache()
+    test_side_by_side()
+    test_object_filter()
+    test_fingerprint()
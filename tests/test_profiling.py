@@ -0,0 +1,49 @@
+import sys
+import os
+import shutil
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core import profiling
+from src.core.compare import SchemaComparer
+from src.db.schema import SchemaExtractor
+from src.db.sqlite_catalog import SqliteConnector, build_catalog
+from test_catalog import build_catalog_schema
+
+def test_profiling():
+    print("Testing profiling spans...")
+    test_dir = "test_profiling"
+    build_catalog(test_dir, build_catalog_schema())
+    connector = SqliteConnector()
+    connector.connect(test_dir)
+
+    # Test 1: Without a session, spans are no-ops
+    assert profiling.span("idle") is profiling.NULL_SPAN
+    SchemaExtractor(connector).get_full_schema()
+
+    # Test 2: Queries are timed with their rows and bytes; phases get their own spans
+    with profiling.session(cprofile=True) as profiler:
+        schema = SchemaExtractor(connector).get_full_schema()
+        SchemaComparer().compare(schema, schema)
+        connector.fetch_all("SELECT 'abc' AS name, 1 AS id", label="probe")
+    assert profiling.active() is None
+    totals = {(total['category'], total['name']): total for total in profiler.summary()}
+    columns = totals[('query', 'get_all_columns')]
+    assert columns['count'] == 1 and columns['rows'] == 4 and columns['bytes'] > 0
+    assert totals[('query', 'probe')]['rows'] == 1 and totals[('query', 'probe')]['bytes'] == 11
+    assert totals[('extract', 'extract tables')]['count'] == 1
+    assert totals[('compare', 'compare procedures')]['count'] == 1
+    assert "get_full_schema" in profiler.cprofile_stats()
+
+    # Test 3: Chrome trace events are complete events in microseconds
+    events = profiler.to_chrome_trace()['traceEvents']
+    assert len(events) == len(profiler.spans)
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+    connector.close()
+    shutil.rmtree(test_dir)
+    print("Profiling Logic: PASS")
+
+if __name__ == "__main__":
+    test_profiling()
@@ -0,0 +1,55 @@
+import sys
+import os
+import shutil
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.snapshot import SnapshotCache, plan_refresh
+from src.core.model import schema_from_dict
+
+def test_snapshot():
+    print("Testing SnapshotCache...")
+    test_dir = "test_snapshots"
+    if os.path.exists(test_dir):
+        shutil.rmtree(test_dir)
+
+    cache = SnapshotCache(test_dir)
+    key = cache.key_for({'server': 'localhost', 'database': 'TestDB'})
+    assert cache.load(key) is None, "Missing snapshot should load as None"
+
+    stamps = {
+        1: ['U', 'dbo.Users', '2024-01-01T00:00:00'],
+        2: ['P', 'dbo.GetUser', '2024-01-01T00:00:00'],
+        3: ['FN', 'dbo.Age', '2024-01-01T00:00:00']
+    }
+    schema = {
+        'tables': {'dbo.Users': {'columns': {}, 'modify_date': datetime(2024, 1, 1)}},
+        'procedures': {'dbo.GetUser': {'definition': 'CREATE PROCEDURE dbo.GetUser AS SELECT 1', 'type': 'SQL_STORED_PROCEDURE', 'modify_date': datetime(2024, 1, 1)}},
+        'functions': {'dbo.Age': {'definition': 'CREATE FUNCTION dbo.Age() RETURNS int AS BEGIN RETURN 1 END', 'type': 'SQL_SCALAR_FUNCTION', 'modify_date': datetime(2024, 1, 1)}},
+        'triggers': {}
+    }
+    cache.save(key, stamps, schema)
+
+    # Test 1: Round trip restores datetimes
+    loaded = cache.load(key)
+    assert loaded['schema'] == schema_from_dict(schema), "Loaded schema should match saved"
+
+    # Test 2: Refresh plan
+    current = {
+        1: ['U', 'dbo.Users', '2024-01-01T00:00:00'],          # unchanged
+        2: ['P', 'dbo.GetUser', '2024-02-01T00:00:00'],        # modified
+        4: ['TR', 'dbo.trgUsers', '2024-02-01T00:00:00']       # new (dbo.Age dropped)
+    }
+    changed, removed = plan_refresh(loaded['stamps'], current)
+    assert changed == {'P': [2], 'TR': [4]}, "Only modified and new objects should be fetched"
+    assert ('P', 'dbo.GetUser') in removed, "Modified objects replace their cached entry"
+    assert ('FN', 'dbo.Age') in removed, "Dropped objects should be removed"
+    assert ('U', 'dbo.Users') not in removed, "Unchanged objects stay cached"
+
+    shutil.rmtree(test_dir)
+    print("SnapshotCache Logic: PASS")
+
+if __name__ == "__main__":
+    test_snapshot()
@@ -0,0 +1,59 @@
+import sys
+import os
+import shutil
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.compare import definition_digest
+from src.core.pipeline import load_missing_definitions
+from src.core.snapshot import SnapshotCache
+from src.core.store import DefinitionStore
+from src.db.schema import SchemaExtractor
+from src.db.sqlite_catalog import SqliteConnector, build_catalog
+from test_catalog import build_catalog_schema
+
+def test_store():
+    print("Testing DefinitionStore...")
+    test_dir = "test_store"
+    if os.path.exists(test_dir):
+        shutil.rmtree(test_dir)
+
+    # Test 1: Identical bodies are stored once and shared
+    store = DefinitionStore(os.path.join(test_dir, "definitions"))
+    body = "CREATE PROCEDURE dbo.A AS SELECT 1"
+    digest, shared = store.put(body)
+    assert digest == definition_digest(body)
+    assert store.put("".join(["CREATE PROCEDURE dbo.A ", "AS SELECT 1"]))[1] is shared
+    assert store.put(None) == (None, None)
+
+    # Test 2: Bodies persist between instances
+    reopened = DefinitionStore(os.path.join(test_dir, "definitions"))
+    assert digest in reopened and reopened.get(digest) == body
+    assert reopened.get(definition_digest("never stored")) is None
+
+    # Test 3: Extraction writes into the store; digests mode hydrates from it without queries
+    build_catalog(test_dir, build_catalog_schema())
+    connector = SqliteConnector()
+    connector.connect(test_dir)
+    full = SchemaExtractor(connector, store).get_full_schema()
+    get_user = full['procedures']['dbo.GetUser']
+    assert get_user['definition_hash'] == definition_digest(get_user['definition'])
+    digests = SchemaExtractor(connector).get_full_schema(digests_only=True)
+    queries = connector.query_count
+    assert load_missing_definitions(digests, connector, {'procedures': ['dbo.GetUser']}, store=reopened) == 1
+    assert digests['procedures']['dbo.GetUser']['definition'] == get_user['definition']
+    assert connector.query_count == queries, "Stored bodies should not be fetched again"
+
+    # Test 4: Snapshots keep digests only
+    cache = SnapshotCache(os.path.join(test_dir, "snapshots"), store)
+    cache.save("db", {}, full)
+    loaded = cache.load("db")['schema']['procedures']['dbo.GetUser']
+    assert loaded['definition'] is None and store.get(loaded['definition_hash']) == get_user['definition']
+
+    connector.close()
+    shutil.rmtree(test_dir)
+    print("Definition Store Logic: PASS")
+
+if __name__ == "__main__":
+    test_store()